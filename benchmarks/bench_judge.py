@@ -0,0 +1,640 @@
+"""
+bench_judge.py - 判题压测（离线，无需真实 LLM）
+
+以确定性的模拟提供商替代 LLM，按目标速率把合成或录制的回答经由完整的
+cmd_submit_answer 流程（预筛、缓存、队列、对冲、流式解析、结算与数据库写入）重放。
+
+模拟提供商可配置延迟、抖动、失败率与回复形态：
+- fenced: ```json 围栏包裹
+- plain: 纯 JSON
+- prose: JSON 前后带说明文字
+- truncated: 在点评中途截断
+- invalid: 不是 JSON
+
+报告内容：
+- 吞吐量（回答/秒）与端到端延迟 p50 / p99（配置 judge_async 时统计到结果发回会话为止）
+- 各类结果数量（有效 / 无效 / 解析失败 / 请求失败 / 排队拒绝）
+- 数据库锁：获取次数、等待时间、持有时间，以及事件循环被阻塞的延迟 p99
+
+用法（在插件目录下）：
+    python benchmarks/bench_judge.py --count 500 --rate 20 --latency 800
+    python benchmarks/bench_judge.py --providers 2 --failure-rate 0.1 --shapes fenced=6,truncated=2,invalid=1
+    python benchmarks/bench_judge.py --db path/to/quiz.db --count 1000   # 重放 user_answer_log 中的回答
+    python benchmarks/bench_judge.py --answers answers.jsonl             # 每行 {"problem_id", "user", "group", "answer"}
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+PLUGIN_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PLUGIN_DIR.parent))
+
+from astrbot.api import logger
+
+package = PLUGIN_DIR.name
+handlers_module = importlib.import_module(f"{package}.src.handlers")
+repository_module = importlib.import_module(f"{package}.src.repository")
+llm_module = importlib.import_module(f"{package}.src.llm")
+
+# 异步判题的回执与发回的结果
+_JOB_RECEIPT_RE = re.compile(r"判题编号 #(\d+)")
+_JOB_REPLY_RE = re.compile(r"\[#(\d+)\] (.*)", re.DOTALL)
+
+SHAPES = ("fenced", "plain", "prose", "truncated", "invalid")
+_POINT_RE = re.compile(r"^\s*\[(\d+)\] (.+?)（", re.MULTILINE)
+_BATCH_ANSWER_RE = re.compile(
+    r"【回答 (\d+)】\n(.*?)(?=\n\n【回答 \d+】|\n\n请逐份)", re.DOTALL
+)
+
+
+# ==================== 模拟提供商 ====================
+
+
+class MockProvider:
+    """确定性的模拟 LLM：按回答中出现的知识点文本给出判定"""
+
+    def __init__(
+        self,
+        provider_id: str,
+        latency: float,
+        jitter: float,
+        failure_rate: float,
+        shapes: dict[str, int],
+        seed: int,
+    ):
+        self.provider_id = provider_id
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.shapes = list(shapes)
+        self.weights = list(shapes.values())
+        self.seed = seed
+        self.calls = 0
+        self.failures = 0
+
+    def meta(self):
+        return SimpleNamespace(id=self.provider_id)
+
+    def _rng(self, prompt: str) -> random.Random:
+        """同一请求在同一提供商上的表现固定，重复运行结果一致"""
+        digest = hashlib.sha1(f"{self.seed}:{self.provider_id}:{prompt}".encode())
+        return random.Random(digest.hexdigest())
+
+    @staticmethod
+    def _verdict(system_prompt: str, answer: str) -> dict:
+        points = _POINT_RE.findall(system_prompt or "")
+        if not points:
+            covered = min(10.0, len(answer) / 20)
+            return {
+                "ai_copied": False,
+                "valid": covered >= 1,
+                "points_covered": round(covered, 1),
+                "feedback": "模拟点评：覆盖度按篇幅估算",
+            }
+        covered = [int(idx) for idx, point in points if point[:4] in answer]
+        return {
+            "ai_copied": False,
+            "valid": bool(covered),
+            "covered_indices": covered,
+            "feedback": "模拟点评：" + ("说到了要点" if covered else "没有踩在点子上"),
+        }
+
+    def _reply(self, prompt: str, system_prompt: str, rng: random.Random) -> str:
+        batch = _BATCH_ANSWER_RE.findall(prompt)
+        if batch:
+            body = {
+                "results": [
+                    {"id": int(i), **self._verdict(system_prompt, answer)}
+                    for i, answer in batch
+                ]
+            }
+        else:
+            answer = prompt.split("【用户回答】\n", 1)[-1]
+            answer = answer.rsplit("\n\n请完成判断", 1)[0]
+            body = self._verdict(system_prompt, answer)
+
+        text = json.dumps(body, ensure_ascii=False)
+        shape = rng.choices(self.shapes, self.weights)[0]
+        if shape == "fenced":
+            return f"```json\n{text}\n```"
+        if shape == "prose":
+            return f"好的，判定结果如下：\n{text}\n以上。"
+        if shape == "truncated":
+            return text[: max(text.find('"feedback"') + 18, len(text) - 6)]
+        if shape == "invalid":
+            return "抱歉，我无法完成这个判断。"
+        return text
+
+    async def _prepare(self, prompt: str, system_prompt: str) -> tuple[str, float]:
+        self.calls += 1
+        rng = self._rng(prompt)
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        if rng.random() < self.failure_rate:
+            self.failures += 1
+            await asyncio.sleep(delay / 2)
+            raise ConnectionError(f"{self.provider_id}: simulated failure")
+        return self._reply(prompt, system_prompt, rng), delay
+
+    async def text_chat(self, prompt=None, system_prompt=None, **kwargs):
+        text, delay = await self._prepare(prompt, system_prompt)
+        await asyncio.sleep(delay)
+        return SimpleNamespace(completion_text=text, is_chunk=False)
+
+    async def text_chat_stream(self, prompt=None, system_prompt=None, **kwargs):
+        text, delay = await self._prepare(prompt, system_prompt)
+        # 首个片段前等待 1/4 延迟，其余按片段均分
+        pieces = [text[i : i + 16] for i in range(0, len(text), 16)] or [""]
+        await asyncio.sleep(delay / 4)
+        for piece in pieces:
+            await asyncio.sleep(delay * 3 / 4 / len(pieces))
+            yield SimpleNamespace(completion_text=piece, is_chunk=True)
+        yield SimpleNamespace(completion_text=text, is_chunk=False)
+
+
+class NoStreamProvider(MockProvider):
+    """不支持流式的模拟提供商"""
+
+    async def text_chat_stream(self, prompt=None, system_prompt=None, **kwargs):
+        raise NotImplementedError()
+        yield  # pragma: no cover
+
+
+# ==================== 模拟 AstrBot ====================
+
+
+class FakeEvent:
+    """cmd_submit_answer 用到的 AstrMessageEvent 接口"""
+
+    def __init__(self, user_qq: str, group_qq: str, message: str = ""):
+        self.user_qq = user_qq
+        self.message_obj = SimpleNamespace(group_id=group_qq)
+        self.unified_msg_origin = f"bench:GroupMessage:{group_qq}"
+        self.message_str = message
+
+    def get_sender_id(self):
+        return self.user_qq
+
+    def get_group_id(self):
+        return self.message_obj.group_id
+
+    def is_admin(self):
+        return True
+
+    def plain_result(self, text: str):
+        return text
+
+    def make_result(self):
+        return SimpleNamespace(chain=[])
+
+
+class FakeContext:
+    """按 ID 提供模拟提供商，会话默认提供商为第一个；记录异步判题发回的结果"""
+
+    def __init__(self, providers: list[MockProvider]):
+        self.providers = {p.provider_id: p for p in providers}
+        self.provider_manager = SimpleNamespace(get_provider_by_id=self.providers.get)
+        self._deliveries: dict[int, asyncio.Future] = {}
+
+    def get_using_provider(self, umo):
+        return next(iter(self.providers.values()))
+
+    def delivery(self, job_id: int) -> asyncio.Future:
+        """异步判题任务结果发回时完成的 future，结果为结算消息"""
+        future = self._deliveries.get(job_id)
+        if future is None:
+            future = self._deliveries[job_id] = (
+                asyncio.get_running_loop().create_future()
+            )
+        return future
+
+    async def send_message(self, umo, chain) -> bool:
+        text = "".join(getattr(c, "text", "") for c in chain.chain)
+        match = _JOB_REPLY_RE.search(text)
+        if match:
+            future = self.delivery(int(match.group(1)))
+            if not future.done():
+                future.set_result(match.group(2))
+        return True
+
+
+class LockProbe:
+    """包装数据库锁，统计获取次数、等待时间与持有时间"""
+
+    def __init__(self, lock):
+        self._lock = lock
+        self._depth = threading.local()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self._held_since = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        depth = getattr(self._depth, "value", 0)
+        if depth:
+            # 重入不计入统计
+            self._depth.value = depth + 1
+            return self._lock.acquire(blocking, timeout)
+        start = time.perf_counter()
+        acquired = self._lock.acquire(False)
+        if not acquired:
+            self.contended += 1
+            acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            now = time.perf_counter()
+            self.acquisitions += 1
+            self.wait_total += now - start
+            self._held_since = now
+            self._depth.value = 1
+        return acquired
+
+    def release(self):
+        self._depth.value -= 1
+        if self._depth.value == 0:
+            held = time.perf_counter() - self._held_since
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+async def measure_loop_lag(samples: list[float], stop: asyncio.Event):
+    """事件循环延迟：每 10ms 唤醒一次，记录超出预期的时间"""
+    interval = 0.01
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+# ==================== 数据准备 ====================
+
+
+def build_database(path: str, source: str | None, problems_per_domain: int):
+    """复制现有数据库，或用自带 SQL 与带知识点的合成题目构建一个"""
+    target = sqlite3.connect(path)
+    if source:
+        with sqlite3.connect(f"file:{source}?mode=ro", uri=True) as src:
+            src.backup(target)
+        target.close()
+        return
+
+    for name in ("schema.sql", "insert.sql"):
+        target.executescript((PLUGIN_DIR / "sql" / name).read_text(encoding="utf-8"))
+    categories = target.execute(
+        "SELECT MIN(id), domain_id FROM category GROUP BY domain_id"
+    ).fetchall()
+    rows = []
+    for category_id, domain_id in categories:
+        for json_id in range(1, problems_per_domain + 1):
+            score_points = [
+                {
+                    "idx": idx,
+                    "point": f"要点{domain_id}-{json_id}-{idx}说明",
+                    "hint": f"提示{idx}",
+                    "score": score,
+                }
+                for idx, score in enumerate((3, 3, 4))
+            ]
+            rows.append(
+                (
+                    domain_id,
+                    category_id,
+                    json_id,
+                    f"模拟题目 {domain_id}-{json_id} 的原理是什么？",
+                    "参考答案",
+                    json.dumps(score_points, ensure_ascii=False),
+                )
+            )
+    target.executemany(
+        """
+        INSERT INTO problems (domain_id, category_id, json_id, question, default_ans, score_points)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+        rows,
+    )
+    target.commit()
+    target.close()
+
+
+def synthetic_answers(db, count: int, groups: int, users: int, seed: int) -> list:
+    """按知识点文本合成回答：完整、部分、离题、无意义、复制粘贴与重复回答"""
+    rng = random.Random(seed)
+    with db.get_locked_cursor() as cursor:
+        cursor.execute("SELECT id, score_points FROM problems")
+        problems = [
+            (row["id"], json.loads(row["score_points"] or "[]")) for row in cursor
+        ]
+    if not problems:
+        raise SystemExit("no problems in database")
+
+    answers = []
+    for _ in range(count):
+        pid, score_points = rng.choice(problems)
+        points = [sp["point"] for sp in score_points]
+        kind = rng.choices(
+            ("full", "partial", "off_topic", "junk", "copied", "repeat"),
+            (3, 4, 1, 1, 1, 2),
+        )[0]
+        if kind == "full" and points:
+            text = "我的理解是：" + "，另外".join(points) + "，大致就是这样。"
+        elif kind == "partial" and points:
+            text = f"我觉得关键在于{rng.choice(points)}，其他的记不太清了。"
+        elif kind == "off_topic":
+            text = "今天天气不错适合出去玩耍散步晒太阳。"
+        elif kind == "junk":
+            text = "哈哈哈哈哈哈"
+        elif kind == "copied":
+            text = (
+                "## 概述\n\n**定义**：这是一个很长的教程式回答。\n"
+                "## 原理\n\n**第一点**：展开说明。\n**第二点**：展开说明。\n"
+                "**第三点**：展开说明。\n" + "补充内容。" * 20
+            )
+        elif answers:
+            # 与之前的回答完全相同（命中判题结果缓存）
+            previous = rng.choice(answers)
+            pid, text = previous["problem_id"], previous["answer"]
+        else:
+            text = "我的理解是：" + "，".join(points)
+        answers.append(
+            {
+                "problem_id": pid,
+                "user": f"{100000 + rng.randrange(users)}",
+                "group": f"{900000 + rng.randrange(groups)}",
+                "answer": text,
+            }
+        )
+    return answers
+
+
+def recorded_answers(db, args) -> list:
+    """从 --answers 文件或数据库的 user_answer_log 读取录制的回答"""
+    if args.answers:
+        lines = Path(args.answers).read_text(encoding="utf-8").splitlines()
+        answers = [json.loads(line) for line in lines if line.strip()]
+    else:
+        with db.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT problem_id, user_qq AS user, group_qq AS "group", answer_text AS answer
+                FROM user_answer_log ORDER BY id LIMIT ?
+            """,
+                (args.count,),
+            )
+            answers = [dict(row) for row in cursor.fetchall()]
+    return answers[: args.count]
+
+
+# ==================== 重放 ====================
+
+
+def classify(messages: list[str]) -> str:
+    final = messages[-1] if messages else ""
+    for prefix, outcome in (
+        ("✅", "valid"),
+        ("❌ 回答好像没有", "invalid"),
+        ("👮", "copied"),
+        ("❌ 大模型反馈的结果解析失败", "parse_error"),
+        ("❌ 判题网络", "request_error"),
+        ("❌ 判题出错", "request_error"),
+        ("🚦 当前判题请求过多", "shed"),
+        ("🚦", "rate_limited"),
+        ("⏳", "in_flight"),
+    ):
+        if final.startswith(prefix):
+            return outcome
+    return "other"
+
+
+async def replay(handlers, answers: list, rate: float) -> tuple[list, Counter, float]:
+    """按目标速率（开环）提交回答，返回 (端到端延迟列表, 结果计数, 总耗时)"""
+    latencies: list[float] = []
+    outcomes: Counter = Counter()
+    early: Counter = Counter()
+
+    async def submit(item: dict):
+        event = FakeEvent(str(item["user"]), str(item["group"]))
+        start = time.perf_counter()
+        messages = [
+            message
+            async for message in handlers.cmd_submit_answer(
+                event, str(item["problem_id"]), item["answer"]
+            )
+        ]
+        receipt = _JOB_RECEIPT_RE.search(messages[-1]) if messages else None
+        if receipt:
+            # 异步判题：等到结果发回会话
+            messages.append(await handlers.context.delivery(int(receipt.group(1))))
+        latencies.append(time.perf_counter() - start)
+        outcomes[classify(messages)] += 1
+        if any("初步判定" in m for m in messages):
+            early["early_verdict"] += 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i, item in enumerate(answers):
+        delay = start + i / rate - time.perf_counter() if rate > 0 else 0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(submit(item)))
+    await asyncio.gather(*tasks)
+    outcomes.update(early)
+    return latencies, outcomes, time.perf_counter() - start
+
+
+def parse_shapes(text: str) -> dict[str, int]:
+    shapes = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SHAPES:
+            raise SystemExit(f"unknown response shape {name!r}, choose from {SHAPES}")
+        shapes[name] = int(weight or 1)
+    return shapes
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    config = {}
+    if args.config:
+        config = json.loads(Path(args.config).read_text(encoding="utf-8"))
+
+    provider_cls = MockProvider if args.stream else NoStreamProvider
+    providers = [
+        provider_cls(
+            f"mock{i}",
+            args.latency / 1000 * (args.slow_factor if i == 0 else 1),
+            args.jitter / 1000,
+            args.failure_rate,
+            parse_shapes(args.shapes),
+            args.seed,
+        )
+        for i in range(args.providers)
+    ]
+    config.setdefault("judge_providers", [p.provider_id for p in providers])
+    config.setdefault("judge_stream", args.stream)
+    if not args.rate_limit:
+        # 默认关闭提交限流，压测判题链路本身
+        config.setdefault("answer_user_per_minute", 0)
+        config.setdefault("answer_group_per_minute", 0)
+
+    tmp = tempfile.mkdtemp(prefix="quiz_bench_judge_")
+    try:
+        db_path = os.path.join(tmp, "quiz.db")
+        build_database(db_path, args.db, args.problems)
+        db = repository_module.QuizRepository(db_path)
+        db.connect()
+        db.initialize_schema(str(PLUGIN_DIR / "sql" / "schema.sql"))
+
+        if args.db or args.answers:
+            answers = recorded_answers(db, args)
+        else:
+            answers = synthetic_answers(
+                db, args.count, args.groups, args.users, args.seed
+            )
+
+        probe = LockProbe(db.lock)
+        db.lock = probe
+        handlers = handlers_module.CommandHandlers(FakeContext(providers), db, config)
+        handlers.start_judge_jobs()
+
+        lag: list[float] = []
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(lag, stop))
+        latencies, outcomes, wall = await replay(handlers, answers, args.rate)
+        handlers.stop_judge_jobs()
+        stop.set()
+        await lag_task
+
+        print(
+            f"Replayed {len(answers)} answers at target {args.rate:g}/s "
+            f"({args.providers} providers, latency {args.latency:g}±{args.jitter:g} ms, "
+            f"failure rate {args.failure_rate:g}, stream={'on' if args.stream else 'off'})"
+        )
+        print(
+            f"throughput: {len(latencies) / wall:.1f} answers/s over {wall:.1f} s; "
+            f"latency p50 {percentile(latencies, 50) * 1000:.0f} ms, "
+            f"p99 {percentile(latencies, 99) * 1000:.0f} ms, "
+            f"max {max(latencies, default=0) * 1000:.0f} ms"
+        )
+        print(f"outcomes: {dict(outcomes)}")
+        print(
+            f"llm calls: {sum(p.calls for p in providers)} "
+            f"({', '.join(f'{p.provider_id}={p.calls}' for p in providers)}), "
+            f"simulated failures {sum(p.failures for p in providers)}, "
+            f"hedged {handlers.judge_providers.hedged}, "
+            f"cache hits {handlers.judge_cache.hits}, "
+            f"prescreen saved {handlers.prescreener.saved_calls}, "
+            f"queue shed {handlers.judge_queue.shed_count}"
+        )
+        prompt_stats = llm_module.prompt_cache.stats()
+        print(
+            f"prompts: {prompt_stats['requests']} requests, "
+            f"{prompt_stats['compiled_prompts']} compiled, "
+            f"avg {prompt_stats['avg_prompt_bytes']} bytes / "
+            f"~{prompt_stats['avg_est_tokens']} tokens, "
+            f"reusable prefix {prompt_stats['prefix_ratio'] * 100:.0f}%"
+        )
+        print(
+            f"db lock: {probe.acquisitions} acquisitions, {probe.contended} contended, "
+            f"wait {probe.wait_total * 1000:.1f} ms total, "
+            f"held {probe.hold_total * 1000:.1f} ms total "
+            f"({probe.hold_total / wall * 100:.1f}% of wall), "
+            f"max hold {probe.hold_max * 1000:.2f} ms"
+        )
+        if lag:
+            print(
+                f"event loop lag: p50 {statistics.median(lag) * 1000:.2f} ms, "
+                f"p99 {percentile(lag, 99) * 1000:.2f} ms, "
+                f"max {max(lag) * 1000:.2f} ms"
+            )
+        if args.jstat:
+            async for message in handlers.cmd_judge_stats(FakeEvent("admin", "0"), "1"):
+                print(message)
+        db.lock = probe._lock
+        db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=300, help="重放的回答数")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=20,
+        help="目标提交速率（回答/秒），0 为一次性全部提交",
+    )
+    parser.add_argument("--providers", type=int, default=1, help="模拟提供商数量")
+    parser.add_argument(
+        "--latency", type=float, default=800, help="模拟 LLM 延迟（毫秒）"
+    )
+    parser.add_argument("--jitter", type=float, default=300, help="延迟抖动（毫秒）")
+    parser.add_argument(
+        "--slow-factor",
+        type=float,
+        default=1,
+        help="首选提供商的延迟倍数（用于观察对冲）",
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument(
+        "--shapes",
+        default="fenced=5,plain=3,prose=1,truncated=1",
+        help=f"回复形态及权重，可选 {', '.join(SHAPES)}",
+    )
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--groups", type=int, default=20, help="合成数据的群数")
+    parser.add_argument("--users", type=int, default=200, help="合成数据的用户数")
+    parser.add_argument(
+        "--problems", type=int, default=20, help="合成数据每个领域的题目数"
+    )
+    parser.add_argument(
+        "--db", help="要复制的数据库路径，重放其中 user_answer_log 的回答"
+    )
+    parser.add_argument("--answers", help="录制的回答 JSONL 文件")
+    parser.add_argument("--config", help="插件配置 JSON（判题相关配置）")
+    parser.add_argument(
+        "--rate-limit", action="store_true", help="保留插件默认的提交限流"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jstat", action="store_true", help="结束后输出 /jstat 报告")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
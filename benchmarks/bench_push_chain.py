@@ -0,0 +1,170 @@
+"""
+bench_push_chain.py - 推送消息链构建与发送基准
+
+对比旧实现（单条消息链，每个订阅者分配一个 At 和一个 Plain）与
+当前的分片实现（复用组件，@ 列表拆分为后续消息）在大量订阅者下的
+构建耗时、组件分配数量和发送耗时。
+
+用法（在插件目录下）：
+    python benchmarks/bench_push_chain.py --subscribers 1000 --chunk 50
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PLUGIN_DIR.parent))
+
+from astrbot.api import logger
+from astrbot.api.message_components import At, Plain
+
+scheduler_module = importlib.import_module(f"{PLUGIN_DIR.name}.src.scheduler")
+repository_module = importlib.import_module(f"{PLUGIN_DIR.name}.src.repository")
+dispatch_module = importlib.import_module(f"{PLUGIN_DIR.name}.src.dispatch")
+
+
+class StubPlatform:
+    def __init__(self, platform_id: str):
+        self.platform_id = platform_id
+
+    def meta(self):
+        return type("Meta", (), {"id": self.platform_id})()
+
+
+class StubContext:
+    """模拟平台发送：固定延迟加上按组件数计的序列化开销"""
+
+    def __init__(self, base_latency: float, per_component: float):
+        self.platform_manager = type(
+            "PlatformManager", (), {"platform_insts": [StubPlatform("bench")]}
+        )()
+        self.base_latency = base_latency
+        self.per_component = per_component
+        self.messages = 0
+        self.max_components = 0
+
+    async def send_message(self, unified_msg_origin, result):
+        components = len(result.chain)
+        self.messages += 1
+        self.max_components = max(self.max_components, components)
+        await asyncio.sleep(self.base_latency + components * self.per_component)
+
+
+def legacy_chain(text: str, subscribers: list[str]) -> list:
+    """旧实现：单条消息链，每个订阅者分配两个组件"""
+    chain = [Plain(text)]
+    if subscribers:
+        chain.append(Plain("\n\n"))
+        for user_qq in subscribers:
+            chain.append(At(qq=user_qq))
+            chain.append(Plain(" "))
+    return chain
+
+
+def measure(label: str, build, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<10} build: median {statistics.median(timings) * 1000:.3f} ms, "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.3f} ms, "
+        f"peak alloc {peak / 1024:.1f} KiB"
+    )
+
+
+async def run(args):
+    subscribers = [str(10000000 + i) for i in range(args.subscribers)]
+    text = "📅 今日八股推送 [Java]\n\n" + "\n".join(
+        f"[ID: {i}] 示例题目 {i}" for i in range(3)
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = repository_module.QuizRepository(os.path.join(tmp, "bench.db"))
+        db.connect()
+        db.initialize_schema(str(PLUGIN_DIR / "sql" / "schema.sql"))
+
+        context = StubContext(args.latency / 1000, args.per_component / 1000)
+        scheduler = scheduler_module.QuizScheduler(
+            context,
+            db,
+            {"push_outbox": False, "push_mention_chunk_size": args.chunk},
+        )
+
+        measure("legacy", lambda: legacy_chain(text, subscribers), args.rounds)
+        measure(
+            "chunked",
+            lambda: scheduler._build_message_chains(text, subscribers),
+            args.rounds,
+        )
+
+        chains = scheduler._build_message_chains(text, subscribers)
+        unique = len({id(c) for chain in chains for c in chain})
+        total = sum(len(chain) for chain in chains)
+        print(
+            f"chunked chains: {len(chains)} messages, {total} components, "
+            f"{unique} distinct objects"
+        )
+
+        start = time.perf_counter()
+        await scheduler._send_push_message("bench", legacy_chain(text, subscribers))
+        legacy_elapsed = time.perf_counter() - start
+
+        context.messages = context.max_components = 0
+        push = dispatch_module.PreparedPush(
+            group_qq="bench",
+            domain_id=1,
+            domain_name="Java",
+            text=text,
+            mentions=subscribers,
+        )
+        start = time.perf_counter()
+        await scheduler._deliver_push(push)
+        chunked_elapsed = time.perf_counter() - start
+
+        print(f"legacy  send: 1 message in {legacy_elapsed * 1000:.1f} ms")
+        print(
+            f"chunked send: {context.messages} messages "
+            f"(max {context.max_components} components) "
+            f"in {chunked_elapsed * 1000:.1f} ms"
+        )
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--chunk", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=20, help="每条消息的基础发送延迟（毫秒）"
+    )
+    parser.add_argument(
+        "--per-component", type=float, default=0.02, help="每个组件的序列化开销（毫秒）"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
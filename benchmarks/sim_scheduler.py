@@ -0,0 +1,354 @@
+"""
+sim_scheduler.py - 推送调度快进模拟
+
+在数据库副本上以虚拟时钟快进 N 天，模拟 M 个使用默认配置的群，
+平台替换为桩实现，用于在上线前评估配置变更（例如给每天都加一个领域）的负载。
+
+报告内容：
+- 每分钟推送数（峰值 / 活跃分钟均值）
+- 每次推送的数据库语句数（读 / 写）
+- 策略状态漂移：推送次数与策略推进次数不一致、批次游标偏离预期、连续推送相同题目
+- 每个模拟日的实际耗时
+
+用法（在插件目录下）：
+    python benchmarks/sim_scheduler.py --days 14 --groups 500
+    python benchmarks/sim_scheduler.py --db path/to/quiz.db --config path/to/plugin_config.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from functools import partial
+from itertools import pairwise
+from pathlib import Path
+from types import SimpleNamespace
+
+PLUGIN_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PLUGIN_DIR.parent))
+
+from astrbot.api import logger
+
+package = PLUGIN_DIR.name
+scheduler_module = importlib.import_module(f"{package}.src.scheduler")
+repository_module = importlib.import_module(f"{package}.src.repository")
+factory_module = importlib.import_module(f"{package}.src.push_strategy.factory")
+daterem_module = importlib.import_module(f"{package}.src.push_strategy.daterem")
+
+DEFAULT_SETTINGS = {
+    day: {"time": "12:00", "domains": ["Java", "MySQL"]}
+    for day in ("星期一", "星期二", "星期三", "星期四", "星期五")
+}
+STRATEGIES = ("batch", "counter", "daterem")
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class VirtualClock:
+    """虚拟时钟：替换策略模块中的 date.today()"""
+
+    def __init__(self, start: date):
+        self.today = start
+        clock = self
+
+        class VirtualDate(date):
+            @classmethod
+            def today(cls):
+                return clock.today
+
+        self._original = daterem_module.datetime
+        daterem_module.datetime = SimpleNamespace(date=VirtualDate)
+
+    def restore(self):
+        daterem_module.datetime = self._original
+
+
+class QueryCounter:
+    """通过 sqlite 语句跟踪统计读写次数"""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+
+    def __call__(self, statement: str):
+        head = statement.lstrip().upper()
+        if head.startswith(WRITE_PREFIXES):
+            self.writes += 1
+        elif head.startswith(("SELECT", "WITH")):
+            self.reads += 1
+
+    def snapshot(self) -> tuple[int, int]:
+        return self.reads, self.writes
+
+
+class StubPlatform:
+    def meta(self):
+        return SimpleNamespace(id="sim")
+
+
+class StubContext:
+    """桩平台：只计数，不做网络请求"""
+
+    def __init__(self, latency: float):
+        self.platform_manager = SimpleNamespace(platform_insts=[StubPlatform()])
+        self.latency = latency
+        self.messages = 0
+
+    async def send_message(self, unified_msg_origin, result):
+        self.messages += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+def build_database(path: str, source: str | None, problems_per_category: int):
+    """复制现有数据库，或用自带 SQL 与合成题目构建一个"""
+    target = sqlite3.connect(path)
+    if source:
+        with sqlite3.connect(f"file:{source}?mode=ro", uri=True) as src:
+            src.backup(target)
+        target.close()
+        return
+
+    for name in ("schema.sql", "insert.sql", "extra.sql"):
+        target.executescript((PLUGIN_DIR / "sql" / name).read_text(encoding="utf-8"))
+    categories = target.execute("SELECT id, domain_id FROM category").fetchall()
+    target.executemany(
+        """
+        INSERT INTO problems (domain_id, category_id, json_id, question, default_ans)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        [
+            (domain_id, category_id, json_id, f"q{category_id}-{json_id}", "a")
+            for category_id, domain_id in categories
+            for json_id in range(1, problems_per_category + 1)
+        ],
+    )
+    target.commit()
+    target.close()
+
+
+def batch_position(db, group_qq: str, domain_id: int) -> tuple[int, int] | None:
+    """当前批次游标在按 id 排序的批次列表中的位置，返回 (位置, 批次总数)"""
+    with db.get_locked_cursor() as cursor:
+        cursor.execute(
+            "SELECT category_id, start_index FROM domain_settings "
+            "WHERE domain_id = ? ORDER BY id ASC",
+            (domain_id,),
+        )
+        batches = [(row[0], row[1]) for row in cursor.fetchall()]
+    if not batches:
+        return None
+    cursor_pos = db.get_cursor(group_qq, domain_id)
+    if cursor_pos not in batches:
+        return -1, len(batches)
+    return batches.index(cursor_pos), len(batches)
+
+
+async def run(args):
+    config = {}
+    if args.config:
+        config = json.loads(Path(args.config).read_text(encoding="utf-8"))
+    groups = [f"sim{i:05d}" for i in range(args.groups)]
+    config.update(
+        {
+            "use_default": groups,
+            "settings": config.get("settings") or DEFAULT_SETTINGS,
+            "push_outbox": args.outbox,
+            "push_spread_mode": "none",
+            "push_prepare_lead_minutes": 0,
+            "misfire_catchup_minutes": 0,
+        }
+    )
+
+    tmp = tempfile.mkdtemp(prefix="quiz_sim_")
+    clock = VirtualClock(date.fromisoformat(args.start))
+    try:
+        db_path = os.path.join(tmp, "quiz.db")
+        build_database(db_path, args.db, args.problems)
+        db = repository_module.QuizRepository(db_path)
+        db.connect()
+        db.initialize_schema(str(PLUGIN_DIR / "sql" / "schema.sql"))
+
+        for group in db.get_all_groups():
+            for i in range(args.subscribers):
+                db.subscribe_group(f"{900000 + i}", group.id)
+
+        counter = QueryCounter()
+        db.conn.set_trace_callback(counter)
+
+        context = StubContext(args.latency / 1000)
+        scheduler = scheduler_module.QuizScheduler(context, db, config)
+        scheduler.scheduler = scheduler_module.AsyncIOScheduler()
+
+        start = time.perf_counter()
+        await scheduler._load_all_tasks()
+        startup_wall = time.perf_counter() - start
+        startup_reads, startup_writes = counter.snapshot()
+
+        # 按轮转方式为每个群-领域分配策略
+        targets = sorted(
+            {t for _, t in scheduler.slot_index.items()},
+            key=lambda t: (t.group_qq, t.domain_id),
+        )
+        strategies = args.strategies.split(",")
+        target_strategy = {}
+        for i, target in enumerate(targets):
+            strategy_type = strategies[i % len(strategies)]
+            db.set_strategy_type(target.group_qq, target.domain_id, strategy_type)
+            target_strategy[(target.group_qq, target.domain_id)] = strategy_type
+        initial_positions = {
+            key: batch_position(db, *key)
+            for key, strategy_type in target_strategy.items()
+            if strategy_type == "batch"
+        }
+
+        # 记录每个目标的投递内容与策略推进次数
+        deliveries: dict[tuple[str, int], list[tuple[int, ...]]] = defaultdict(list)
+        advances: Counter = Counter()
+        deliver_push = scheduler._deliver_push
+
+        async def tracked_deliver(push):
+            ok = await deliver_push(push)
+            if ok and push.problem_ids:
+                deliveries[(push.group_qq, push.domain_id)].append(
+                    tuple(push.problem_ids)
+                )
+            return ok
+
+        scheduler._deliver_push = tracked_deliver
+        if scheduler.outbox:
+            scheduler.outbox.send = tracked_deliver
+
+        create = factory_module.StrategyFactory.create
+
+        def tracked_create(strategy_type, db_):
+            strategy = create(strategy_type, db_)
+            on_push_success = strategy.on_push_success
+
+            def tracked(group_qq, domain_id, problem_ids):
+                advances[(group_qq, domain_id)] += 1
+                return on_push_success(group_qq, domain_id, problem_ids)
+
+            strategy.on_push_success = tracked
+            return strategy
+
+        factory_module.StrategyFactory.create = staticmethod(tracked_create)
+
+        dispatch_reads, dispatch_writes = counter.snapshot()
+        per_minute: Counter = Counter()
+        day_walls = []
+        for day in range(args.days):
+            current = clock.today = date.fromisoformat(args.start) + timedelta(day)
+            day_start = time.perf_counter()
+            for slot in sorted(scheduler.slot_index.slots(), key=lambda s: s[1:]):
+                weekday, hour, minute = slot
+                if weekday is not None and weekday != current.weekday():
+                    continue
+                fired_at = datetime.combine(current, dtime(hour, minute))
+                stats = await scheduler.executor.fan_out(
+                    [
+                        partial(scheduler._fire_target, target, fired_at)
+                        for target in scheduler.slot_index.targets(slot)
+                    ],
+                    label=scheduler._slot_job_id(slot),
+                )
+                if scheduler.outbox:
+                    await scheduler.outbox.flush()
+                per_minute[fired_at] += stats.succeeded
+            day_walls.append(time.perf_counter() - day_start)
+
+        factory_module.StrategyFactory.create = staticmethod(create)
+        reads, writes = counter.snapshot()
+        reads -= dispatch_reads
+        writes -= dispatch_writes
+        pushes = sum(per_minute.values())
+
+        mismatched = [
+            key for key in target_strategy if advances[key] != len(deliveries[key])
+        ]
+        repeats: Counter = Counter()
+        for key, sent in deliveries.items():
+            repeats[target_strategy[key]] += sum(
+                1 for prev, cur in pairwise(sent) if prev == cur
+            )
+        cursor_drift = 0
+        for key, initial in initial_positions.items():
+            final = batch_position(db, *key)
+            if initial is None or final is None:
+                continue
+            expected = (initial[0] + advances[key]) % initial[1]
+            if final[0] != expected:
+                cursor_drift += 1
+
+        active = [n for n in per_minute.values() if n]
+        print(
+            f"Simulated {args.days} days x {args.groups} groups "
+            f"({len(targets)} targets, strategies={args.strategies}, "
+            f"outbox={'on' if args.outbox else 'off'})"
+        )
+        print(
+            f"startup: {startup_wall * 1000:.1f} ms, "
+            f"{startup_reads} reads / {startup_writes} writes"
+        )
+        print(
+            f"pushes: {pushes} total, {context.messages} messages, "
+            f"peak {max(active, default=0)}/min, "
+            f"mean {statistics.mean(active) if active else 0:.1f}/min "
+            f"over {len(active)} active minutes"
+        )
+        if pushes:
+            print(
+                f"db per push: {reads / pushes:.1f} reads, {writes / pushes:.1f} writes"
+            )
+        print(
+            f"drift: {len(mismatched)} targets with delivery/advance mismatch, "
+            f"{cursor_drift} batch cursors off expected, "
+            f"repeated consecutive pushes {dict(repeats)}"
+        )
+        if day_walls:
+            print(
+                f"wall per simulated day: mean {statistics.mean(day_walls) * 1000:.1f} ms, "
+                f"max {max(day_walls) * 1000:.1f} ms"
+            )
+        db.close()
+    finally:
+        clock.restore()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--db", help="要复制的数据库路径，缺省时使用合成数据")
+    parser.add_argument("--config", help="插件配置 JSON，使用其中的 settings 等配置")
+    parser.add_argument("--start", default="2026-01-05", help="模拟起始日期")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--subscribers", type=int, default=20, help="每个小组的订阅数")
+    parser.add_argument(
+        "--problems", type=int, default=60, help="合成数据每个分类题目数"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="桩平台发送延迟（毫秒）"
+    )
+    parser.add_argument("--outbox", action="store_true", help="经由发件箱投递")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
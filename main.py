@@ -97,9 +97,13 @@ class GroupQuizPlugin(Star):
                 )
             else:
                 logger.info(f"Database verified at {db_path}")
+                # schema.sql 只含 IF NOT EXISTS 的建表建索引语句，重复执行以补建新版本新增的表；
+                # 数据回填等一次性迁移由 initialize_schema 按 schema_meta 中的标记执行
+                self.db.initialize_schema(str(schema_path))
 
             # 初始化命令处理器
             self.cmd_handlers = CommandHandlers(self.context, self.db, self.config)
+            self.cmd_handlers.start_judge_jobs()
             logger.info("Command handlers initialized")
 
             # 初始化调度器
@@ -223,6 +227,14 @@ class GroupQuizPlugin(Star):
         async for result in self._delegate_to_cmd_handler("cmd_view_ans", event):
             yield result
 
+    @filter.command("jstat")
+    async def cmd_judge_stats(self, event: AstrMessageEvent, days: str = "7"):
+        """(管理员) 查看判题遥测统计"""
+        async for result in self._delegate_to_cmd_handler(
+            "cmd_judge_stats", event, days
+        ):
+            yield result
+
     @filter.command("rand")
     async def cmd_random(self, event: AstrMessageEvent, domain_name: str = None):
         """随机抽取一道该领域的题目"""
@@ -282,6 +294,9 @@ class GroupQuizPlugin(Star):
         if self.quiz_scheduler:
             self.quiz_scheduler.shutdown()
 
+        if self.cmd_handlers:
+            self.cmd_handlers.stop_judge_jobs()
+
         if self.db:
             self.db.close()
             logger.info("Database connection closed")
@@ -143,3 +143,134 @@ CREATE TABLE IF NOT EXISTS problem_score_log (
 );
 
 CREATE INDEX IF NOT EXISTS idx_answer_log_date ON user_answer_log(user_qq, problem_id, group_qq, answer_date);
+
+-- 用户每道题最近一次有效作答的日期，经验冷却检查按主键直接命中，不再扫描答题记录
+CREATE TABLE IF NOT EXISTS user_recent_valid (
+    user_qq TEXT NOT NULL,
+    group_qq TEXT NOT NULL,
+    problem_id INTEGER NOT NULL,
+    last_valid_date TEXT NOT NULL,      -- YYYY-MM-DD，与 user_answer_log.answer_date 一致
+    PRIMARY KEY (user_qq, group_qq, problem_id)
+) WITHOUT ROWID;
+
+-- ========== 推送调度持久化 ==========
+
+-- 推送计划快照：启动时若配置签名未变化，直接从快照恢复，跳过逐群初始化
+CREATE TABLE IF NOT EXISTS push_schedule (
+    id INTEGER PRIMARY KEY,
+    group_qq TEXT NOT NULL,
+    domain_id INTEGER NOT NULL,
+    domain_name TEXT NOT NULL,
+    weekday INTEGER,                    -- 0=星期一，NULL 表示每天
+    hour INTEGER NOT NULL,
+    minute INTEGER NOT NULL,
+    source TEXT DEFAULT 'manual' CHECK(source IN ('default', 'manual')),
+    UNIQUE(group_qq, domain_id, weekday, hour, minute)
+);
+
+CREATE INDEX IF NOT EXISTS idx_push_schedule_group ON push_schedule(group_qq);
+
+-- 调度元信息（如推送计划签名）
+CREATE TABLE IF NOT EXISTS push_schedule_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- 每个推送目标最近一次成功推送对应的计划时间，用于重启后补推
+CREATE TABLE IF NOT EXISTS push_fire_log (
+    group_qq TEXT NOT NULL,
+    domain_id INTEGER NOT NULL,
+    last_fired_at TEXT NOT NULL,        -- YYYY-MM-DD HH:MM:SS（本地时间）
+    PRIMARY KEY(group_qq, domain_id)
+);
+
+-- 推送平台路由：每个群最近一次投递成功的平台，推送时优先尝试
+CREATE TABLE IF NOT EXISTS push_route (
+    group_qq TEXT PRIMARY KEY,
+    platform_id TEXT NOT NULL,
+    updated_at REAL NOT NULL            -- Unix 时间戳
+);
+
+-- 推送发件箱：推送先渲染入队，再由后台任务投递并按指数退避重试
+-- 状态流转：pending（待投递）-> sent（已送达，待推进策略状态）-> done；重试耗尽为 failed
+CREATE TABLE IF NOT EXISTS push_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idem_key TEXT NOT NULL UNIQUE,      -- 幂等键：群号:领域ID:计划时间
+    group_qq TEXT NOT NULL,
+    domain_id INTEGER NOT NULL,
+    domain_name TEXT NOT NULL,
+    strategy_type TEXT NOT NULL,        -- 选题时使用的策略
+    problem_ids TEXT NOT NULL,          -- JSON 数组
+    payload TEXT NOT NULL,              -- JSON：{"text": ..., "mentions": [...]}
+    status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'sending', 'sent', 'applying', 'done', 'failed')),
+    attempts INTEGER DEFAULT 0,
+    next_attempt_at REAL NOT NULL,      -- Unix 时间戳
+    last_error TEXT,
+    fired_at TEXT,                      -- 对应的计划时间
+    created_at DATETIME DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_push_outbox_due ON push_outbox(status, next_attempt_at);
+
+-- ========== 判题 ==========
+
+-- 判题预筛记录：本地规则直接给出判定（未调用 LLM）的回答，便于审计规则是否误判
+CREATE TABLE IF NOT EXISTS judge_prescreen_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_qq TEXT NOT NULL,
+    group_qq TEXT NOT NULL,
+    problem_id INTEGER NOT NULL,
+    rule TEXT NOT NULL,                 -- 命中的规则：copied_markdown / junk / keywords_only / off_topic
+    answer_text TEXT NOT NULL,
+    created_at DATETIME DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_prescreen_rule ON judge_prescreen_log(rule, created_at);
+
+-- 判题遥测：每次判定一行（含缓存、预筛、本地评判），用于统计延迟、用量与通过率
+CREATE TABLE IF NOT EXISTS judge_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_qq TEXT NOT NULL,
+    problem_id INTEGER NOT NULL,
+    domain_id INTEGER,
+    source TEXT NOT NULL,               -- 判定来源：llm / batch / cache / prescreen / local
+    provider_id TEXT,                   -- 实际给出结果的提供商，未调用 LLM 时为空
+    hedged INTEGER DEFAULT 0,           -- 是否发出了对冲请求
+    latency_ms INTEGER DEFAULT 0,
+    prompt_bytes INTEGER DEFAULT 0,     -- 合并请求按回答数均摊
+    completion_bytes INTEGER DEFAULT 0,
+    est_tokens INTEGER DEFAULT 0,       -- 提示词 + 回复的估算 token 数
+    parse TEXT NOT NULL,                -- ok / repaired / failed / error / timeout / skipped
+    valid INTEGER,
+    ai_copied INTEGER,
+    score REAL DEFAULT 0,               -- 本次抢得的分数
+    created_at DATETIME DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_judge_metrics_time ON judge_metrics(created_at, source);
+CREATE INDEX IF NOT EXISTS idx_judge_metrics_provider ON judge_metrics(provider_id, created_at, latency_ms);
+CREATE INDEX IF NOT EXISTS idx_judge_metrics_group ON judge_metrics(group_qq, created_at, est_tokens);
+
+-- 异步判题任务：回答先入队并立即回执，由后台任务评判后主动发回原会话，重启后继续
+-- 状态流转：pending（待评判）-> judging（评判中）-> judged（已结算，待发送）-> done；发送重试耗尽为 failed
+CREATE TABLE IF NOT EXISTS judge_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_qq TEXT NOT NULL,
+    group_qq TEXT NOT NULL,
+    problem_id INTEGER NOT NULL,
+    answer_text TEXT NOT NULL,
+    umo TEXT NOT NULL,                  -- 提交回答的会话 unified_msg_origin，结果发回这里
+    status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'judging', 'judged', 'done', 'failed')),
+    reply TEXT,                         -- 结算消息，已结算后写入
+    attempts INTEGER DEFAULT 0,         -- 发送失败次数
+    last_error TEXT,
+    created_at DATETIME DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_judge_jobs_status ON judge_jobs(status, id);
+
+-- 数据库元信息：一次性数据迁移的完成标记等
+CREATE TABLE IF NOT EXISTS schema_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
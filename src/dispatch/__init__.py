@@ -0,0 +1,20 @@
+from .executor import FanoutStats, PushExecutor
+from .outbox import PushOutbox
+from .prepare import PreparedPush, PushPreparer
+from .routing import PlatformRouter
+from .slots import PushTarget, SlotIndex, SlotKey
+from .spread import PushSpreader, deterministic_jitter
+
+__all__ = [
+    "FanoutStats",
+    "PlatformRouter",
+    "PreparedPush",
+    "PushExecutor",
+    "PushOutbox",
+    "PushPreparer",
+    "PushSpreader",
+    "PushTarget",
+    "SlotIndex",
+    "SlotKey",
+    "deterministic_jitter",
+]
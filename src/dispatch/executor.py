@@ -0,0 +1,106 @@
+"""
+executor.py - 推送并发执行器
+
+同一时间槽内的推送以受控并发执行：全局并发上限限制同时进行的推送数，
+每个平台另有独立的发送并发上限，避免单个适配器被瞬时打满。
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+
+from astrbot.api import logger
+
+PushJob = Callable[[], Awaitable[bool]]
+
+
+@dataclass
+class FanoutStats:
+    """一次批量推送的统计"""
+
+    label: str = ""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed: float = 0.0  # 秒
+
+
+class PushExecutor:
+    """带全局与分平台并发上限的推送执行器"""
+
+    def __init__(self, max_concurrency: int = 20, platform_concurrency: int = 5):
+        """
+        Args:
+            max_concurrency: 全局同时进行的推送数上限
+            platform_concurrency: 单个平台同时进行的发送数上限
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.platform_concurrency = max(1, int(platform_concurrency))
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._platforms: dict[str, asyncio.Semaphore] = {}
+        self.last_stats: FanoutStats | None = None
+
+    def platform_limit(self, platform_id: str) -> asyncio.Semaphore:
+        """获取平台的发送信号量（用于 async with）"""
+        sem = self._platforms.get(platform_id)
+        if sem is None:
+            sem = asyncio.Semaphore(self.platform_concurrency)
+            self._platforms[platform_id] = sem
+        return sem
+
+    async def submit(self, job: PushJob) -> bool:
+        """在全局并发上限内执行单个推送"""
+        async with self._global:
+            return await job()
+
+    async def submit_after(self, delay: float, job: PushJob) -> bool:
+        """等待 delay 秒后再执行推送（等待期间不占用并发名额）"""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await self.submit(job)
+
+    async def fan_out(
+        self,
+        jobs: Iterable[PushJob],
+        label: str = "",
+        delays: list[float] | None = None,
+    ) -> FanoutStats:
+        """
+        并发执行一批推送并统计总耗时
+
+        Args:
+            jobs: 推送任务列表，每个任务返回是否成功
+            label: 日志标签（如时间槽任务 ID）
+            delays: 与 jobs 一一对应的启动延迟（秒），用于削峰
+
+        Returns:
+            FanoutStats: 本批推送统计
+        """
+        jobs = list(jobs)
+        if delays is None:
+            delays = [0.0] * len(jobs)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.submit_after(delay, job) for delay, job in zip(delays, jobs)),
+            return_exceptions=True,
+        )
+
+        stats = FanoutStats(label=label, total=len(results))
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"Push job raised in fan-out {label}: {result}")
+                stats.failed += 1
+            elif result:
+                stats.succeeded += 1
+            else:
+                stats.failed += 1
+        stats.elapsed = time.perf_counter() - start
+        self.last_stats = stats
+
+        logger.info(
+            f"Fan-out {label} finished: {stats.succeeded}/{stats.total} succeeded "
+            f"in {stats.elapsed:.2f}s (max spread delay {max(delays, default=0):.1f}s)"
+        )
+        return stats
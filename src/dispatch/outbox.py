@@ -0,0 +1,212 @@
+"""
+outbox.py - 推送发件箱投递
+
+推送渲染后写入 push_outbox 表，由后台任务投递，与调度任务本身解耦：
+
+- 投递失败按指数退避重试，超过最大次数后标记为 failed
+- 送达后再推进策略状态；每一步都通过条件更新状态来认领，
+  同一幂等键的推送只会入队一次，策略状态也只会推进一次
+"""
+
+import asyncio
+import json
+import time
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+from astrbot.api import logger
+
+from ..push_strategy.factory import StrategyFactory
+from ..repository import QuizRepository
+from ..repository.models import PushOutboxEntry
+from .executor import PushExecutor
+from .prepare import PreparedPush, PushPreparer
+
+SendFunc = Callable[[PreparedPush], Awaitable[bool]]
+
+
+class PushOutbox:
+    """推送发件箱及其后台投递任务"""
+
+    def __init__(
+        self,
+        db: QuizRepository,
+        send: SendFunc,
+        executor: PushExecutor,
+        preparer: PushPreparer | None = None,
+        max_attempts: int = 5,
+        base_delay: float = 30,
+        max_delay: float = 3600,
+        poll_interval: float = 15,
+    ):
+        """
+        Args:
+            db: 数据库实例
+            send: 投递函数，接收 PreparedPush，返回是否送达
+            executor: 推送并发执行器
+            preparer: 预准备缓存，策略状态推进后使对应的预准备推送失效
+            max_attempts: 最大投递次数
+            base_delay: 首次重试延迟（秒），之后每次翻倍
+            max_delay: 重试延迟上限（秒）
+            poll_interval: 无新推送入队时的轮询间隔（秒）
+        """
+        self.db = db
+        self.send = send
+        self.executor = executor
+        self.preparer = preparer
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(1.0, float(base_delay))
+        self.max_delay = max(self.base_delay, float(max_delay))
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """启动后台投递任务"""
+        recovered = self.db.recover_push_outbox()
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted outbox pushes")
+        purged = self.db.purge_push_outbox()
+        if purged:
+            logger.info(f"Purged {purged} old outbox pushes")
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """停止后台投递任务（未投递的推送保留在表中，下次启动继续）"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def enqueue(self, push: PreparedPush, idem_key: str, fired_at: str | None) -> bool:
+        """
+        推送入队并唤醒投递任务
+
+        Returns:
+            bool: 是否已入队（幂等键重复也视为已入队）
+        """
+        push_id = self.db.enqueue_push(
+            idem_key,
+            push.group_qq,
+            push.domain_id,
+            push.domain_name,
+            push.strategy_type,
+            push.problem_ids,
+            {"text": push.text, "mentions": push.mentions},
+            fired_at,
+            time.time(),
+        )
+        if push_id is None:
+            logger.info(f"Push {idem_key} already in outbox, skipped")
+        else:
+            logger.debug(f"Enqueued push {idem_key} as outbox #{push_id}")
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                # 后台循环不能因一次投递异常退出，记录后等待下一轮
+                logger.error(f"Outbox flush failed: {e}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def flush(self):
+        """投递所有到期的推送"""
+        due = self.db.get_due_pushes(time.time())
+        if not due:
+            return
+        await self.executor.fan_out(
+            [partial(self._process, entry) for entry in due], label="outbox"
+        )
+
+    async def _process(self, entry: PushOutboxEntry) -> bool:
+        if entry.status == "pending" and not await self._deliver(entry):
+            return False
+        return self._apply_state(entry)
+
+    async def _deliver(self, entry: PushOutboxEntry) -> bool:
+        if not self.db.claim_push_status(entry.id, "pending", "sending"):
+            return False
+
+        payload = json.loads(entry.payload)
+        push = PreparedPush(
+            group_qq=entry.group_qq,
+            domain_id=entry.domain_id,
+            domain_name=entry.domain_name,
+            text=payload.get("text", ""),
+            strategy_type=entry.strategy_type,
+            problem_ids=json.loads(entry.problem_ids),
+            mentions=payload.get("mentions", []),
+        )
+
+        error = ""
+        try:
+            sent = await self.send(push)
+        except Exception as e:  # noqa: BLE001
+            # 发送由平台适配器完成，可能抛出任意异常，一律按发送失败重试
+            sent = False
+            error = str(e)
+
+        if sent:
+            self.db.claim_push_status(entry.id, "sending", "sent")
+            return True
+
+        attempts = entry.attempts + 1
+        error = error or "no platform accepted the message"
+        if attempts >= self.max_attempts:
+            self.db.reschedule_push(entry.id, attempts, time.time(), error, "failed")
+            logger.error(
+                f"Final Failure: push {entry.idem_key} to group {entry.group_qq} "
+                f"gave up after {attempts} attempts: {error}"
+            )
+        else:
+            delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+            self.db.reschedule_push(
+                entry.id, attempts, time.time() + delay, error, "pending"
+            )
+            logger.warning(
+                f"Push {entry.idem_key} attempt {attempts} failed, "
+                f"retrying in {delay:.0f}s: {error}"
+            )
+        return False
+
+    def _apply_state(self, entry: PushOutboxEntry) -> bool:
+        """送达后推进策略状态（认领成功才执行，保证只推进一次）"""
+        if not self.db.claim_push_status(entry.id, "sent", "applying"):
+            return False
+
+        try:
+            problem_ids = json.loads(entry.problem_ids)
+            if problem_ids:
+                strategy = StrategyFactory.create(entry.strategy_type, self.db)
+                strategy.on_push_success(entry.group_qq, entry.domain_id, problem_ids)
+                if self.preparer:
+                    # 策略状态已推进，之前准备好的推送内容已过时
+                    self.preparer.invalidate(
+                        group_qq=entry.group_qq, domain_id=entry.domain_id
+                    )
+                logger.info(
+                    f"Strategy callback completed: {type(strategy).__name__} "
+                    f"(push {entry.idem_key})"
+                )
+        except Exception as e:  # noqa: BLE001
+            # 策略回调可能抛出任意异常；回退为 sent，稍后只重试状态推进，不会重复发送消息
+            self.db.reschedule_push(
+                entry.id, entry.attempts, time.time() + self.base_delay, str(e), "sent"
+            )
+            logger.error(
+                f"Failed to apply strategy state for push {entry.idem_key}: {e}",
+                exc_info=True,
+            )
+            return False
+
+        self.db.claim_push_status(entry.id, "applying", "done")
+        return True
@@ -0,0 +1,94 @@
+"""
+prepare.py - 已渲染的推送内容与预准备缓存
+
+推送分为两步：先解析策略、选题并渲染消息文本（准备），再发送消息。
+准备结果与发送解耦，可以写入发件箱重试，送达后再推进策略状态；
+也可以在时间槽到来前几分钟提前准备好，触发时直接发送。
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+
+@dataclass
+class PreparedPush:
+    """一次已准备好的推送"""
+
+    group_qq: str
+    domain_id: int
+    domain_name: str
+    text: str
+    strategy_type: str = "batch"
+    problem_ids: list[int] = field(default_factory=list)  # 送达后用于推进策略状态
+    mentions: list[str] = field(default_factory=list)  # 需要 @ 的订阅用户
+    study_group_id: int | None = None  # 领域所属学习小组，订阅变化时据此失效
+
+
+class PushPreparer:
+    """
+    提前准备好的推送缓存，按 (群号, 领域ID) 存放，取出即消费
+
+    选题可能依赖当天日期（如按日期取余的策略），因此同时记录准备时的日期，
+    与推送日期不同（如零点刚过的时间槽在前一天准备）时视为过期。
+    """
+
+    def __init__(self, max_age: float = 900):
+        """
+        Args:
+            max_age: 缓存有效期（秒），超过后视为过期重新准备
+        """
+        self.max_age = max_age
+        self._cache: dict[tuple[str, int], tuple[PreparedPush, float, date]] = {}
+
+    def put(self, push: PreparedPush):
+        self._cache[(push.group_qq, push.domain_id)] = (
+            push,
+            time.monotonic(),
+            date.today(),
+        )
+
+    def take(
+        self, group_qq: str, domain_id: int, fire_date: date | None = None
+    ) -> PreparedPush | None:
+        """
+        取出并移除缓存的推送，过期或不存在时返回 None
+
+        Args:
+            fire_date: 推送日期，与准备时的日期不同时视为过期；为空时取今天
+        """
+        entry = self._cache.pop((group_qq, domain_id), None)
+        if entry is None:
+            return None
+        push, prepared_at, prepared_on = entry
+        if time.monotonic() - prepared_at > self.max_age:
+            return None
+        if prepared_on != (fire_date or date.today()):
+            return None
+        return push
+
+    def invalidate(
+        self,
+        group_qq: str | None = None,
+        domain_id: int | None = None,
+        study_group_id: int | None = None,
+    ) -> int:
+        """
+        使匹配条件的缓存失效（条件之间为"且"，全部为空时清空缓存）
+
+        Returns:
+            int: 失效的条目数
+        """
+        stale = [
+            key
+            for key, (push, _, _) in self._cache.items()
+            if (group_qq is None or push.group_qq == group_qq)
+            and (domain_id is None or push.domain_id == domain_id)
+            and (study_group_id is None or push.study_group_id == study_group_id)
+        ]
+        for key in stale:
+            del self._cache[key]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,92 @@
+"""
+routing.py - 推送平台路由缓存
+
+多平台部署时，记住每个群最近一次投递成功的平台，下次推送优先尝试该平台，
+避免每次都从第一个平台开始逐个试错。路由持久化在数据库中，重启后依然有效；
+超过有效期的路由会被丢弃并重新探测。
+"""
+
+import sqlite3
+import time
+
+from astrbot.api import logger
+
+from ..repository import QuizRepository
+
+
+class PlatformRouter:
+    """群号 -> 平台 ID 的路由缓存"""
+
+    def __init__(self, db: QuizRepository, ttl_hours: float = 168):
+        """
+        Args:
+            db: 数据库实例
+            ttl_hours: 路由有效期（小时），过期后重新探测；0 为永不过期
+        """
+        self.db = db
+        self.ttl = max(0.0, float(ttl_hours)) * 3600
+        self._routes: dict[str, tuple[str, float]] | None = None
+
+    def _load(self) -> dict[str, tuple[str, float]]:
+        if self._routes is None:
+            try:
+                self._routes = self.db.get_push_routes()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to load push routes, probing all: {e}")
+                self._routes = {}
+        return self._routes
+
+    def lookup(self, group_qq: str) -> str | None:
+        """获取群的有效路由，过期则丢弃"""
+        route = self._load().get(group_qq)
+        if route is None:
+            return None
+        platform_id, updated_at = route
+        if self.ttl and time.time() - updated_at > self.ttl:
+            self.forget(group_qq)
+            return None
+        return platform_id
+
+    def order(self, group_qq: str, platforms: list) -> list:
+        """
+        按路由对平台实例排序：已知可用的平台排在最前，其余保持原顺序
+
+        Args:
+            group_qq: 群号
+            platforms: platform_manager.platform_insts
+        """
+        platform_id = self.lookup(group_qq)
+        if platform_id is None:
+            return list(platforms)
+        preferred = [p for p in platforms if p.meta().id == platform_id]
+        if not preferred:
+            # 平台已被移除
+            self.forget(group_qq)
+            return list(platforms)
+        return preferred + [p for p in platforms if p.meta().id != platform_id]
+
+    def remember(self, group_qq: str, platform_id: str):
+        """记录投递成功的平台；路由未变且未过半有效期（或永不过期）时不写库"""
+        routes = self._load()
+        now = time.time()
+        current = routes.get(group_qq)
+        if (
+            current
+            and current[0] == platform_id
+            and (not self.ttl or now - current[1] < self.ttl / 2)
+        ):
+            return
+        routes[group_qq] = (platform_id, now)
+        try:
+            self.db.save_push_route(group_qq, platform_id, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist push route for group {group_qq}: {e}")
+
+    def forget(self, group_qq: str):
+        """删除群的路由"""
+        if self._load().pop(group_qq, None) is None:
+            return
+        try:
+            self.db.delete_push_route(group_qq)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to delete push route for group {group_qq}: {e}")
@@ -0,0 +1,97 @@
+"""
+slots.py - 推送时间槽索引
+
+调度器在时间槽模式下只为每个不同的 (星期, HH:MM) 注册一个 APScheduler 任务，
+触发时再通过本索引查出该时间槽下的所有推送目标并逐一分发。
+"""
+
+from dataclasses import dataclass
+
+# (weekday, hour, minute)，weekday 为 None 表示每天
+SlotKey = tuple[int | None, int, int]
+
+
+@dataclass(frozen=True)
+class PushTarget:
+    """一个推送目标：某群的某个领域"""
+
+    group_qq: str
+    domain_id: int
+    domain_name: str
+    source: str = "manual"  # default: 周推送配置 / manual: 手动配置
+
+
+class SlotIndex:
+    """时间槽 -> 推送目标 的内存索引"""
+
+    def __init__(self):
+        self._slots: dict[SlotKey, dict[PushTarget, None]] = {}
+        # 群号 -> {时间槽: 该群在此时间槽的目标}，用于按群快速移除
+        self._by_group: dict[str, dict[SlotKey, set[PushTarget]]] = {}
+
+    def add(self, slot: SlotKey, target: PushTarget) -> bool:
+        """
+        添加推送目标
+
+        Returns:
+            bool: 该时间槽是否为新建（需要注册调度任务）
+        """
+        is_new = slot not in self._slots
+        # 使用 dict 保持插入顺序，同时保证去重
+        self._slots.setdefault(slot, {})[target] = None
+        self._by_group.setdefault(target.group_qq, {}).setdefault(slot, set()).add(
+            target
+        )
+        return is_new
+
+    def remove_group(self, group_qq: str) -> list[SlotKey]:
+        """
+        移除某群的所有推送目标
+
+        Returns:
+            list[SlotKey]: 因此变为空的时间槽（需要移除调度任务）
+        """
+        emptied = []
+        for slot, group_targets in self._by_group.pop(group_qq, {}).items():
+            targets = self._slots.get(slot)
+            if targets is None:
+                continue
+            for target in group_targets:
+                targets.pop(target, None)
+            if not targets:
+                del self._slots[slot]
+                emptied.append(slot)
+        return emptied
+
+    def items(self, group_qq: str | None = None) -> list[tuple[SlotKey, PushTarget]]:
+        """列出所有 (时间槽, 推送目标)，可限定某个群"""
+        if group_qq is not None:
+            return [
+                (slot, target)
+                for slot, targets in self._by_group.get(group_qq, {}).items()
+                for target in targets
+            ]
+        return [
+            (slot, target)
+            for slot, targets in self._slots.items()
+            for target in targets
+        ]
+
+    def targets(self, slot: SlotKey) -> list[PushTarget]:
+        """获取时间槽下的所有推送目标"""
+        return list(self._slots.get(slot, {}))
+
+    def slots(self) -> list[SlotKey]:
+        """获取所有时间槽"""
+        return list(self._slots)
+
+    def target_count(self) -> int:
+        """推送目标总数"""
+        return sum(len(targets) for targets in self._slots.values())
+
+    def clear(self):
+        self._slots.clear()
+        self._by_group.clear()
+
+    def __len__(self) -> int:
+        return len(self._slots)
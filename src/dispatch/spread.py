@@ -0,0 +1,82 @@
+"""
+spread.py - 推送削峰
+
+大量群配置在同一整点（如 12:00）时，推送、查库和后续的判题请求会集中在同一秒。
+本模块为一波推送中的每个目标计算延迟，把负载摊开：
+
+- jitter: 按群号哈希得到固定的偏移，同一个群每次推送的延迟都相同
+- rate:   按令牌桶排队，桶满时可立即发出 burst 个，之后按 rate 个/秒匀速发出
+
+所有延迟都受 max_delay 硬上限约束。
+"""
+
+import hashlib
+
+SPREAD_MODES = ("none", "jitter", "rate")
+
+
+def deterministic_jitter(key: str, max_seconds: float) -> float:
+    """根据 key 计算 [0, max_seconds) 内的固定偏移"""
+    if max_seconds <= 0:
+        return 0.0
+    digest = hashlib.md5(key.encode("utf-8")).digest()
+    fraction = int.from_bytes(digest[:8], "big") / 2**64
+    return fraction * max_seconds
+
+
+class PushSpreader:
+    """推送削峰延迟计算器"""
+
+    def __init__(
+        self,
+        mode: str = "none",
+        jitter_seconds: float = 60,
+        rate_per_second: float = 5,
+        burst: int = 10,
+        max_delay: float = 240,
+    ):
+        """
+        Args:
+            mode: none / jitter / rate
+            jitter_seconds: jitter 模式下的最大偏移（秒）
+            rate_per_second: rate 模式下的匀速发出速率
+            burst: rate 模式下令牌桶容量
+            max_delay: 任意模式下的延迟硬上限（秒）
+        """
+        self.mode = mode if mode in SPREAD_MODES else "none"
+        self.jitter_seconds = max(0.0, float(jitter_seconds))
+        self.rate_per_second = max(0.001, float(rate_per_second))
+        self.burst = max(1, int(burst))
+        self.max_delay = max(0.0, float(max_delay))
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "none" and self.max_delay > 0
+
+    def delay_for(self, group_qq: str) -> float:
+        """单个群的延迟（只用 jitter，不依赖同一波中的其他目标）"""
+        if self.mode != "jitter":
+            return 0.0
+        return min(deterministic_jitter(group_qq, self.jitter_seconds), self.max_delay)
+
+    def wave_delays(self, group_qqs: list[str]) -> list[float]:
+        """
+        计算一波推送中每个目标的延迟
+
+        Args:
+            group_qqs: 按分发顺序排列的群号
+
+        Returns:
+            list[float]: 与输入一一对应的延迟（秒）
+        """
+        if not self.enabled:
+            return [0.0] * len(group_qqs)
+
+        if self.mode == "jitter":
+            return [self.delay_for(g) for g in group_qqs]
+
+        # rate: 令牌桶初始为满，第 i 个目标需要等待第 i - burst + 1 个令牌生成
+        return [
+            min(max(0, i - self.burst + 1) / self.rate_per_second, self.max_delay)
+            for i in range(len(group_qqs))
+        ]
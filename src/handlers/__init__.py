@@ -1,5 +1,16 @@
 from astrbot.api.star import Context
 
+from ..llm import (
+    AnswerPrescreener,
+    InFlightRegistry,
+    JudgeBatcher,
+    JudgeCache,
+    JudgeJobRunner,
+    JudgeProviderPool,
+    JudgeQueue,
+    MatcherRegistry,
+    SubmitRateLimiter,
+)
 from ..repository import QuizRepository
 from .admin import AdminHandlers
 from .answer import AnswerHandlers
@@ -37,3 +48,52 @@ class CommandHandlers(
         self.db = db
         self.config = config
         self.scheduler = None
+        self.judge_cache = JudgeCache(
+            max_size=config.get("judge_cache_size", 2000),
+            ttl=config.get("judge_cache_ttl_minutes", 1440) * 60,
+        )
+        self.judge_queue = JudgeQueue(
+            max_in_flight=config.get("judge_max_in_flight", 4),
+            max_queued=config.get("judge_queue_size", 50),
+            max_queued_per_group=config.get("judge_queue_per_group", 10),
+        )
+        self.prescreener = AnswerPrescreener(
+            enabled=config.get("judge_prescreen", True)
+        )
+        self.matchers = MatcherRegistry()
+        self.inflight = InFlightRegistry()
+        self.rate_limiter = SubmitRateLimiter(
+            user_burst=config.get("answer_user_burst", 3),
+            user_per_minute=config.get("answer_user_per_minute", 3),
+            group_burst=config.get("answer_group_burst", 20),
+            group_per_minute=config.get("answer_group_per_minute", 20),
+        )
+        self.judge_providers = JudgeProviderPool(
+            timeout=config.get("judge_timeout_seconds", 30),
+            hedge_after=config.get("judge_hedge_after_seconds", 8),
+            failure_threshold=config.get("judge_breaker_failures", 3),
+            cooldown=config.get("judge_breaker_cooldown_seconds", 60),
+        )
+        # 微批量判题：窗口为 0 时关闭，每份回答单独请求
+        batch_window = config.get("judge_batch_window_ms", 0) / 1000
+        self.judge_batcher = (
+            JudgeBatcher(
+                self.judge_queue,
+                window=batch_window,
+                max_batch=config.get("judge_batch_max", 5),
+            )
+            if batch_window > 0
+            else None
+        )
+        # 异步判题：/a 入队后立即回执，结果由后台任务发回原会话
+        self.judge_jobs = (
+            JudgeJobRunner(
+                db,
+                self._run_judge_job,
+                self._send_judge_reply,
+                workers=config.get("judge_async_workers", 8),
+                release=self._release_judge_job,
+            )
+            if config.get("judge_async", False)
+            else None
+        )
@@ -5,14 +5,23 @@ from typing import TYPE_CHECKING
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 
+from ..llm import PRESCREEN_RULES, prompt_cache
+
 if TYPE_CHECKING:
+    from ..llm import AnswerPrescreener
     from ..repository import QuizRepository
 
 
+def _fmt_tokens(tokens: int | None) -> str:
+    tokens = tokens or 0
+    return f"{tokens / 1000:.1f}k" if tokens >= 1000 else str(tokens)
+
+
 class AdminHandlers:
     """管理员指令处理器"""
 
     db: "QuizRepository"
+    prescreener: "AnswerPrescreener"
 
     async def cmd_task(self, event: AstrMessageEvent):
         """管理员指令：切换本群的题目推送状态"""
@@ -234,3 +243,82 @@ class AdminHandlers:
             yield build_mixed_message(ans_text, event.make_result())
         except ImportError:
             yield event.plain_result(ans_text)
+
+    async def cmd_judge_stats(self, event: AstrMessageEvent, days: str = "7"):
+        """(管理员) 查看判题遥测统计：/jstat [天数]"""
+        if not event.is_admin():
+            yield event.plain_result("❌ 此命令仅限管理员使用")
+            return
+
+        if not str(days).isdigit() or int(days) <= 0:
+            yield event.plain_result("❌ 天数必须是正整数，例如：/jstat 7")
+            return
+        days = int(days)
+
+        sources = self.db.get_judge_source_summary(days)
+        if not sources:
+            yield event.plain_result(f"📊 近 {days} 天没有判题记录")
+            return
+
+        lines = [f"📊 判题统计（近 {days} 天）", "【判定来源】"]
+        for row in sources:
+            valid_rate = (row["valid_cnt"] or 0) / row["cnt"] * 100
+            lines.append(
+                f"{row['source']}：{row['cnt']} 次，有效 {valid_rate:.0f}%，"
+                f"解析失败 {row['failed_cnt'] or 0}，补全 {row['repaired_cnt'] or 0}，"
+                f"约 {_fmt_tokens(row['tokens'])} tokens"
+            )
+
+        rule_counts = self.db.get_prescreen_rule_counts(days)
+        if rule_counts:
+            lines.append("【预筛规则】")
+            for rule, cnt in sorted(rule_counts.items(), key=lambda kv: -kv[1]):
+                lines.append(f"{PRESCREEN_RULES.get(rule, rule)}：{cnt} 次")
+        counters = self.prescreener.counters
+        if counters:
+            # 进程内计数，自本次启动起累计
+            lines.append(
+                f"本次运行预筛 {sum(counters.values())} 份，放行 {counters['passed']} 份，"
+                f"节省 LLM 调用 {self.prescreener.saved_calls} 次"
+            )
+
+        providers = self.db.get_judge_provider_summary(days)
+        if providers:
+            lines.append("【提供商延迟】")
+            for pid, pct in self.db.get_judge_latency_percentiles(days).items():
+                row = providers.get(pid, {})
+                p50, p90, p99 = ((pct[p] or 0) / 1000 for p in ("p50", "p90", "p99"))
+                lines.append(
+                    f"{pid}：{pct['cnt']} 次，p50 {p50:.1f}s / p90 {p90:.1f}s / "
+                    f"p99 {p99:.1f}s，失败 {row.get('failed_cnt') or 0}，"
+                    f"对冲 {row.get('hedged_cnt') or 0}，"
+                    f"约 {_fmt_tokens(row.get('tokens'))} tokens"
+                )
+
+        prompt_stats = prompt_cache.stats()
+        if prompt_stats["requests"]:
+            # 进程内计数，自本次启动起累计
+            lines.append("【提示词（本次运行）】")
+            lines.append(
+                f"请求 {prompt_stats['requests']} 次，编译 {prompt_stats['compiled_prompts']} 份，"
+                f"平均 {prompt_stats['avg_prompt_bytes']} 字节 / "
+                f"约 {prompt_stats['avg_est_tokens']} tokens，"
+                f"可复用前缀占比 {prompt_stats['prefix_ratio'] * 100:.0f}%"
+            )
+
+        lines.append("【各群用量】")
+        for row in self.db.get_judge_cost_by_group(days):
+            lines.append(
+                f"{row['group_qq']}：判定 {row['cnt']} 次（LLM {row['llm_cnt'] or 0} 次），"
+                f"约 {_fmt_tokens(row['tokens'])} tokens"
+            )
+
+        lines.append("【各领域通过率】")
+        for row in self.db.get_judge_pass_rates(days):
+            valid_rate = (row["valid_cnt"] or 0) / row["cnt"] * 100
+            lines.append(
+                f"{row['domain_name']}：{row['cnt']} 次，有效 {valid_rate:.0f}%，"
+                f"复制 {row['copied_cnt'] or 0}，平均得分 {row['avg_score'] or 0:.1f}"
+            )
+
+        yield event.plain_result("\n".join(lines))
@@ -1,19 +1,52 @@
+import asyncio
+import inspect
 import json
+import sqlite3
+from contextlib import aclosing
+from datetime import datetime
+from functools import partial
 from typing import TYPE_CHECKING
 
-from astrbot.api.event import AstrMessageEvent
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent, MessageChain
 from astrbot.core.star.filter.command import GreedyStr
 
-from ..llm.judge import build_judge_prompt_a, build_judge_prompt_b
+from ..llm import (
+    AnswerPrescreener,
+    InFlightRegistry,
+    JudgeBatcher,
+    JudgeCache,
+    JudgeJobRunner,
+    JudgeProviderPool,
+    JudgeQueue,
+    JudgeQueueFull,
+    MatcherRegistry,
+    SubmitRateLimiter,
+    judge_answer,
+    parse_score_points,
+    provider_id,
+)
+from ..repository.models import JudgeJob, JudgeMetric
 
 if TYPE_CHECKING:
+    from ..llm import ScorePointMatcher
     from ..repository import QuizRepository
+    from ..repository.models import Problem
 
 
 class AnswerHandlers:
     """互动答题相关命令处理器"""
 
     db: "QuizRepository"
+    judge_cache: JudgeCache
+    judge_queue: JudgeQueue
+    judge_batcher: JudgeBatcher | None
+    judge_jobs: JudgeJobRunner | None
+    judge_providers: JudgeProviderPool
+    inflight: InFlightRegistry
+    rate_limiter: SubmitRateLimiter
+    prescreener: AnswerPrescreener
+    matchers: MatcherRegistry
 
     async def cmd_submit_answer(
         self, event: AstrMessageEvent, problem_id: str, answer_parts: GreedyStr
@@ -47,6 +80,119 @@ class AnswerHandlers:
             else "private_" + user_qq
         )
 
+        # 同一份回答正在评判中（重复点击发送）或评判期间再次提交
+        claim = self.inflight.claim(user_qq, group_qq, pid, user_answer)
+        if claim == "duplicate":
+            yield event.plain_result(
+                f"⏳ 这份回答已经在评判中了，结果出来会第一时间告诉你 (ID: {pid})~"
+            )
+            return
+        if claim == "busy":
+            yield event.plain_result(
+                f"⏳ 你对这道题的上一份回答还在评判中，等结果出来再提交吧 (ID: {pid})~"
+            )
+            return
+
+        # 异步判题时登记一直保留到任务评判完成
+        handed_off = False
+        try:
+            limited = self.rate_limiter.check(user_qq, group_qq)
+            if limited:
+                scope, wait = limited
+                who = "你" if scope == "user" else "本群"
+                logger.info(
+                    f"Rate limited answer submission from {user_qq} in {group_qq} "
+                    f"({scope}, retry after {wait:.0f}s)"
+                )
+                yield event.plain_result(
+                    f"🚦 {who}提交回答太频繁啦，请 {max(1, round(wait))} 秒后再试~"
+                )
+                return
+
+            if self.judge_jobs:
+                # 异步判题：入队后立即回执，结果由后台任务发回本会话
+                job_id = self.judge_jobs.submit(
+                    user_qq, group_qq, pid, user_answer, event.unified_msg_origin
+                )
+                handed_off = True
+                yield event.plain_result(
+                    f"📨 回答已收到，判题编号 #{job_id} (ID: {pid})，结果稍后发到这里~"
+                )
+                return
+
+            # 本生成器被关闭时同步关闭判题生成器，及时撤回排队中的判题任务
+            async with aclosing(
+                self._judge_submission(
+                    event.unified_msg_origin, problem, user_answer, user_qq, group_qq
+                )
+            ) as messages:
+                async for message in messages:
+                    yield event.plain_result(message)
+        finally:
+            if not handed_off:
+                self.inflight.release(user_qq, group_qq, pid)
+
+    def start_judge_jobs(self):
+        """启动异步判题任务，恢复上次未完成的任务"""
+        if not self.judge_jobs:
+            return
+        for job in self.judge_jobs.start():
+            if job.status == "pending":
+                self.inflight.claim(
+                    job.user_qq, job.group_qq, job.problem_id, job.answer_text
+                )
+
+    def stop_judge_jobs(self):
+        if self.judge_jobs:
+            self.judge_jobs.stop()
+
+    async def _run_judge_job(self, job: JudgeJob) -> str:
+        """评判一个异步判题任务，返回结算消息"""
+        problem = self.db.get_problem_by_id(job.problem_id)
+        if not problem:
+            return f"❌ 未找到题目 ID: {job.problem_id}"
+        message = ""
+        async for message in self._judge_submission(
+            job.umo,
+            problem,
+            job.answer_text,
+            job.user_qq,
+            job.group_qq,
+            progress=False,
+            judge_job_id=job.id,
+        ):
+            pass
+        return message
+
+    def _release_judge_job(self, job: JudgeJob):
+        """异步判题任务处理结束，释放提交时的评判中登记"""
+        self.inflight.release(job.user_qq, job.group_qq, job.problem_id)
+
+    async def _send_judge_reply(self, job: JudgeJob) -> bool:
+        """把判题结果发回提交回答的会话，群聊中 @ 作答者"""
+        chain = MessageChain()
+        if not job.group_qq.startswith("private_"):
+            chain.at(job.user_qq, job.user_qq)
+        chain.message(f" [#{job.id}] {job.reply}")
+        return await self.context.send_message(job.umo, chain)
+
+    async def _judge_submission(
+        self,
+        umo: str,
+        problem: "Problem",
+        user_answer: str,
+        user_qq: str,
+        group_qq: str,
+        progress: bool = True,
+        judge_job_id: int | None = None,
+    ):
+        """
+        评判一份回答并结算（缓存、预筛、本地评判、LLM 判题），逐条产出回复文本
+
+        最后一条为结算消息；progress 为 False 时不产出排队、审阅中和先行判定等过程消息。
+        judge_job_id 为异步判题任务 ID，结算与任务的结算消息在同一事务中写入。
+        """
+        pid = problem.id
         # Check if already answered recently (for base EXP rule)
         # 允许多次回答抢分，但基础经验同人同题一定天数内只给一次
         cooldown_days = self.config.get("exp_cooldown_days", 30)
@@ -54,96 +200,306 @@ class AnswerHandlers:
             user_qq, pid, group_qq, days=cooldown_days
         )
 
-        domain_name = problem.domain_name or "未知领域"
-        question = problem.question or ""
-        default_ans = problem.default_ans or ""
-        max_score = problem.score or 10
-        score_points_raw = problem.score_points
+        score_points = parse_score_points(problem.score_points)
 
-        has_score_points = False
-        score_points = []
-        if score_points_raw:
-            try:
-                score_points = json.loads(score_points_raw)
-                if isinstance(score_points, list) and len(score_points) > 0:
-                    has_score_points = True
-            except Exception:
-                pass
+        cache_key = JudgeCache.make_key(problem, user_answer)
+        # 判题遥测：判定来源与 LLM 请求数据
+        source = "prescreen"
+        trace: dict = {}
 
-        if has_score_points:
-            sys_p, user_p = build_judge_prompt_a(
-                domain_name, question, score_points, user_answer
+        # 本地规则能明确判定的回答（明显复制、无意义内容等）不再调用 LLM。
+        # 须在查缓存之前：缓存键去掉了 Markdown 标点，带格式粘贴的回答
+        # 可能命中此前有效的判题结果而绕过复制检测
+        verdict = self.prescreener.check(problem, score_points, user_answer)
+        if verdict:
+            self.db.record_prescreen_decision(
+                user_qq, group_qq, pid, verdict.rule, user_answer
             )
-        else:
-            sys_p, user_p = build_judge_prompt_b(
-                domain_name, question, default_ans, max_score, user_answer
+            logger.info(
+                f"Prescreen decided answer to problem {pid} from {user_qq}: "
+                f"{verdict.rule} (LLM calls saved: {self.prescreener.saved_calls})"
             )
+            judge_res = verdict.judge_res
+        else:
+            # 相同题目、相同评分标准下的相同回答直接复用判题结果
+            judge_res = self.judge_cache.get(cache_key)
+            source = "cache"
+
+        matcher = self.matchers.get(problem, score_points) if score_points else None
+        if judge_res is None and matcher and matcher.all_local:
+            # 知识点全部为本地评判的黑话题，按关键词直接评判
+            judge_res = matcher.local_verdict(user_answer)
+            source = "local"
+
+        if judge_res is None:
+            # 关键词初步匹配结果先告知用户，最终以 LLM 评判为准
+            provisional = ""
+            if matcher and matcher.has_keywords:
+                hit_names = matcher.point_names(matcher.match(user_answer))
+                if hit_names:
+                    provisional = (
+                        f"\n⚡ 初步匹配到要点：{'、'.join(hit_names)}（以最终评判为准）"
+                    )
+
+            prov = await self._get_judge_provider(umo)
+            if not prov:
+                yield "❌ 未找到可用的 LLM 提供商，无法评判回答。"
+                return
 
-        # Call LLM
-        # 优先使用用户在配置页选择的 provider
-        llm_provider_id = self.config.get("llm_provider") if self.config else None
-        prov = None
-
-        if llm_provider_id and hasattr(self.context, "provider_manager"):
-            prov = self.context.provider_manager.get_provider_by_id(llm_provider_id)
-
-        # 如果未配或者找不到指定 provider，则降级使用消息源当前的 provider
-        if not prov:
-            prov = self.context.get_using_provider(event.unified_msg_origin)
+            try:
+                if self.judge_batcher:
+                    # 微批量：与同题的其他回答合并为一次请求
+                    source = "batch"
+                    if progress:
+                        yield f"🔍 正在仔细审阅你的回答 (ID: {pid})..."
+                    judge_res = await self.judge_batcher.judge(
+                        prov,
+                        problem,
+                        score_points,
+                        user_answer,
+                        group_qq,
+                        user_qq,
+                        trace=trace,
+                    )
+                else:
+                    source = "llm"
+                    # 流式判题：valid 与命中要点一出现就先告知用户
+                    early = asyncio.get_running_loop().create_future()
+                    on_partial = None
+                    if progress and self.config.get("judge_stream", True):
+                        on_partial = partial(
+                            self._release_early_verdict, early, bool(score_points)
+                        )
+                    # 经由判题队列执行：限制并发并在群、用户之间轮转
+                    ticket = self.judge_queue.submit(
+                        group_qq,
+                        user_qq,
+                        partial(
+                            judge_answer,
+                            prov,
+                            problem,
+                            score_points,
+                            user_answer,
+                            on_partial=on_partial,
+                            trace=trace,
+                        ),
+                    )
+                    try:
+                        if progress:
+                            position = self.judge_queue.position(ticket)
+                            if position:
+                                yield f"⏳ 判题排队中，你是第 {position} 位 (ID: {pid})...{provisional}"
+                            else:
+                                yield f"🔍 正在仔细审阅你的回答 (ID: {pid})...{provisional}"
+                        await asyncio.wait(
+                            [ticket.future, early], return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if early.done() and not ticket.future.done():
+                            message = self._format_early_verdict(
+                                early.result(), matcher, user_answer
+                            )
+                            if message:
+                                yield message
+                        early.cancel()
+                        judge_res = await ticket
+                    finally:
+                        # 提交方中途离开（生成器被关闭、任务被取消）时撤回仍在排队的任务
+                        ticket.cancel()
+            except JudgeQueueFull:
+                yield "🚦 当前判题请求过多，请稍后再提交~"
+                return
+            except json.JSONDecodeError as e:
+                self._record_judge_metric(problem, group_qq, source, trace)
+                yield f"❌ 大模型反馈的结果解析失败，再试一次吧（JSON解析错误：{e}）"
+                return
+            except Exception as e:
+                self._record_judge_metric(problem, group_qq, source, trace)
+                yield f"❌ 判题网络或者大模型接口开小差了，请稍后再试（请求错误：{e}）"
+                return
 
-        if not prov:
-            yield event.plain_result("❌ 未找到可用的 LLM 提供商，无法评判回答。")
-            return
+            self.judge_cache.put(cache_key, judge_res)
 
-        yield event.plain_result(f"🔍 正在仔细审阅你的回答 (ID: {pid})...")
+        if matcher:
+            # local 知识点以关键词匹配结果为准
+            judge_res = matcher.merge(judge_res, user_answer)
 
+        message, score = self._settle_answer(
+            problem,
+            score_points,
+            judge_res,
+            user_qq,
+            group_qq,
+            user_answer,
+            has_answered_recently,
+            judge_job_id,
+        )
+        self._record_judge_metric(problem, group_qq, source, trace, judge_res, score)
+        yield message
+
+    def _record_judge_metric(
+        self,
+        problem: "Problem",
+        group_qq: str,
+        source: str,
+        trace: dict,
+        judge_res: dict | None = None,
+        score: float = 0.0,
+    ):
+        """记录一次判定的遥测数据，失败不影响答题"""
+        judge_res = judge_res or {}
+        metric = JudgeMetric(
+            group_qq=group_qq,
+            problem_id=problem.id,
+            domain_id=problem.domain_id,
+            source=source,
+            parse=trace.get("parse", "skipped"),
+            provider_id=trace.get("provider_id"),
+            hedged=trace.get("hedged", False),
+            latency_ms=trace.get("latency_ms", 0),
+            prompt_bytes=trace.get("prompt_bytes", 0),
+            completion_bytes=trace.get("completion_bytes", 0),
+            est_tokens=trace.get("est_tokens", 0),
+            valid=judge_res.get("valid"),
+            ai_copied=judge_res.get("ai_copied"),
+            score=score,
+        )
         try:
-            resp = await prov.text_chat(
-                prompt=user_p,
-                system_prompt=sys_p,
-                temperature=0.3,  # Optional: Might not be supported directly by AstrBot text_chat config
+            self.db.record_judge_metric(metric)
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Failed to record judge metric for problem {problem.id}: {e}"
             )
-            llm_reply = resp.completion_text.strip()
 
-            # extract JSON
-            if "```json" in llm_reply:
-                json_str = llm_reply.split("```json")[1].split("```")[0].strip()
-            elif "```" in llm_reply:
-                json_str = llm_reply.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = llm_reply
+    async def _get_judge_provider(self, umo: str):
+        """
+        获取判题使用的 LLM 提供商
 
-            judge_res = json.loads(json_str)
-        except json.JSONDecodeError as e:
-            yield event.plain_result(
-                f"❌ 大模型反馈的结果解析失败，再试一次吧（JSON解析错误：{e}）"
-            )
+        候选顺序：judge_providers 列表、llm_provider、消息源当前的 provider；
+        返回的对象按顺序带超时、对冲和熔断地调用这些候选，没有任何可用候选时返回 None
+        """
+        provider_ids = (
+            list(self.config.get("judge_providers") or []) if self.config else []
+        )
+        # 优先使用用户在配置页选择的 provider
+        llm_provider_id = self.config.get("llm_provider") if self.config else None
+        if llm_provider_id:
+            provider_ids.append(llm_provider_id)
+
+        candidates = []
+        if hasattr(self.context, "provider_manager"):
+            for pid in dict.fromkeys(provider_ids):
+                prov = self.context.provider_manager.get_provider_by_id(pid)
+                # 新版 AstrBot 中该方法为协程
+                if inspect.isawaitable(prov):
+                    prov = await prov
+                if prov:
+                    candidates.append((pid, prov))
+                else:
+                    logger.warning(f"Judge provider {pid} not found, skipped")
+
+        # 如果未配或者找不到指定 provider，则降级使用消息源当前的 provider
+        if not candidates:
+            prov = self.context.get_using_provider(umo)
+            if prov:
+                candidates.append((provider_id(prov), prov))
+
+        if not candidates:
+            return None
+        return self.judge_providers.bind(candidates)
+
+    @staticmethod
+    def _release_early_verdict(
+        early: asyncio.Future, has_score_points: bool, fields: dict
+    ):
+        """流式判题的字段回调：判定所需字段齐全时放出先行结果"""
+        needed = "covered_indices" if has_score_points else "points_covered"
+        if early.done() or "valid" not in fields:
             return
-        except Exception as e:
-            yield event.plain_result(
-                f"❌ 判题网络或者大模型接口开小差了，请稍后再试（请求错误：{e}）"
-            )
+        if fields["valid"] and needed not in fields:
             return
+        early.set_result(fields)
+
+    @staticmethod
+    def _format_early_verdict(
+        fields: dict, matcher: "ScorePointMatcher | None", user_answer: str
+    ) -> str:
+        """先行结果提示：点评仍在生成，得分以最终结算为准"""
+        if fields.get("ai_copied") or not fields.get("valid"):
+            return "🧐 初步判定：回答似乎没有踩在点子上，点评生成中..."
+        covered = fields.get("covered_indices")
+        if covered and matcher:
+            # local 知识点以关键词匹配结果为准
+            merged = matcher.merge({"covered_indices": covered}, user_answer)
+            names = matcher.point_names(merged["covered_indices"])
+            if names:
+                return f"👍 初步判定：回答有效，命中要点：{'、'.join(names)}，点评生成中..."
+        return "👍 初步判定：回答有效，点评生成中..."
+
+    def _settle_answer(
+        self,
+        problem: "Problem",
+        score_points: list[dict],
+        judge_res: dict,
+        user_qq: str,
+        group_qq: str,
+        user_answer: str,
+        has_answered_recently: bool,
+        judge_job_id: int | None = None,
+    ) -> tuple[str, float]:
+        """
+        根据判题结果和当前群的抢分进度结算得分与经验，记录作答
+
+        结算消息先于写库生成：作答记录、全群进度与异步任务的结算消息在同一事务中写入，
+        重启后重新评判的任务不会重复结算。
+
+        Returns:
+            tuple[str, float]: 回复给用户的结算消息，本次抢得的分数
+        """
+        pid = problem.id
+        max_score = problem.score or 10
+        has_score_points = bool(score_points)
 
         ai_copied = judge_res.get("ai_copied", False)
         valid = judge_res.get("valid", False)
         llm_feedback = judge_res.get("feedback", "无评价")
 
         if ai_copied:
-            self.db.record_user_answer(
-                user_qq, pid, group_qq, user_answer, False, True, 0, llm_feedback, 0, 0
-            )
-            yield event.plain_result(
+            message = (
                 f"👮 复制粘贴达咩！还是自己组织语言再试一次吧~\n点评：{llm_feedback}"
             )
-            return
+            self._record_settlement(
+                judge_job_id,
+                message,
+                user_qq,
+                pid,
+                group_qq,
+                user_answer,
+                False,
+                True,
+                0,
+                llm_feedback,
+                0,
+                0,
+            )
+            return message, 0.0
 
         if not valid:
-            self.db.record_user_answer(
-                user_qq, pid, group_qq, user_answer, False, False, 0, llm_feedback, 0, 0
+            message = f"❌ 回答好像没有踩在点子上\n点评：{llm_feedback}"
+            self._record_settlement(
+                judge_job_id,
+                message,
+                user_qq,
+                pid,
+                group_qq,
+                user_answer,
+                False,
+                False,
+                0,
+                llm_feedback,
+                0,
+                0,
             )
-            yield event.plain_result(f"❌ 回答好像没有踩在点子上\n点评：{llm_feedback}")
-            return
+            return message, 0.0
 
         # Valid answer, compute score
         user_add_score = 0.0
@@ -202,10 +558,10 @@ class AnswerHandlers:
 
         # Check if score pool is drawn
         if is_complete:
-            yield event.plain_result(
-                f"✅ 回答有效！\n点评：{llm_feedback}\n{points_str}\n\n太遗憾了，本题全群 {max_score} 分已被抢空~\n获得 {exp_gained} 经验值。"
-            )
-            self.db.record_user_answer(
+            message = f"✅ 回答有效！\n点评：{llm_feedback}\n{points_str}\n\n太遗憾了，本题全群 {max_score} 分已被抢空~\n获得 {exp_gained} 经验值。"
+            self._record_settlement(
+                judge_job_id,
+                message,
                 user_qq,
                 pid,
                 group_qq,
@@ -217,27 +573,7 @@ class AnswerHandlers:
                 exp_gained,
                 0,
             )
-            return
-
-        self.db.update_problem_score_progress(
-            pid,
-            group_qq,
-            user_add_score,
-            covered_mask if covered_mask != -1 else 0,
-            new_is_complete,
-        )
-        self.db.record_user_answer(
-            user_qq,
-            pid,
-            group_qq,
-            user_answer,
-            True,
-            False,
-            covered_mask,
-            llm_feedback,
-            exp_gained,
-            user_add_score,
-        )
+            return message, 0.0
 
         bonus_msg = ""
         hint_msg = ""
@@ -255,9 +591,37 @@ class AnswerHandlers:
             if missing_hints:
                 hint_msg = f"\n💡 [ID: {pid}] 还有 {max_score - (group_total + user_add_score)} 分可以抢！回复 /h {pid} 获取下一考点提示~"
 
-        yield event.plain_result(
-            f"✅ 回答惊艳！\n点评：{llm_feedback}\n{points_str}\n\n💰 抢得 {user_add_score} 分！获得 {exp_gained} 经验值。{bonus_msg}{hint_msg}"
+        message = f"✅ 回答惊艳！\n点评：{llm_feedback}\n{points_str}\n\n💰 抢得 {user_add_score} 分！获得 {exp_gained} 经验值。{bonus_msg}{hint_msg}"
+        self._record_settlement(
+            judge_job_id,
+            message,
+            user_qq,
+            pid,
+            group_qq,
+            user_answer,
+            True,
+            False,
+            covered_mask,
+            llm_feedback,
+            exp_gained,
+            user_add_score,
+            progress=(
+                user_add_score,
+                covered_mask if covered_mask != -1 else 0,
+                new_is_complete,
+            ),
         )
+        return message, user_add_score
+
+    def _record_settlement(
+        self, judge_job_id: int | None, message: str, *args, **kwargs
+    ):
+        """写入作答记录（异步任务同时写入结算消息）"""
+        recorded = self.db.record_user_answer(
+            *args, judge_job_id=judge_job_id, reply=message, **kwargs
+        )
+        if judge_job_id is not None and not recorded:
+            logger.warning(f"Judge job #{judge_job_id} was already settled, skipped")
 
     async def cmd_get_answer(self, event: AstrMessageEvent, problem_id: str):
         """获取指定题目的参考答案"""
@@ -266,40 +630,27 @@ class AnswerHandlers:
             return
 
         pid = int(problem_id)
-        problem = self.db.get_problem_by_id(pid)
-
-        if not problem:
-            yield event.plain_result(f"❌ 未找到题目 ID: {problem_id}")
-            return
-
         # 答案保护逻辑
         group_qq = str(event.get_group_id()) if event.get_group_id() else None
         if group_qq:
-            from datetime import datetime
+            # 题目、本群当天进度与最近推送时间一次取齐（优先走缓存）
+            gate = self.db.get_answer_gate(pid, group_qq)
+            if not gate:
+                yield event.plain_result(f"❌ 未找到题目 ID: {problem_id}")
+                return
+            problem, progress = gate.problem, gate.progress
 
             today = datetime.now().strftime("%Y-%m-%d")
-
-            is_admin = event.is_admin()
-            progress = self.db.get_problem_score_progress(pid, group_qq)
-            is_completed = progress.is_complete
-
-            last_push_date = None
-            with self.db.get_locked_cursor() as cursor:
-                cursor.execute(
-                    "SELECT last_push_time FROM problem_push_count WHERE group_qq = ? AND problem_id = ?",
-                    (group_qq, pid),
-                )
-                row = cursor.fetchone()
-                if row and row["last_push_time"]:
-                    last_push_date = row["last_push_time"][:10]
-
+            last_push_date = gate.last_push_time[:10] if gate.last_push_time else None
             is_active_today = (last_push_date == today) or (
                 progress.total_score > 0 or progress.covered_mask > 0
             )
             has_been_pushed = last_push_date is not None
 
             can_view = (
-                is_admin or is_completed or (not is_active_today and has_been_pushed)
+                event.is_admin()
+                or progress.is_complete
+                or (not is_active_today and has_been_pushed)
             )
 
             if not can_view:
@@ -309,6 +660,11 @@ class AnswerHandlers:
                     f"⚠️ 本题还剩 {remain} 分未被发掘，多看看提示再抢答一波吧！（或者等明天/下轮出新题后再来查看答案~）"
                 )
                 return
+        else:
+            problem = self.db.get_problem_by_id(pid)
+            if not problem:
+                yield event.plain_result(f"❌ 未找到题目 ID: {problem_id}")
+                return
 
         # 根据 use_ans 字段决定返回哪个答案
         use_ans = problem.use_ans or "default"
@@ -37,7 +37,8 @@ class QueryHandlers:
 /stra info <领域名> - 查看指定领域的推送进度
 /stra reset <领域名> - （管理员指令）重置指定领域的推送进度
 /pushnow {domain_name} - （管理员指令）立即触发一次推送
-/vans {problem_id} {default|llm|web} - （管理员指令）查看题目的特定答案字段"""
+/vans {problem_id} {default|llm|web} - （管理员指令）查看题目的特定答案字段
+/jstat [天数] - （管理员指令）查看判题延迟、用量与通过率统计"""
 
         yield event.plain_result(help_text)
 
@@ -104,6 +104,8 @@ class StrategyHandlers:
                 for config in active_configs:
                     self.db.set_strategy_type(group_qq, config.domain_id, strategy_type)
                     count += 1
+                if self.scheduler:
+                    self.scheduler.invalidate_prepared(group_qq=group_qq)
 
                 yield event.plain_result(
                     f"✅ 已将 {count} 个领域的推送策略切换为 [{strategy_type}]\n"
@@ -128,6 +130,10 @@ class StrategyHandlers:
                     self.db.init_group_domain_config(group_qq, domain.id)
 
                 self.db.set_strategy_type(group_qq, domain.id, strategy_type)
+                if self.scheduler:
+                    self.scheduler.invalidate_prepared(
+                        group_qq=group_qq, domain_id=domain.id
+                    )
                 yield event.plain_result(
                     f"✅ 已将领域 [{target}] 的推送策略切换为 [{strategy_type}]\n"
                     f"原有进度已保留，立即生效。"
@@ -170,6 +176,10 @@ class StrategyHandlers:
 
             strategy_type = self.db.get_strategy_type(group_qq, domain.id)
             self.db.reset_domain_progress(group_qq, domain.id, strategy_type)
+            if self.scheduler:
+                self.scheduler.invalidate_prepared(
+                    group_qq=group_qq, domain_id=domain.id
+                )
 
             yield event.plain_result(
                 f"✅ 已重置 [{domain_name}] 的推送进度\n当前策略: {strategy_type}"
@@ -48,6 +48,9 @@ class UserHandlers:
 
         user_qq = str(event.get_sender_id())
         success = self.db.subscribe_group(user_qq, group.id)
+        if success and self.scheduler:
+            # 订阅者变化后，已准备好的推送中的 @ 列表需要重新生成
+            self.scheduler.invalidate_prepared(study_group_id=group.id)
 
         if success:
             yield event.plain_result(f"✅ 成功加入小组 [{group_name}]")
@@ -76,6 +79,9 @@ class UserHandlers:
 
         user_qq = str(event.get_sender_id())
         success = self.db.unsubscribe_group(user_qq, group.id)
+        if success and self.scheduler:
+            # 订阅者变化后，已准备好的推送中的 @ 列表需要重新生成
+            self.scheduler.invalidate_prepared(study_group_id=group.id)
 
         if success:
             yield event.plain_result(f"✅ 成功退出小组 [{group_name}]")
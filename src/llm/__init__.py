@@ -1,3 +1,65 @@
-from .judge import build_judge_prompt_a, build_judge_prompt_b
+from .cache import JudgeCache
+from .guard import InFlightRegistry, SubmitRateLimiter, TokenBucket
+from .jobs import JudgeJobRunner
+from .judge import (
+    CompiledJudgePrompt,
+    JudgeBatcher,
+    JudgePromptCache,
+    build_batch_judge_prompt,
+    build_judge_prompt,
+    build_judge_prompt_a,
+    build_judge_prompt_b,
+    estimate_tokens,
+    judge_answer,
+    parse_score_points,
+    prompt_cache,
+)
+from .matcher import MatcherRegistry, ScorePointMatcher
+from .prescreen import PRESCREEN_RULES, AnswerPrescreener, PrescreenVerdict
+from .providers import (
+    CircuitBreaker,
+    HedgedProvider,
+    JudgeProviderPool,
+    provider_id,
+)
+from .queue import JudgeQueue, JudgeQueueFull
+from .stream import (
+    IncrementalJudgeParser,
+    loads_tolerant,
+    parse_judge_reply,
+    stream_completion,
+)
 
-__all__ = ["build_judge_prompt_a", "build_judge_prompt_b"]
+__all__ = [
+    "PRESCREEN_RULES",
+    "AnswerPrescreener",
+    "CircuitBreaker",
+    "CompiledJudgePrompt",
+    "HedgedProvider",
+    "InFlightRegistry",
+    "IncrementalJudgeParser",
+    "JudgeBatcher",
+    "JudgeCache",
+    "JudgeJobRunner",
+    "JudgePromptCache",
+    "JudgeProviderPool",
+    "JudgeQueue",
+    "JudgeQueueFull",
+    "MatcherRegistry",
+    "PrescreenVerdict",
+    "ScorePointMatcher",
+    "SubmitRateLimiter",
+    "TokenBucket",
+    "build_batch_judge_prompt",
+    "build_judge_prompt",
+    "build_judge_prompt_a",
+    "build_judge_prompt_b",
+    "estimate_tokens",
+    "judge_answer",
+    "loads_tolerant",
+    "parse_judge_reply",
+    "parse_score_points",
+    "prompt_cache",
+    "provider_id",
+    "stream_completion",
+]
@@ -0,0 +1,82 @@
+"""
+cache.py - 判题结果缓存
+
+同一道题、同一份评分标准下，规范化后相同的回答直接复用上一次的判题结果，
+不再调用 LLM。缓存只保存 LLM 的判定（是否有效、覆盖的知识点、点评），
+得分仍按当前群的抢分进度计算。
+"""
+
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+
+from ..repository.models import Problem
+
+
+def normalize_answer(text: str) -> str:
+    """规范化回答文本：全半角统一、忽略大小写、去掉空白和标点"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return "".join(
+        ch
+        for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith("P")
+    )
+
+
+def rubric_version(problem: Problem) -> str:
+    """评分标准版本：由评分知识点（无则为参考答案）和满分计算，内容变化即版本变化"""
+    rubric = problem.score_points or problem.default_ans or ""
+    raw = f"{rubric}\x00{problem.score or 10}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class JudgeCache:
+    """带 TTL 和容量上限的判题结果 LRU 缓存"""
+
+    def __init__(self, max_size: int = 2000, ttl: float = 86400):
+        """
+        Args:
+            max_size: 最大条目数，0 为关闭缓存
+            ttl: 条目有效期（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(problem: Problem, user_answer: str) -> str:
+        """缓存键：hash(题目ID, 评分标准版本, 规范化回答)"""
+        raw = f"{problem.id}\x00{rubric_version(problem)}\x00{normalize_answer(user_answer)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # 返回副本，避免调用方修改缓存内容
+        return dict(entry[0])
+
+    def put(self, key: str, judge_res: dict):
+        if not self.enabled:
+            return
+        self._entries[key] = (dict(judge_res), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
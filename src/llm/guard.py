@@ -0,0 +1,146 @@
+"""
+guard.py - 提交回答的防刷保护
+
+- InFlightRegistry：同一用户在同一群对同一道题只能有一份回答在评判中，
+  重复点击发送或评判期间再次提交时直接回复，不再发起 LLM 调用和数据库写入
+- SubmitRateLimiter：按用户、按群的令牌桶限流
+"""
+
+import time
+
+from .cache import normalize_answer
+
+
+class InFlightRegistry:
+    """正在评判中的回答登记表，键为 (用户, 群, 题目)"""
+
+    def __init__(self):
+        self._pending: dict[tuple[str, str, int], str] = {}
+        self.duplicates = 0
+        self.rejected = 0
+
+    def claim(self, user_key: str, group_key: str, problem_id: int, answer: str):
+        """
+        登记一份回答
+
+        Returns:
+            str | None: 成功登记返回 None；已有相同回答在评判中返回 "duplicate"；
+                已有其他回答在评判中返回 "busy"
+        """
+        key = (user_key, group_key, problem_id)
+        fingerprint = normalize_answer(answer)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = fingerprint
+            return None
+        if pending == fingerprint:
+            self.duplicates += 1
+            return "duplicate"
+        self.rejected += 1
+        return "busy"
+
+    def release(self, user_key: str, group_key: str, problem_id: int):
+        self._pending.pop((user_key, group_key, problem_id), None)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class TokenBucket:
+    """令牌桶：容量为 capacity，每秒补充 rate 个令牌"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """按键分桶的令牌桶限流，per_minute 为 0 时不限流"""
+
+    def __init__(self, burst: int, per_minute: float, max_keys: int = 10000):
+        self.burst = max(1, burst)
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets: dict[str, TokenBucket] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                # 已补满的桶与新建的桶等价，可以直接丢弃
+                now = time.monotonic()
+                self._buckets = {
+                    k: b for k, b in self._buckets.items() if not b.is_full(now)
+                }
+            bucket = self._buckets[key] = TokenBucket(self.burst, self.rate)
+        return bucket
+
+    def take(self, key: str) -> float:
+        """取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        if not self.enabled:
+            return 0.0
+        return self._bucket(key).take()
+
+    def refund(self, key: str):
+        if self.enabled and key in self._buckets:
+            self._buckets[key].refund()
+
+
+class SubmitRateLimiter:
+    """提交回答的限流：同时受用户和群两个令牌桶约束"""
+
+    def __init__(
+        self,
+        user_burst: int = 3,
+        user_per_minute: float = 3,
+        group_burst: int = 20,
+        group_per_minute: float = 20,
+    ):
+        self.users = RateLimiter(user_burst, user_per_minute)
+        self.groups = RateLimiter(group_burst, group_per_minute)
+        self.limited = 0
+
+    def check(self, user_key: str, group_key: str) -> tuple[str, float] | None:
+        """
+        检查并消耗一次提交额度
+
+        Returns:
+            tuple[str, float] | None: 允许时返回 None；被限流时返回 ("user" | "group", 需等待秒数)
+        """
+        wait = self.users.take(user_key)
+        if wait:
+            self.limited += 1
+            return "user", wait
+        wait = self.groups.take(group_key)
+        if wait:
+            # 群额度不足时退还已扣的用户额度
+            self.users.refund(user_key)
+            self.limited += 1
+            return "group", wait
+        return None
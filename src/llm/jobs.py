@@ -0,0 +1,175 @@
+"""
+jobs.py - 异步判题任务
+
+/a 提交的回答写入 judge_jobs 表后立即回执，由后台工作协程评判并把结果
+主动发回提交回答的会话，命令本身不再等待整个 LLM 请求：
+
+- 结算消息与得分、作答记录在同一事务中写回任务表，再发送；发送失败按
+  指数退避重试，不会重复结算
+- 重启时评判中断（尚未结算）的任务重新评判，已结算未发送的任务直接补发
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from astrbot.api import logger
+
+from ..repository import QuizRepository
+from ..repository.models import JudgeJob
+
+RunFunc = Callable[[JudgeJob], Awaitable[str]]
+SendFunc = Callable[[JudgeJob], Awaitable[bool]]
+ReleaseFunc = Callable[[JudgeJob], None]
+
+
+class JudgeJobRunner:
+    """异步判题任务队列及其工作协程"""
+
+    def __init__(
+        self,
+        db: QuizRepository,
+        run: RunFunc,
+        send: SendFunc,
+        workers: int = 8,
+        max_attempts: int = 3,
+        base_delay: float = 5,
+        release: ReleaseFunc | None = None,
+    ):
+        """
+        Args:
+            db: 数据库实例
+            run: 评判函数，接收任务，返回结算消息
+            send: 发送函数，接收已写入结算消息的任务，返回是否送达
+            workers: 工作协程数（LLM 并发仍由判题队列限制）
+            max_attempts: 最大发送次数
+            base_delay: 首次发送重试延迟（秒），之后每次翻倍
+            release: 待评判任务处理结束（含未抢到任务）时调用，用于释放提交登记
+        """
+        self.db = db
+        self.run = run
+        self.send = send
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(0.0, float(base_delay))
+        self.release = release
+        self._queue: asyncio.Queue[JudgeJob] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+
+    def start(self) -> list[JudgeJob]:
+        """
+        启动工作协程并恢复未完成的任务
+
+        Returns:
+            list[JudgeJob]: 恢复的任务（含待评判和待发送的）
+        """
+        recovered = self.db.recover_judge_jobs()
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted judge jobs")
+        purged = self.db.purge_judge_jobs()
+        if purged:
+            logger.info(f"Purged {purged} old judge jobs")
+
+        resumed = self.db.get_open_judge_jobs()
+        for job in resumed:
+            self._queue.put_nowait(job)
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} unfinished judge jobs")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return resumed
+
+    def stop(self):
+        """停止工作协程（未完成的任务保留在表中，下次启动继续）"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def submit(
+        self, user_qq: str, group_qq: str, problem_id: int, answer: str, umo: str
+    ) -> int:
+        """任务入队，返回任务 ID（即回执编号）"""
+        job_id = self.db.enqueue_judge_job(user_qq, group_qq, problem_id, answer, umo)
+        self._queue.put_nowait(
+            JudgeJob(
+                id=job_id,
+                user_qq=user_qq,
+                group_qq=group_qq,
+                problem_id=problem_id,
+                answer_text=answer,
+                umo=umo,
+            )
+        )
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                # 单个任务出错不能让工作协程退出
+                logger.error(f"Judge job #{job.id} failed: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def process(self, job: JudgeJob):
+        """评判（如尚未评判）并发送一个任务"""
+        if job.status == "pending":
+            try:
+                if not self.db.claim_judge_job(job.id, "pending", "judging"):
+                    return
+                try:
+                    reply = await self.run(job)
+                except Exception as e:  # noqa: BLE001
+                    # 评判失败（提供商、解析等任意错误）也要给用户一条结算消息
+                    logger.error(f"Judging job #{job.id} raised: {e}", exc_info=True)
+                    reply = f"❌ 判题出错了，请稍后重新提交 (ID: {job.problem_id})"
+            finally:
+                if self.release:
+                    self.release(job)
+            # 正常结算时消息已随结算写入，这里补记出错等未结算的情况
+            self.db.save_judge_reply(job.id, reply)
+            job.status = "judged"
+            job.reply = reply
+        await self._deliver(job)
+
+    async def _deliver(self, job: JudgeJob):
+        error = ""
+        try:
+            sent = await self.send(job)
+        except Exception as e:  # noqa: BLE001
+            # 发送由平台适配器完成，可能抛出任意异常，一律按发送失败重试
+            sent = False
+            error = str(e)
+
+        if sent:
+            self.db.claim_judge_job(job.id, "judged", "done")
+            self.completed += 1
+            return
+
+        job.attempts += 1
+        job.last_error = error or "no platform accepted the message"
+        if job.attempts >= self.max_attempts:
+            self.db.record_judge_delivery_failure(
+                job.id, job.attempts, job.last_error, "failed"
+            )
+            self.failed += 1
+            logger.error(
+                f"Final Failure: judge job #{job.id} reply to {job.umo} "
+                f"gave up after {job.attempts} attempts: {job.last_error}"
+            )
+            return
+
+        delay = self.base_delay * 2 ** (job.attempts - 1)
+        self.db.record_judge_delivery_failure(
+            job.id, job.attempts, job.last_error, "judged"
+        )
+        logger.warning(
+            f"Judge job #{job.id} reply attempt {job.attempts} failed, "
+            f"retrying in {delay:.0f}s: {job.last_error}"
+        )
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job)
@@ -2,11 +2,36 @@
 judge.py - LLM 判题逻辑，负责拼 prompt、调 API、解析结果
 """
 
+import asyncio
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import partial
+
+from astrbot.api import logger
+
+from ..repository.models import Problem
+from .cache import rubric_version
 from .prompts import (
+    JUDGE_ANSWER_A,
+    JUDGE_ANSWER_B,
+    JUDGE_ANSWERS_A_BATCH,
+    JUDGE_ANSWERS_B_BATCH,
+    JUDGE_BATCH_SUFFIX,
+    JUDGE_CONTEXT_A,
+    JUDGE_CONTEXT_B,
     JUDGE_SYSTEM_A,
     JUDGE_SYSTEM_B,
-    JUDGE_USER_A,
-    JUDGE_USER_B,
+)
+from .providers import provider_id
+from .queue import JudgeQueue
+from .stream import (
+    IncrementalJudgeParser,
+    check_judge_result,
+    extract_json_text,
+    parse_judge_reply,
+    stream_completion,
 )
 
 
@@ -18,6 +43,125 @@ def _fmt_score_points(score_points: list[dict]) -> str:
     return "\n".join(lines)
 
 
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符按 1 个 token，其余字符按 4 个一个 token"""
+    cjk = sum(
+        1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uf900" <= ch <= "\ufaff"
+    )
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class CompiledJudgePrompt:
+    """
+    预编译的单题判题提示词
+
+    系统提示词与题目上下文拼成固定前缀，每次请求只需填入用户回答。
+    """
+
+    def __init__(self, system: str, answer_template: str, batch_template: str):
+        self.system = system
+        self.batch_system = system + JUDGE_BATCH_SUFFIX
+        self.answer_template = answer_template
+        self.batch_template = batch_template
+
+    @classmethod
+    def for_score_points(
+        cls, domain: str, question: str, score_points: list[dict]
+    ) -> "CompiledJudgePrompt":
+        """精确评分模式（有 score_points）"""
+        context = JUDGE_CONTEXT_A.format(
+            domain=domain,
+            question=question,
+            score_points_text=_fmt_score_points(score_points),
+        )
+        return cls(JUDGE_SYSTEM_A + context, JUDGE_ANSWER_A, JUDGE_ANSWERS_A_BATCH)
+
+    @classmethod
+    def for_reference(
+        cls, domain: str, question: str, default_ans: str, max_score: int
+    ) -> "CompiledJudgePrompt":
+        """降级综合打分模式（无 score_points）"""
+        context = JUDGE_CONTEXT_B.format(
+            domain=domain,
+            question=question,
+            default_ans=default_ans,
+            max_score=max_score,
+        )
+        return cls(JUDGE_SYSTEM_B + context, JUDGE_ANSWER_B, JUDGE_ANSWERS_B_BATCH)
+
+    def render(self, user_answer: str) -> tuple[str, str]:
+        """返回 (system_prompt, user_prompt)"""
+        return self.system, self.answer_template.format(user_answer=user_answer)
+
+    def render_batch(self, user_answers: list[str]) -> tuple[str, str]:
+        """批量评判，回答按【回答 N】编号（N 从 1 开始），返回 (system_prompt, user_prompt)"""
+        answers_text = "\n\n".join(
+            f"【回答 {i}】\n{answer}" for i, answer in enumerate(user_answers, start=1)
+        )
+        return self.batch_system, self.batch_template.format(answers_text=answers_text)
+
+
+class JudgePromptCache:
+    """按题目缓存预编译的判题提示词，并统计发送的提示词体积"""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._prompts: dict[int, tuple[str, CompiledJudgePrompt]] = {}
+        self.compiled = 0
+        self.requests = 0
+        self.prompt_bytes = 0
+        self.prefix_bytes = 0
+        self.est_tokens = 0
+
+    def get(self, problem: Problem, score_points: list[dict]) -> CompiledJudgePrompt:
+        version = rubric_version(problem)
+        entry = self._prompts.get(problem.id)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        domain_name = problem.domain_name or "未知领域"
+        if score_points:
+            compiled = CompiledJudgePrompt.for_score_points(
+                domain_name, problem.question or "", score_points
+            )
+        else:
+            compiled = CompiledJudgePrompt.for_reference(
+                domain_name,
+                problem.question or "",
+                problem.default_ans or "",
+                problem.score or 10,
+            )
+        if len(self._prompts) >= self.max_size:
+            self._prompts.clear()
+        self._prompts[problem.id] = (version, compiled)
+        self.compiled += 1
+        return compiled
+
+    def record(self, system_prompt: str, user_prompt: str):
+        """记录一次实际发出的请求：总字节数、可复用前缀字节数与估算 token 数"""
+        system_bytes = len(system_prompt.encode("utf-8"))
+        self.requests += 1
+        self.prefix_bytes += system_bytes
+        self.prompt_bytes += system_bytes + len(user_prompt.encode("utf-8"))
+        self.est_tokens += estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+
+    def stats(self) -> dict:
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "compiled_prompts": self.compiled,
+            "prompt_bytes": self.prompt_bytes,
+            "prefix_ratio": round(self.prefix_bytes / (self.prompt_bytes or 1), 3),
+            "avg_prompt_bytes": self.prompt_bytes // requests,
+            "est_tokens": self.est_tokens,
+            "avg_est_tokens": self.est_tokens // requests,
+        }
+
+
+# 进程内共享的提示词缓存
+prompt_cache = JudgePromptCache()
+
+
 def build_judge_prompt_a(
     domain: str,
     question: str,
@@ -28,13 +172,9 @@ def build_judge_prompt_a(
     精确评分模式（有 score_points）。
     返回 (system_prompt, user_prompt)
     """
-    user = JUDGE_USER_A.format(
-        domain=domain,
-        question=question,
-        score_points_text=_fmt_score_points(score_points),
-        user_answer=user_answer,
+    return CompiledJudgePrompt.for_score_points(domain, question, score_points).render(
+        user_answer
     )
-    return JUDGE_SYSTEM_A, user
 
 
 def build_judge_prompt_b(
@@ -48,11 +188,347 @@ def build_judge_prompt_b(
     降级综合打分模式（无 score_points）。
     返回 (system_prompt, user_prompt)
     """
-    user = JUDGE_USER_B.format(
-        domain=domain,
-        question=question,
-        default_ans=default_ans,
-        max_score=max_score,
-        user_answer=user_answer,
-    )
-    return JUDGE_SYSTEM_B, user
+    return CompiledJudgePrompt.for_reference(
+        domain, question, default_ans, max_score
+    ).render(user_answer)
+
+
+def parse_score_points(score_points_raw: str | None) -> list[dict]:
+    """解析题目的 score_points JSON，无效或为空时返回空列表"""
+    if not score_points_raw:
+        return []
+    try:
+        score_points = json.loads(score_points_raw)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return score_points if isinstance(score_points, list) else []
+
+
+def build_judge_prompt(
+    problem: Problem, score_points: list[dict], user_answer: str
+) -> tuple[str, str]:
+    """根据题目是否有 score_points 选择评分模式，返回 (system_prompt, user_prompt)"""
+    return prompt_cache.get(problem, score_points).render(user_answer)
+
+
+def _is_clean_json(llm_reply: str) -> bool:
+    """回复去掉围栏后直接就是合法 JSON（无需补全）"""
+    try:
+        json.loads(extract_json_text(llm_reply).rstrip())
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+async def _request(prov, trace: dict | None, on_text=None, **kwargs):
+    """
+    发出一次判题请求，trace 传入时记录提供商、耗时、回复体积与请求结果
+
+    对冲提供商自行记录实际给出结果的提供商 ID。
+    """
+    started = time.perf_counter()
+    try:
+        if getattr(prov, "hedged", False):
+            resp = await prov.text_chat(on_text=on_text, trace=trace, **kwargs)
+        elif on_text:
+            resp = await stream_completion(prov, partial(on_text, ""), **kwargs)
+        else:
+            resp = await prov.text_chat(**kwargs)
+    except Exception as e:
+        if trace is not None:
+            if isinstance(e, json.JSONDecodeError):
+                trace["parse"] = "failed"
+            else:
+                trace["parse"] = "timeout" if isinstance(e, TimeoutError) else "error"
+        raise
+    finally:
+        if trace is not None:
+            trace.setdefault("provider_id", provider_id(prov))
+            trace["latency_ms"] = int((time.perf_counter() - started) * 1000)
+    if trace is not None:
+        completion = resp.completion_text or ""
+        trace["completion_bytes"] = len(completion.encode("utf-8"))
+        trace["est_tokens"] = trace.get("est_tokens", 0) + estimate_tokens(completion)
+    return resp
+
+
+def _trace_prompt(trace: dict | None, sys_p: str, user_p: str):
+    if trace is not None:
+        trace["prompt_bytes"] = len(sys_p.encode("utf-8")) + len(user_p.encode("utf-8"))
+        trace["est_tokens"] = estimate_tokens(sys_p) + estimate_tokens(user_p)
+
+
+async def judge_answer(
+    prov,
+    problem: Problem,
+    score_points: list[dict],
+    user_answer: str,
+    on_partial: Callable[[dict], None] | None = None,
+    trace: dict | None = None,
+) -> dict:
+    """
+    调用 LLM 评判一次回答
+
+    Args:
+        on_partial: 传入时以流式方式请求，valid、covered_indices 等字段一出现
+            即以已解析字段调用一次（提供商不支持流式时在完整回复后调用）
+        trace: 传入时写入本次请求的遥测数据（provider_id、latency_ms、prompt_bytes、
+            completion_bytes、est_tokens、parse）
+
+    Raises:
+        json.JSONDecodeError: LLM 回复解析失败
+        Exception: 请求失败
+    """
+    sys_p, user_p = build_judge_prompt(problem, score_points, user_answer)
+    prompt_cache.record(sys_p, user_p)
+    _trace_prompt(trace, sys_p, user_p)
+    kwargs = {
+        "prompt": user_p,
+        "system_prompt": sys_p,
+        "temperature": 0.3,  # Optional: Might not be supported directly by AstrBot text_chat config
+    }
+
+    on_text = None
+    if on_partial is not None:
+        # 对冲请求时每个提供商的回复分别解析
+        parsers: dict[str, IncrementalJudgeParser] = {}
+
+        def on_text(source: str, chunk: str):
+            parser = parsers.setdefault(source, IncrementalJudgeParser())
+            if parser.feed(chunk):
+                on_partial(dict(parser.fields))
+
+    resp = await _request(prov, trace, on_text, **kwargs)
+    try:
+        judge_res = check_judge_result(
+            parse_judge_reply(resp.completion_text), resp.completion_text
+        )
+    except json.JSONDecodeError:
+        if trace is not None:
+            trace["parse"] = "failed"
+        raise
+    if trace is not None:
+        trace["parse"] = "ok" if _is_clean_json(resp.completion_text) else "repaired"
+    return judge_res
+
+
+def build_batch_judge_prompt(
+    problem: Problem, score_points: list[dict], user_answers: list[str]
+) -> tuple[str, str]:
+    """
+    批量评判同一题目的多份回答，回答按【回答 N】编号（N 从 1 开始）。
+    返回 (system_prompt, user_prompt)
+    """
+    return prompt_cache.get(problem, score_points).render_batch(user_answers)
+
+
+@dataclass
+class _PendingBatch:
+    """等待合并评判的一批回答"""
+
+    prov: object
+    problem: Problem
+    score_points: list[dict]
+    group_key: str
+    user_key: str
+    answers: list[str] = field(default_factory=list)
+    futures: list[asyncio.Future] = field(default_factory=list)
+    traces: list[dict | None] = field(default_factory=list)
+    keys: list[tuple[str, str]] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class JudgeBatcher:
+    """
+    微批量判题：短时间窗口内同一题目的回答合并为一次 LLM 请求
+
+    合并后的请求同样经由判题队列执行，按批次中第一份回答的群和用户参与轮转；
+    批量结果缺失或不完整的回答各自排队单独补判，按各自的群和用户轮转。
+    """
+
+    def __init__(self, queue: JudgeQueue, window: float = 1.5, max_batch: int = 5):
+        """
+        Args:
+            queue: 判题队列
+            window: 合并等待窗口（秒）
+            max_batch: 单次请求最多合并的回答数，达到后立即发出
+        """
+        self.queue = queue
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending: dict[tuple, _PendingBatch] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.calls = 0
+        self.answers = 0
+
+    async def judge(
+        self,
+        prov,
+        problem: Problem,
+        score_points: list[dict],
+        user_answer: str,
+        group_key: str,
+        user_key: str,
+        trace: dict | None = None,
+    ) -> dict:
+        """
+        提交一份回答，等待所在批次评判完成后返回该回答的判题结果
+
+        trace 传入时写入遥测数据，合并请求的耗时与体积按回答数均摊。
+
+        Raises:
+            JudgeQueueFull: 判题队列已满
+            json.JSONDecodeError: LLM 回复解析失败
+        """
+        key = (problem.id, rubric_version(problem), id(prov))
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(
+                prov, problem, score_points, group_key, user_key
+            )
+            batch.timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush, key
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        batch.answers.append(user_answer)
+        batch.futures.append(future)
+        batch.traces.append(trace)
+        batch.keys.append((group_key, user_key))
+        if len(batch.answers) >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _PendingBatch):
+        try:
+            ticket = self.queue.submit(
+                batch.group_key,
+                batch.user_key,
+                partial(self._judge_batch, batch),
+            )
+            results = await ticket
+        except Exception as e:  # noqa: BLE001
+            # 整批失败时原样转交给每个等待中的提交，由调用方按错误类型处理
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        rejudges = []
+        for i, (future, result) in enumerate(zip(batch.futures, results)):
+            if future.done():
+                continue
+            if result is None:
+                rejudges.append(self._rejudge(batch, i))
+            else:
+                future.set_result(result)
+        if rejudges:
+            await asyncio.gather(*rejudges)
+
+    async def _rejudge(self, batch: _PendingBatch, index: int):
+        """批量结果中缺失或不完整的回答单独排队补判"""
+        future = batch.futures[index]
+        group_key, user_key = batch.keys[index]
+        self.calls += 1
+        try:
+            ticket = self.queue.submit(
+                group_key,
+                user_key,
+                partial(
+                    judge_answer,
+                    batch.prov,
+                    batch.problem,
+                    batch.score_points,
+                    batch.answers[index],
+                    trace=batch.traces[index],
+                ),
+            )
+            result = await ticket
+        except Exception as e:  # noqa: BLE001
+            # 单份补判失败只影响这一份回答，错误交给它的提交方
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _judge_batch(self, batch: _PendingBatch) -> list[dict | None]:
+        """评判一批回答，返回与回答一一对应的结果，缺失或不完整的为 None"""
+        if len(batch.answers) == 1:
+            self.calls += 1
+            self.answers += 1
+            return [
+                await judge_answer(
+                    batch.prov,
+                    batch.problem,
+                    batch.score_points,
+                    batch.answers[0],
+                    trace=batch.traces[0],
+                )
+            ]
+
+        sys_p, user_p = build_batch_judge_prompt(
+            batch.problem, batch.score_points, batch.answers
+        )
+        prompt_cache.record(sys_p, user_p)
+        trace: dict = {}
+        _trace_prompt(trace, sys_p, user_p)
+        try:
+            resp = await _request(
+                batch.prov, trace, prompt=user_p, system_prompt=sys_p, temperature=0.3
+            )
+        finally:
+            # 合并请求的体积按回答数均摊到每份回答
+            size = len(batch.answers)
+            for answer_trace in batch.traces:
+                if answer_trace is not None:
+                    answer_trace.update(trace)
+                    answer_trace["batch_size"] = size
+                    for name in ("prompt_bytes", "completion_bytes", "est_tokens"):
+                        if name in trace:
+                            answer_trace[name] = trace[name] // size
+        self.calls += 1
+        self.answers += len(batch.answers)
+        logger.debug(
+            f"Judged {len(batch.answers)} answers for problem {batch.problem.id} "
+            f"in one call ({self.answers / self.calls:.2f} answers/call overall)"
+        )
+
+        by_id = {}
+        try:
+            reply = parse_judge_reply(resp.completion_text)
+            items = reply.get("results", []) if isinstance(reply, dict) else reply
+            for item in items:
+                if not (isinstance(item, dict) and isinstance(item.get("id"), int)):
+                    continue
+                item_id = item.pop("id")
+                try:
+                    # 缺少 valid 的结果不能当作判定，交给下面单独补判
+                    by_id[item_id] = check_judge_result(item, resp.completion_text)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Batch judge result for answer {item_id} is incomplete, "
+                        "judging it alone"
+                    )
+        except json.JSONDecodeError as e:
+            logger.warning(f"Batch judge reply unparsable, judging one by one: {e}")
+
+        parse = "ok" if _is_clean_json(resp.completion_text) else "repaired"
+        results = []
+        for i, answer_trace in enumerate(batch.traces, start=1):
+            result = by_id.get(i)
+            if result is not None and answer_trace is not None:
+                answer_trace["parse"] = parse
+            # 缺失或不完整的回答由 _run 单独排队补判
+            results.append(result)
+        return results
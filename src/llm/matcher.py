@@ -0,0 +1,131 @@
+"""
+matcher.py - 知识点关键词匹配
+
+判题提示词要求"黑话题"必须说出专有名词（如 三色标记法、写屏障、STW），
+这类知识点可以直接按关键词判断是否命中。匹配器按题目预编译：
+
+- 每个知识点的关键词来自 score_points 中可选的 keywords 字段（别名列表），
+  以及 point 文本中的英文缩写（如 STW、GC、GMP）
+- 标记了 "local": true 的知识点只按关键词判定，不以 LLM 结果为准；
+  一道题的知识点全部为 local 时整题在本地评判，不调用 LLM
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from ..repository.models import Problem
+from .cache import rubric_version
+
+# point 文本中的英文缩写 / 术语，如 STW、GC、GMP、CAS
+_ACRONYM_RE = re.compile(r"\b[A-Z][A-Z0-9]{1,7}\b")
+_ASCII_TERM_RE = re.compile(r"[a-z0-9][a-z0-9 ._+-]*")
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _term_pattern(term: str) -> str:
+    """英文术语按单词边界匹配（避免 GC 命中其他单词的一部分），中文术语按子串匹配"""
+    escaped = re.escape(term)
+    if _ASCII_TERM_RE.fullmatch(term):
+        return rf"(?<![a-z0-9]){escaped}(?![a-z0-9])"
+    return escaped
+
+
+@dataclass
+class _CompiledPoint:
+    idx: int
+    point: str
+    local: bool
+    pattern: re.Pattern | None
+
+
+class ScorePointMatcher:
+    """单道题的知识点关键词匹配器"""
+
+    def __init__(self, score_points: list[dict]):
+        self.points: list[_CompiledPoint] = []
+        for sp in score_points:
+            idx = sp.get("idx")
+            if idx is None:
+                continue
+            keywords = [str(k) for k in sp.get("keywords") or [] if str(k).strip()]
+            keywords += _ACRONYM_RE.findall(sp.get("point", ""))
+            # 全半角统一、忽略大小写，按长度降序优先匹配长词
+            terms = sorted(
+                {_normalize(k).strip() for k in keywords} - {""}, key=len, reverse=True
+            )
+            pattern = (
+                re.compile("|".join(_term_pattern(term) for term in terms))
+                if terms
+                else None
+            )
+            self.points.append(
+                _CompiledPoint(idx, sp.get("point", ""), bool(sp.get("local")), pattern)
+            )
+
+    @property
+    def has_keywords(self) -> bool:
+        return any(p.pattern for p in self.points)
+
+    @property
+    def local_indices(self) -> set[int]:
+        return {p.idx for p in self.points if p.local}
+
+    @property
+    def all_local(self) -> bool:
+        return bool(self.points) and all(p.local for p in self.points)
+
+    def match(self, user_answer: str) -> list[int]:
+        """返回回答中按关键词命中的知识点编号"""
+        normalized = _normalize(user_answer)
+        return [
+            p.idx for p in self.points if p.pattern and p.pattern.search(normalized)
+        ]
+
+    def point_names(self, indices: list[int]) -> list[str]:
+        return [p.point for p in self.points if p.idx in indices]
+
+    def local_verdict(self, user_answer: str) -> dict:
+        """整题本地评判（所有知识点均为 local）时的判题结果"""
+        matched = self.match(user_answer)
+        if matched:
+            feedback = "关键术语说得很到位！"
+        else:
+            feedback = "本题考查关键术语，回答中要准确说出专有名词哦"
+        return {
+            "ai_copied": False,
+            "valid": bool(matched),
+            "covered_indices": matched,
+            "feedback": feedback,
+        }
+
+    def merge(self, judge_res: dict, user_answer: str) -> dict:
+        """用本地匹配结果覆盖 LLM 判题结果中 local 知识点的命中情况"""
+        local = self.local_indices
+        if not local or "covered_indices" not in judge_res:
+            return judge_res
+        covered = [i for i in judge_res.get("covered_indices", []) if i not in local]
+        covered += [i for i in self.match(user_answer) if i in local]
+        return {**judge_res, "covered_indices": covered}
+
+
+class MatcherRegistry:
+    """按题目缓存预编译的匹配器，评分标准变化后自动重新编译"""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._matchers: dict[int, tuple[str, ScorePointMatcher]] = {}
+
+    def get(self, problem: Problem, score_points: list[dict]) -> ScorePointMatcher:
+        version = rubric_version(problem)
+        entry = self._matchers.get(problem.id)
+        if entry and entry[0] == version:
+            return entry[1]
+        if len(self._matchers) >= self.max_size:
+            self._matchers.clear()
+        matcher = ScorePointMatcher(score_points)
+        self._matchers[problem.id] = (version, matcher)
+        return matcher
@@ -0,0 +1,153 @@
+"""
+prescreen.py - 判题前的本地规则预筛
+
+JUDGE_SYSTEM_A 中有几条规则可以在本地直接判断。明显命中时直接给出判定，
+不再调用 LLM；拿不准的一律放行交给 LLM（与判题提示词"宁可放行"的原则一致）。
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+from ..repository.models import Problem
+from .cache import normalize_answer
+
+# 多级 Markdown 标题（## / ###）
+_HEADING_RE = re.compile(r"^\s{0,3}#{2,6}\s+\S", re.MULTILINE)
+# 加粗分点：**词**：内容 或 - **词**
+_BOLD_BULLET_RE = re.compile(
+    r"^\s*(?:[-*+]|\d+[.)])?\s*\*\*[^*\n]+\*\*\s*[:：]?", re.MULTILINE
+)
+# 成句的标点
+_SENTENCE_PUNCT = set("，。；！？,.;!?、")
+# 常见虚词：关键词堆砌的回答中通常一个都没有
+_FUNCTION_CHARS = set("是的了就会在把被要能可以因为所以如果而且但然后时候这那它")
+# 关键词规则只认由汉字组成的短词；虚词表只覆盖中文，含英文单词的回答无从判断
+_SHORT_CJK_TOKEN_RE = re.compile(r"[\u4e00-\u9fff]{1,8}")
+# 预筛规则及其说明（/jstat 展示用）
+PRESCREEN_RULES = {
+    "copied_markdown": "疑似粘贴教程",
+    "junk": "无意义内容",
+    "keywords_only": "关键词堆砌",
+    "off_topic": "与题目无关",
+}
+# 没有实际内容的回答
+_JUNK_ANSWERS = {"不会", "不知道", "好难", "太难了", "不懂", "不清楚", "pass", "跳过"}
+
+
+@dataclass
+class PrescreenVerdict:
+    """预筛判定：rule 为命中的规则，judge_res 与 LLM 判题结果格式相同"""
+
+    rule: str
+    judge_res: dict
+
+
+def _looks_copied(answer: str) -> bool:
+    """多级标题与大量加粗分点同时出现，且篇幅像教程"""
+    headings = len(_HEADING_RE.findall(answer))
+    bold_bullets = len(_BOLD_BULLET_RE.findall(answer))
+    return headings >= 2 and bold_bullets >= 3 and len(answer) >= 150
+
+
+def _is_junk(answer: str) -> bool:
+    """纯表情、纯标点或无意义的感叹"""
+    normalized = normalize_answer(answer)
+    if not normalized or normalized in _JUNK_ANSWERS:
+        return True
+    if not any(unicodedata.category(ch)[0] in "LN" for ch in normalized):
+        return True
+    # 同一个字符反复出现（"哈哈哈哈哈"、"aaaaaa"）
+    return len(set(normalized)) <= 2
+
+
+def _is_keyword_list(answer: str) -> bool:
+    """关键词堆砌：多个汉字短词以空白分隔，没有成句标点也没有虚词"""
+    tokens = answer.split()
+    if len(tokens) < 3 or "\n" in answer.strip():
+        return False
+    if not all(_SHORT_CJK_TOKEN_RE.fullmatch(token) for token in tokens):
+        return False
+    if any(ch in _SENTENCE_PUNCT for ch in answer):
+        return False
+    return not any(ch in _FUNCTION_CHARS for ch in answer)
+
+
+def _bigrams(text: str) -> set[str]:
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _misses_rubric(answer: str, problem: Problem, score_points: list[dict]) -> bool:
+    """回答与题目、知识点、参考答案没有任何相同的字符二元组"""
+    normalized = normalize_answer(answer)
+    if len(normalized) < 10:
+        return False
+    rubric = " ".join(
+        [problem.question or "", problem.default_ans or ""]
+        + [f"{sp.get('point', '')} {sp.get('hint', '')}" for sp in score_points]
+    )
+    return not (_bigrams(normalized) & _bigrams(normalize_answer(rubric)))
+
+
+class AnswerPrescreener:
+    """本地规则预筛，统计各规则命中次数（即节省的 LLM 调用数）"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counters: Counter = Counter()
+
+    @property
+    def saved_calls(self) -> int:
+        return sum(v for k, v in self.counters.items() if k != "passed")
+
+    def check(
+        self, problem: Problem, score_points: list[dict], user_answer: str
+    ) -> PrescreenVerdict | None:
+        """
+        预筛一份回答
+
+        Returns:
+            PrescreenVerdict | None: 明确命中规则时返回判定，否则返回 None 交给 LLM
+        """
+        if not self.enabled:
+            return None
+
+        if _looks_copied(user_answer):
+            verdict = PrescreenVerdict(
+                "copied_markdown",
+                {
+                    "ai_copied": True,
+                    "valid": False,
+                    "feedback": "多级标题加大量加粗分点，像是直接粘贴的教程，用自己的话说说吧",
+                },
+            )
+        elif _is_junk(user_answer):
+            verdict = PrescreenVerdict(
+                "junk",
+                {"ai_copied": False, "valid": False, "feedback": "没有看到实际内容哦"},
+            )
+        elif _is_keyword_list(user_answer):
+            verdict = PrescreenVerdict(
+                "keywords_only",
+                {
+                    "ai_copied": False,
+                    "valid": False,
+                    "feedback": "只有关键词堆砌，试着把它们串成完整的解释吧",
+                },
+            )
+        elif _misses_rubric(user_answer, problem, score_points):
+            verdict = PrescreenVerdict(
+                "off_topic",
+                {
+                    "ai_copied": False,
+                    "valid": False,
+                    "feedback": "回答和这道题的内容没有交集，再读读题目吧",
+                },
+            )
+        else:
+            self.counters["passed"] += 1
+            return None
+
+        self.counters[verdict.rule] += 1
+        return verdict
@@ -0,0 +1,302 @@
+"""
+providers.py - 多提供商判题与对冲请求
+
+判题请求按配置的提供商顺序发出，每次调用都有超时：
+- 首个提供商超过对冲阈值仍未返回时，向下一个提供商再发一次相同请求，
+  取先返回的有效 JSON，另一个请求随即取消
+- 提供商报错、超时或返回无法解析的内容时立即换下一个提供商
+- 每个提供商维护熔断状态：连续失败达到阈值后在冷却期内跳过，
+  冷却结束后放行一次探测请求，成功即恢复
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from functools import partial
+
+from astrbot.api import logger
+
+from .stream import check_judge_result, parse_judge_reply, stream_completion
+
+
+def provider_id(prov) -> str:
+    """提供商 ID，取不到时以对象标识代替"""
+    try:
+        return str(prov.meta().id)
+    except (AttributeError, TypeError):
+        return f"provider_{id(prov)}"
+
+
+def _accept_json(resp) -> bool:
+    """回复能解析为判题 JSON（单份结果或批量 results）时才算有效，否则抛出 json.JSONDecodeError"""
+    reply = parse_judge_reply(resp.completion_text)
+    if not (isinstance(reply, dict) and "results" in reply):
+        check_judge_result(reply, resp.completion_text)
+    return True
+
+
+class CircuitBreaker:
+    """单个提供商的熔断状态"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 熔断后的冷却时间（秒），冷却结束后放行一次探测请求
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    @property
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def begin(self):
+        """发出请求前调用：半开状态下只放行这一个探测请求"""
+        if self.opened_at is not None:
+            self._probing = True
+
+    def cancel(self):
+        """请求被取消（对冲落败），不计入成功或失败"""
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回本次是否触发熔断"""
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class HedgedProvider:
+    """
+    绑定了一组候选提供商的判题入口，用法与单个提供商的 text_chat 相同
+
+    额外支持 on_text 参数：传入时以流式方式请求，按 (提供商 ID, 片段) 回调；
+    trace 参数：传入时写入实际给出结果（或最后失败）的提供商 ID。
+    """
+
+    hedged = True
+
+    def __init__(self, pool: "JudgeProviderPool", candidates: list[tuple[str, object]]):
+        self.pool = pool
+        self.candidates = candidates
+
+    async def text_chat(
+        self,
+        on_text: Callable[[str, str], None] | None = None,
+        trace: dict | None = None,
+        **kwargs,
+    ):
+        return await self.pool.text_chat(
+            self.candidates, on_text=on_text, trace=trace, **kwargs
+        )
+
+
+class JudgeProviderPool:
+    """按顺序、带超时、对冲和熔断地调用多个判题提供商"""
+
+    def __init__(
+        self,
+        timeout: float = 30,
+        hedge_after: float = 8,
+        failure_threshold: int = 3,
+        cooldown: float = 60,
+        accept: Callable[[object], bool] = _accept_json,
+    ):
+        """
+        Args:
+            timeout: 单次调用超时（秒）
+            hedge_after: 超过该时间仍未返回时向下一个提供商发出对冲请求（秒），0 为关闭
+            failure_threshold: 连续失败多少次后熔断该提供商
+            cooldown: 熔断冷却时间（秒）
+            accept: 校验回复是否有效，无效时抛出异常
+        """
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.accept = accept
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._bound: dict[tuple[str, ...], HedgedProvider] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.timeouts = 0
+
+    def breaker(self, pid: str) -> CircuitBreaker:
+        breaker = self.breakers.get(pid)
+        if breaker is None:
+            breaker = self.breakers[pid] = CircuitBreaker(
+                self.failure_threshold, self.cooldown
+            )
+        return breaker
+
+    def bind(self, candidates: list[tuple[str, object]]) -> HedgedProvider:
+        """
+        绑定候选提供商列表（按优先级排序的 (ID, 提供商)）
+
+        相同的候选列表返回同一个对象，便于微批量按提供商合并请求。
+        """
+        key = tuple(pid for pid, _ in candidates)
+        bound = self._bound.get(key)
+        if bound is None:
+            bound = self._bound[key] = HedgedProvider(self, candidates)
+        else:
+            bound.candidates = candidates
+        return bound
+
+    def _order(self, candidates: list[tuple[str, object]]) -> list[tuple[str, object]]:
+        """跳过熔断中的提供商；全部熔断时仍按原顺序尝试，不直接拒绝判题"""
+        available = [c for c in candidates if self.breaker(c[0]).available]
+        return available or list(candidates)
+
+    async def _attempt(self, pid: str, prov, kwargs: dict, on_text=None):
+        breaker = self.breaker(pid)
+        breaker.begin()
+        if on_text:
+            request = stream_completion(prov, partial(on_text, pid), **kwargs)
+        else:
+            request = prov.text_chat(**kwargs)
+        try:
+            resp = await asyncio.wait_for(request, self.timeout)
+            self.accept(resp)
+        except asyncio.CancelledError:
+            breaker.cancel()
+            raise
+        except TimeoutError as e:
+            self.timeouts += 1
+            error = TimeoutError(f"provider {pid} timed out after {self.timeout}s")
+            self._record_failure(pid, error)
+            raise error from e
+        except Exception as e:
+            self._record_failure(pid, e)
+            raise
+        breaker.record_success()
+        return resp
+
+    def _record_failure(self, pid: str, error: Exception):
+        breaker = self.breaker(pid)
+        if breaker.record_failure():
+            logger.warning(
+                f"Judge provider {pid} circuit opened after "
+                f"{breaker.failures} consecutive failures: {error}"
+            )
+
+    async def text_chat(
+        self,
+        candidates: list[tuple[str, object]],
+        on_text: Callable[[str, str], None] | None = None,
+        trace: dict | None = None,
+        **kwargs,
+    ):
+        """
+        依次 / 对冲地调用候选提供商，返回第一个有效的回复
+
+        on_text 传入时以流式方式请求，每收到一个片段以 (提供商 ID, 片段) 调用一次；
+        对冲时最先吐出片段的提供商胜出，其余请求随即取消，片段只会来自给出结果的提供商
+        （它失败转移时除外）。trace 传入时写入给出结果（或最后失败）的提供商 ID
+        及是否发出了对冲请求。
+
+        Raises:
+            json.JSONDecodeError | TimeoutError | Exception: 所有候选提供商均失败时的最后一个错误
+        """
+        if not candidates:
+            raise RuntimeError("no judge provider available")
+
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        remaining = self._order(candidates)
+        pending: dict[asyncio.Task, str] = {}
+        last_error: Exception | None = None
+        # 正在流式输出的提供商
+        streaming: str | None = None
+
+        def forward(pid: str, chunk: str):
+            nonlocal streaming, hedge_at
+            if streaming is None:
+                # 首个吐出片段的提供商赢得对冲，取消其余请求，避免先行结果来自落败的一方
+                streaming = pid
+                hedge_at = None
+                for task, other in pending.items():
+                    if other != pid:
+                        task.cancel()
+            if pid == streaming:
+                on_text(pid, chunk)
+
+        def launch():
+            pid, prov = remaining.pop(0)
+            task = asyncio.create_task(
+                self._attempt(pid, prov, kwargs, forward if on_text else None)
+            )
+            pending[task] = pid
+            return task
+
+        hedge_at = loop.time() + self.hedge_after if self.hedge_after > 0 else None
+        first_task = launch()
+        try:
+            while pending:
+                wait_timeout = None
+                if hedge_at is not None and remaining:
+                    wait_timeout = max(0.0, hedge_at - loop.time())
+                done, _ = await asyncio.wait(
+                    pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 超过对冲阈值仍未返回，向下一个提供商发出相同请求
+                    hedge_at = None
+                    self.hedged += 1
+                    if trace is not None:
+                        trace["hedged"] = True
+                    logger.debug(
+                        f"Judge providers {list(pending.values())} slow, "
+                        f"hedging to {remaining[0][0]}"
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    pid = pending.pop(task)
+                    if task.cancelled():
+                        continue
+                    if trace is not None:
+                        trace["provider_id"] = pid
+                    if task.exception() is None:
+                        if task is not first_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"Judge provider {pid} failed: {last_error}")
+                    if pid == streaming:
+                        # 失败转移后由下一个提供商接着流式输出
+                        streaming = None
+
+                if not pending and remaining:
+                    # 当前提供商失败，立即换下一个
+                    self.failovers += 1
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
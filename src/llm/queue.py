@@ -0,0 +1,193 @@
+"""
+queue.py - 判题任务队列
+
+所有 LLM 判题请求经由队列执行：限制全局同时进行的请求数，
+排队的任务在群之间、同一群的用户之间轮转出队，避免单个活跃群占满判题能力；
+队列超出容量时直接拒绝，由调用方明确告知用户稍后再试。
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from astrbot.api import logger
+
+
+class JudgeQueueFull(Exception):
+    """判题队列已满，本次请求被拒绝"""
+
+
+class JudgeTicket:
+    """一次排队中的判题任务"""
+
+    def __init__(self, group_key: str, user_key: str, job: Callable[[], Awaitable]):
+        self.group_key = group_key
+        self.user_key = user_key
+        self.job = job
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        # 排队期间所在的队列，出队后置空
+        self.queue: JudgeQueue | None = None
+
+    def __await__(self):
+        return self.future.__await__()
+
+    def cancel(self):
+        """放弃等待结果；仍在排队时从队列中移除，已完成时无影响"""
+        self.future.cancel()
+        if self.queue is not None:
+            self.queue._discard(self)
+
+
+class JudgeQueue:
+    """带全局并发上限、按群/用户轮转出队和容量上限的判题队列"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        max_queued: int = 50,
+        max_queued_per_group: int = 10,
+    ):
+        """
+        Args:
+            max_in_flight: 同时进行的判题请求上限
+            max_queued: 排队任务总数上限，超出后拒绝
+            max_queued_per_group: 单个群排队任务上限，超出后拒绝
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max_queued
+        self.max_queued_per_group = max_queued_per_group
+        self.in_flight = 0
+        self.shed_count = 0
+        # 群 -> 用户 -> 任务队列；OrderedDict 的顺序即轮转顺序
+        self._waiting: OrderedDict[str, OrderedDict[str, deque[JudgeTicket]]] = (
+            OrderedDict()
+        )
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def queued(self) -> int:
+        return sum(
+            len(tickets)
+            for users in self._waiting.values()
+            for tickets in users.values()
+        )
+
+    def submit(
+        self, group_key: str, user_key: str, job: Callable[[], Awaitable[Any]]
+    ) -> JudgeTicket:
+        """
+        提交判题任务，返回可 await 的任务票据
+
+        Raises:
+            JudgeQueueFull: 队列或该群的排队数已达上限
+        """
+        ticket = JudgeTicket(group_key, user_key, job)
+        if self.in_flight < self.max_in_flight and not self._waiting:
+            self._start(ticket)
+            return ticket
+
+        group_queued = sum(len(t) for t in self._waiting.get(group_key, {}).values())
+        if self.queued >= self.max_queued or group_queued >= self.max_queued_per_group:
+            self.shed_count += 1
+            logger.warning(
+                f"Judge queue full, shedding request from group {group_key} "
+                f"(queued={self.queued}, group_queued={group_queued}, "
+                f"shed_total={self.shed_count})"
+            )
+            raise JudgeQueueFull(group_key)
+
+        users = self._waiting.setdefault(group_key, OrderedDict())
+        users.setdefault(user_key, deque()).append(ticket)
+        ticket.queue = self
+        # 等待方的任务被取消时 future 随之取消，同样撤回排队中的任务
+        ticket.future.add_done_callback(lambda _: self._discard(ticket))
+        self._pump()
+        return ticket
+
+    def _discard(self, ticket: JudgeTicket):
+        """从队列中移除已被取消的排队任务（已出队的任务不受影响）"""
+        if ticket.queue is not self or not ticket.future.cancelled():
+            return
+        ticket.queue = None
+        users = self._waiting[ticket.group_key]
+        tickets = users[ticket.user_key]
+        tickets.remove(ticket)
+        if not tickets:
+            del users[ticket.user_key]
+        if not users:
+            del self._waiting[ticket.group_key]
+
+    def position(self, ticket: JudgeTicket) -> int:
+        """任务在队列中的位置（1 为下一个出队），已开始执行时返回 0"""
+        if ticket.future.done() or not self._waiting:
+            return 0
+        for index, queued in enumerate(self._drain_order(), start=1):
+            if queued is ticket:
+                return index
+        return 0
+
+    def _drain_order(self):
+        """按轮转规则依次产出当前排队任务（不修改队列）"""
+        groups = [
+            [deque(tickets) for tickets in users.values()]
+            for users in self._waiting.values()
+        ]
+        while groups:
+            for users in list(groups):
+                tickets = users.pop(0)
+                yield tickets.popleft()
+                if tickets:
+                    users.append(tickets)
+                if not users:
+                    groups.remove(users)
+
+    def _next(self) -> JudgeTicket | None:
+        """取出下一个任务：群之间轮转，群内用户之间轮转"""
+        if not self._waiting:
+            return None
+        group_key, users = next(iter(self._waiting.items()))
+        user_key, tickets = next(iter(users.items()))
+        ticket = tickets.popleft()
+        ticket.queue = None
+
+        # 被服务过的用户和群移到队尾
+        if tickets:
+            users.move_to_end(user_key)
+        else:
+            del users[user_key]
+        if users:
+            self._waiting.move_to_end(group_key)
+        else:
+            del self._waiting[group_key]
+        return ticket
+
+    def _pump(self):
+        while self.in_flight < self.max_in_flight:
+            ticket = self._next()
+            if ticket is None:
+                return
+            self._start(ticket)
+
+    def _start(self, ticket: JudgeTicket):
+        self.in_flight += 1
+        task = asyncio.create_task(self._run(ticket))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, ticket: JudgeTicket):
+        try:
+            result = await ticket.job()
+        except asyncio.CancelledError:
+            ticket.future.cancel()
+            raise
+        except Exception as e:  # noqa: BLE001
+            # 错误原样交给等待结果的调用方
+            if not ticket.future.done():
+                ticket.future.set_exception(e)
+        else:
+            if not ticket.future.done():
+                ticket.future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            self._pump()
@@ -0,0 +1,220 @@
+"""
+stream.py - 判题回复的流式与容错解析
+
+- extract_json_text / repair_json：从带代码围栏、前后有多余文字或被截断的回复中
+  取出并补全 JSON，不必为格式问题再请求一次
+- parse_judge_reply / check_judge_result：解析判题回复并确认结果完整
+- IncrementalJudgeParser：流式接收回复片段，valid、covered_indices 等字段一出现
+  就先行给出，不必等 feedback 生成完
+- stream_completion：以流式方式调用提供商，提供商不支持流式时退回普通调用
+"""
+
+import json
+import re
+from collections.abc import Callable
+from types import SimpleNamespace
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*[ \t]*\n?")
+_CLOSERS = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+
+# 判题 JSON 中可以先行给出的字段（值完整出现后才匹配）
+_EARLY_FIELDS = {
+    "ai_copied": re.compile(r'"ai_copied"\s*:\s*(true|false)'),
+    "valid": re.compile(r'"valid"\s*:\s*(true|false)'),
+    "covered_indices": re.compile(r'"covered_indices"\s*:\s*\[([\d\s,]*)\]'),
+    "points_covered": re.compile(r'"points_covered"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\n]'),
+}
+
+
+def extract_json_text(llm_reply: str) -> str:
+    """
+    取出回复中的 JSON 文本
+
+    代码围栏（含未闭合的围栏）内的内容优先；否则从第一个 { 或 [ 开始截取。
+    """
+    text = llm_reply.strip()
+    fence = _FENCE_RE.search(text)
+    if fence:
+        body = text[fence.end() :]
+        end = body.find("```")
+        text = (body if end == -1 else body[:end]).strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if starts:
+        text = text[min(starts) :]
+    return text
+
+
+def _is_token_char(ch: str) -> bool:
+    """数字或 true/false/null 中的字符"""
+    return ch.isascii() and (ch.isalnum() or ch in ".-+")
+
+
+def _scan(text: str):
+    """
+    扫描 JSON 文本，返回 (末尾是否在字符串内, 末尾未闭合的括号栈, 最后一个安全截断点)
+
+    安全截断点：一个完整的值结束（或容器刚打开）之后的位置，及该位置的括号栈。
+    """
+    stack: list[str] = []
+    in_string = False
+    escape = False
+    safe = (0, [])
+    # 当前对象中下一个字符串是否为键
+    expect_key = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not expect_key:
+                    safe = (i + 1, list(stack))
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+            expect_key = ch == "{"
+            safe = (i + 1, list(stack))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            safe = (i + 1, list(stack))
+        elif ch == ":":
+            expect_key = False
+        elif ch == ",":
+            expect_key = bool(stack) and stack[-1] == "{"
+        elif _is_token_char(ch):
+            nxt = text[i + 1 : i + 2]
+            # 数字与 true/false/null 以完整 token 结尾才算安全
+            if nxt and not _is_token_char(nxt):
+                safe = (i + 1, list(stack))
+    return in_string, stack, safe
+
+
+def _close(stack: list[str]) -> str:
+    return "".join(_CLOSERS[ch] for ch in reversed(stack))
+
+
+def repair_json(text: str) -> str:
+    """
+    补全被截断的 JSON：闭合未结束的字符串和括号
+
+    末尾是残缺的键或值时，截回最后一个完整的值再闭合。
+    """
+    text = text.rstrip()
+    in_string, stack, (safe_pos, safe_stack) = _scan(text)
+    candidate = text + ('"' if in_string else "") + _close(stack)
+    try:
+        json.loads(candidate)
+        return candidate
+    except json.JSONDecodeError:
+        pass
+    head = text[:safe_pos].rstrip().rstrip(",")
+    return head + _close(safe_stack)
+
+
+def loads_tolerant(llm_reply: str):
+    """
+    解析 LLM 回复中的 JSON，容忍代码围栏、多余文字和截断
+
+    Raises:
+        json.JSONDecodeError: 补全后仍不是合法的 JSON
+    """
+    text = extract_json_text(llm_reply)
+    try:
+        # 只解析开头的完整 JSON，忽略其后的说明文字
+        return _DECODER.raw_decode(text)[0]
+    except json.JSONDecodeError as e:
+        if not text:
+            raise
+        try:
+            return json.loads(repair_json(text))
+        except json.JSONDecodeError:
+            raise e from None
+
+
+def parse_judge_reply(llm_reply: str) -> dict:
+    """
+    从 LLM 回复中提取判题 JSON，容忍代码围栏、前后多余文字和被截断的输出
+
+    Raises:
+        json.JSONDecodeError: 回复中没有合法的 JSON
+    """
+    return loads_tolerant(llm_reply)
+
+
+def check_judge_result(judge_res, llm_reply: str) -> dict:
+    """
+    确认单份回答的判题结果至少包含 valid 字段（截断过早时补全后可能缺失）
+
+    Raises:
+        json.JSONDecodeError: 结果不完整
+    """
+    if not isinstance(judge_res, dict) or "valid" not in judge_res:
+        raise json.JSONDecodeError("judge reply missing 'valid'", llm_reply, 0)
+    return judge_res
+
+
+class IncrementalJudgeParser:
+    """流式接收判题回复，字段完整出现后即先行给出"""
+
+    def __init__(self):
+        self.text = ""
+        self.fields: dict = {}
+
+    def feed(self, chunk: str) -> bool:
+        """追加一个回复片段，返回是否有新的字段可用"""
+        self.text += chunk
+        released = False
+        for name, pattern in _EARLY_FIELDS.items():
+            if name in self.fields:
+                continue
+            match = pattern.search(self.text)
+            if not match:
+                continue
+            value = match.group(1)
+            if name == "covered_indices":
+                self.fields[name] = [int(v) for v in re.findall(r"\d+", value)]
+            elif name == "points_covered":
+                self.fields[name] = float(value)
+            else:
+                self.fields[name] = value == "true"
+            released = True
+        return released
+
+
+async def stream_completion(prov, on_text: Callable[[str], None], **kwargs):
+    """
+    以流式方式调用提供商，每收到一个片段调用一次 on_text
+
+    提供商不支持流式时退回普通调用（整段回复作为一个片段）。返回完整回复。
+    """
+    if not hasattr(prov, "text_chat_stream"):
+        final = await prov.text_chat(**kwargs)
+        on_text(final.completion_text or "")
+        return final
+
+    parts = []
+    final = None
+    try:
+        async for resp in prov.text_chat_stream(**kwargs):
+            if getattr(resp, "is_chunk", False):
+                if resp.completion_text:
+                    parts.append(resp.completion_text)
+                    on_text(resp.completion_text)
+            else:
+                final = resp
+    except NotImplementedError:
+        if parts:
+            raise
+        final = await prov.text_chat(**kwargs)
+        on_text(final.completion_text or "")
+        return final
+
+    if final is None or not final.completion_text:
+        return SimpleNamespace(completion_text="".join(parts))
+    return final
@@ -1,11 +1,23 @@
 from .answer import AnswerMixin
 from .baseinfo import BaseInfoMixin
-from .core import DatabaseCore
+from .core import DatabaseCore, RowCache
+from .judge import JudgeMixin
+from .outbox import OutboxMixin
 from .problem import ProblemMixin
+from .schedule import ScheduleMixin
 from .task import TaskMixin
 
 
-class QuizRepository(DatabaseCore, BaseInfoMixin, ProblemMixin, TaskMixin, AnswerMixin):
+class QuizRepository(
+    DatabaseCore,
+    BaseInfoMixin,
+    ProblemMixin,
+    TaskMixin,
+    AnswerMixin,
+    ScheduleMixin,
+    OutboxMixin,
+    JudgeMixin,
+):
     """
     群聊答题插件数据仓库类
     聚合了所有功能模块：
@@ -14,7 +26,19 @@ class QuizRepository(DatabaseCore, BaseInfoMixin, ProblemMixin, TaskMixin, Answe
     - Problem: 题目查询
     - Task: 任务配置、游标、策略
     - Answer: 答题记录与分数计算
+    - Schedule: 推送计划快照、推送记录与平台路由
+    - Outbox: 推送发件箱
+    - Judge: 判题预筛记录、判题遥测与异步判题任务
     """
 
     def __init__(self, db_path: str):
         super().__init__(db_path)
+        # 查询结果缓存：对应的表只经由本仓库写入，写入时同步更新缓存
+        # 近期有效作答：(用户, 群, 题目) -> 最近有效作答日期，无记录为空字符串
+        self.recent_valid = RowCache(20000)
+        # 当天抢分进度：(题目, 群, 日期) -> ProblemScoreLog
+        self.progress_cache = RowCache(5000)
+        # 题目最近推送时间：(群, 题目) -> last_push_time，未推送过为空字符串
+        self.push_time_cache = RowCache(20000)
+        # 题目：题库可能被手动导入修改，按时间过期
+        self.problem_cache = RowCache(5000, ttl=600)
@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import UTC, datetime, timedelta
 
-from .models import ProblemScoreLog
+from .models import AnswerGate, Problem, ProblemScoreLog
 
 
 class AnswerMixin:
@@ -10,16 +10,24 @@ class AnswerMixin:
         self, user_qq: str, problem_id: int, group_qq: str, days: int = 30
     ) -> bool:
         """检查用户近期（默认 30 天）内是否已经**有效**回答过该题，避免刷经验"""
-        with self.get_locked_cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT id FROM user_answer_log
-                WHERE user_qq = ? AND problem_id = ? AND group_qq = ?
-                AND answer_date >= date('now', ?) AND is_valid = 1
-                """,
-                (user_qq, problem_id, group_qq, f"-{days} days"),
-            )
-            return cursor.fetchone() is not None
+        key = (user_qq, group_qq, problem_id)
+        last_valid = self.recent_valid.get(key)
+        if last_valid is None:
+            with self.get_locked_cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT last_valid_date FROM user_recent_valid
+                    WHERE user_qq = ? AND group_qq = ? AND problem_id = ?
+                    """,
+                    key,
+                )
+                row = cursor.fetchone()
+            # 没有有效作答记录时缓存为空字符串，同样不必再查库
+            last_valid = row["last_valid_date"] if row else ""
+            self.recent_valid.put(key, last_valid)
+        # 与 SQLite 的 date('now', '-N days') 一致，按 UTC 日期计算
+        cutoff = (datetime.now(UTC) - timedelta(days=days)).strftime("%Y-%m-%d")
+        return bool(last_valid) and last_valid >= cutoff
 
     def record_user_answer(
         self,
@@ -33,38 +41,86 @@ class AnswerMixin:
         llm_feedback: str,
         exp_gained: int,
         score_gained: float,
+        progress: tuple[float, int, bool] | None = None,
+        judge_job_id: int | None = None,
+        reply: str = "",
     ) -> int:
-        """记录用户回答，返回插入的行 ID"""
+        """
+        记录用户回答，返回插入的行 ID
+
+        Args:
+            progress: 同时推进的全群进度 (新增分数, 覆盖位掩码, 是否抢完)
+            judge_job_id: 异步判题任务 ID，传入时在同一事务中写入结算消息 reply，
+                任务已不在评判中（已结算过）时不做任何写入并返回 0
+        """
         today = datetime.now().strftime("%Y-%m-%d")
         with self.get_locked_cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO user_answer_log
-                (user_qq, problem_id, group_qq, answer_text, is_valid, ai_copied,
-                 covered_mask, llm_feedback, exp_gained, score_gained, answer_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    user_qq,
-                    problem_id,
-                    group_qq,
-                    answer_text,
-                    1 if is_valid else 0,
-                    1 if ai_copied else 0,
-                    covered_mask,
-                    llm_feedback,
-                    exp_gained,
-                    score_gained,
-                    today,
-                ),
-            )
-            return cursor.lastrowid
+            cursor.execute("BEGIN;")
+            try:
+                if judge_job_id is not None:
+                    cursor.execute(
+                        """
+                        UPDATE judge_jobs SET status = 'judged', reply = ?
+                        WHERE id = ? AND status = 'judging'
+                        """,
+                        (reply, judge_job_id),
+                    )
+                    if cursor.rowcount == 0:
+                        cursor.execute("ROLLBACK;")
+                        return 0
+                cursor.execute(
+                    """
+                    INSERT INTO user_answer_log
+                    (user_qq, problem_id, group_qq, answer_text, is_valid, ai_copied,
+                     covered_mask, llm_feedback, exp_gained, score_gained, answer_date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        user_qq,
+                        problem_id,
+                        group_qq,
+                        answer_text,
+                        1 if is_valid else 0,
+                        1 if ai_copied else 0,
+                        covered_mask,
+                        llm_feedback,
+                        exp_gained,
+                        score_gained,
+                        today,
+                    ),
+                )
+                answer_id = cursor.lastrowid
+                if is_valid:
+                    cursor.execute(
+                        """
+                        INSERT INTO user_recent_valid
+                        (user_qq, group_qq, problem_id, last_valid_date)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(user_qq, group_qq, problem_id)
+                        DO UPDATE SET last_valid_date = MAX(last_valid_date, excluded.last_valid_date)
+                        """,
+                        (user_qq, group_qq, problem_id, today),
+                    )
+                if progress is not None:
+                    self.update_problem_score_progress(problem_id, group_qq, *progress)
+                cursor.execute("COMMIT;")
+            except Exception:
+                cursor.execute("ROLLBACK;")
+                self.progress_cache.pop((problem_id, group_qq, today))
+                raise
+
+        if is_valid:
+            self.recent_valid.put((user_qq, group_qq, problem_id), today)
+        return answer_id
 
     def get_problem_score_progress(
         self, problem_id: int, group_qq: str
     ) -> ProblemScoreLog:
         """获取题目当天的全群进度"""
         today = datetime.now().strftime("%Y-%m-%d")
+        cached = self.progress_cache.get((problem_id, group_qq, today))
+        if cached is not None:
+            return cached
         with self.get_locked_cursor() as cursor:
             cursor.execute(
                 """
@@ -75,9 +131,10 @@ class AnswerMixin:
                 (problem_id, group_qq, today),
             )
             row = cursor.fetchone()
-            if row:
-                return ProblemScoreLog(**dict(row))
-            return ProblemScoreLog(
+        if row:
+            progress = ProblemScoreLog(**dict(row))
+        else:
+            progress = ProblemScoreLog(
                 problem_id=problem_id,
                 group_qq=group_qq,
                 push_date=today,
@@ -85,6 +142,63 @@ class AnswerMixin:
                 covered_mask=0,
                 is_complete=False,
             )
+        self.progress_cache.put((problem_id, group_qq, today), progress)
+        return progress
+
+    def get_answer_gate(self, problem_id: int, group_qq: str) -> AnswerGate | None:
+        """
+        获取 /ans 判断答案是否可见所需的数据：题目（含答案字段）、本群当天进度和最近推送时间
+
+        三者均已缓存时不查库，否则按主键和唯一索引一次查询取齐并写入缓存。
+        题目不存在时返回 None。
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        progress_key = (problem_id, group_qq, today)
+        problem = self.problem_cache.get(problem_id)
+        progress = self.progress_cache.get(progress_key)
+        last_push_time = self.push_time_cache.get((group_qq, problem_id))
+        if problem is None or progress is None or last_push_time is None:
+            with self.get_locked_cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT p.*, d.name AS domain_name, d.base_exp, c.name AS category_name,
+                           pc.last_push_time AS gate_last_push_time,
+                           s.id AS gate_score_id, s.total_score AS gate_total_score,
+                           s.covered_mask AS gate_covered_mask,
+                           s.is_complete AS gate_is_complete
+                    FROM problems p
+                    LEFT JOIN domain d ON p.domain_id = d.id
+                    LEFT JOIN category c ON p.category_id = c.id
+                    LEFT JOIN problem_push_count pc
+                        ON pc.group_qq = ? AND pc.problem_id = p.id
+                    LEFT JOIN problem_score_log s
+                        ON s.problem_id = p.id AND s.group_qq = ? AND s.push_date = ?
+                    WHERE p.id = ?
+                    """,
+                    (group_qq, group_qq, today, problem_id),
+                )
+                row = cursor.fetchone()
+            if not row:
+                return None
+
+            data = dict(row)
+            last_push_time = data.pop("gate_last_push_time") or ""
+            score_id = data.pop("gate_score_id")
+            progress = ProblemScoreLog(
+                problem_id=problem_id,
+                group_qq=group_qq,
+                push_date=today,
+                id=score_id or 0,
+                total_score=data.pop("gate_total_score") or 0.0,
+                covered_mask=data.pop("gate_covered_mask") or 0,
+                is_complete=data.pop("gate_is_complete") or False,
+            )
+            problem = Problem(**data)
+            self.problem_cache.put(problem_id, problem)
+            self.progress_cache.put(progress_key, progress)
+            self.push_time_cache.put((group_qq, problem_id), last_push_time)
+
+        return AnswerGate(problem, progress, last_push_time or None)
 
     def update_problem_score_progress(
         self,
@@ -94,7 +208,7 @@ class AnswerMixin:
         new_mask: int,
         is_complete: bool,
     ):
-        """更新题目当天的全群进度"""
+        """更新题目当天的全群进度（在 record_user_answer 的事务中调用时随之提交）"""
         today = datetime.now().strftime("%Y-%m-%d")
         with self.get_locked_cursor() as cursor:
             cursor.execute(
@@ -107,6 +221,7 @@ class AnswerMixin:
             row = cursor.fetchone()
             if row:
                 log = ProblemScoreLog(**dict(row))
+                score_id = log.id
                 total_score = log.total_score + add_score
                 covered_mask = log.covered_mask | new_mask
                 cursor.execute(
@@ -142,6 +257,20 @@ class AnswerMixin:
                         1 if is_complete else 0,
                     ),
                 )
+                score_id = cursor.lastrowid
+
+        self.progress_cache.put(
+            (problem_id, group_qq, today),
+            ProblemScoreLog(
+                problem_id=problem_id,
+                group_qq=group_qq,
+                push_date=today,
+                id=score_id,
+                total_score=total_score,
+                covered_mask=covered_mask,
+                is_complete=1 if is_complete else 0,
+            ),
+        )
 
     def get_user_score_stats(self, user_qq: str) -> dict:
         """获取用户当前的总经验和总积分（包含分领域统计）"""
@@ -184,7 +313,7 @@ class AnswerMixin:
             }
 
     def get_group_rank(
-        self, group_qq: str, domain_id: int = None, limit: int = 10
+        self, group_qq: str, domain_id: int | None = None, limit: int = 10
     ) -> list:
         """获取本群按积分排名的榜单（可指定领域）"""
         query = """
@@ -36,6 +36,18 @@ class BaseInfoMixin:
             row = cursor.fetchone()
             return Domain(**dict(row)) if row else None
 
+    def get_domains_by_names(self, names: list[str]) -> dict[str, Domain]:
+        """根据名称批量获取领域，返回 {名称: 领域}，不存在的名称不包含在内"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        placeholders = ",".join("?" * len(names))
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                f"SELECT * FROM domain WHERE name IN ({placeholders})", names
+            )
+            return {row["name"]: Domain(**dict(row)) for row in cursor.fetchall()}
+
     # ==================== Users 和 Subscribes 相关操作 ====================
 
     def ensure_user_exists(self, qq: str) -> bool:
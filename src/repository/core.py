@@ -1,10 +1,66 @@
 import os
 import sqlite3
 import threading
+import time
 from contextlib import contextmanager
 
 from astrbot.api import logger
 
+# 一次性数据迁移：(完成标记, SQL)。schema.sql 每次启动都会执行，只放建表建索引语句，
+# 数据回填放在这里，按 schema_meta 中的标记只执行一次
+_DATA_MIGRATIONS = (
+    (
+        # user_recent_valid 新建时从已有答题记录回填
+        "backfill_user_recent_valid",
+        """
+        INSERT OR IGNORE INTO user_recent_valid
+            (user_qq, group_qq, problem_id, last_valid_date)
+        SELECT user_qq, group_qq, problem_id, MAX(answer_date) FROM user_answer_log
+        WHERE is_valid = 1
+        GROUP BY user_qq, group_qq, problem_id
+    """,
+    ),
+)
+
+
+class RowCache:
+    """
+    查询结果的内存缓存
+
+    超出容量时淘汰最早写入的条目；设置 ttl 时条目过期后重新查库，
+    用于可能被外部修改（如手动导入题库）的数据。
+    """
+
+    def __init__(self, max_size: int, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: dict = {}
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return default
+        return value
+
+    def put(self, key, value):
+        if key not in self._entries and len(self._entries) >= self.max_size:
+            self._entries.pop(next(iter(self._entries)))
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires_at)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class DatabaseCore:
     """数据库核心功能：连接管理、游标获取、初始化"""
@@ -83,9 +139,29 @@ class DatabaseCore:
                         with open(migration_path, encoding="utf-8") as mf:
                             cursor.executescript(mf.read())
 
+                self._apply_data_migrations(cursor)
                 self.conn.commit()
             logger.info("Database schema initialized successfully")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize schema: {e}", exc_info=True)
             return False
+
+    def _apply_data_migrations(self, cursor: sqlite3.Cursor):
+        """执行尚未完成的一次性数据迁移，迁移与完成标记在同一事务中写入"""
+        for key, sql in _DATA_MIGRATIONS:
+            cursor.execute("SELECT 1 FROM schema_meta WHERE key = ?", (key,))
+            if cursor.fetchone():
+                continue
+            logger.info(f"Applying data migration {key}...")
+            cursor.execute("BEGIN;")
+            try:
+                cursor.execute(sql)
+                cursor.execute(
+                    "INSERT INTO schema_meta (key, value) VALUES (?, datetime('now'))",
+                    (key,),
+                )
+                cursor.execute("COMMIT;")
+            except Exception:
+                cursor.execute("ROLLBACK;")
+                raise
@@ -0,0 +1,250 @@
+from dataclasses import asdict
+
+from .models import JudgeJob, JudgeMetric
+
+
+class JudgeMixin:
+    """判题相关记录操作"""
+
+    def record_prescreen_decision(
+        self,
+        user_qq: str,
+        group_qq: str,
+        problem_id: int,
+        rule: str,
+        answer_text: str,
+    ) -> int:
+        """记录一次本地预筛判定，返回插入的行 ID"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO judge_prescreen_log
+                (user_qq, group_qq, problem_id, rule, answer_text)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (user_qq, group_qq, problem_id, rule, answer_text),
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def get_prescreen_rule_counts(self, days: int = 7) -> dict[str, int]:
+        """统计近期各预筛规则的命中次数"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT rule, COUNT(*) AS cnt FROM judge_prescreen_log
+                WHERE created_at >= datetime('now', ?)
+                GROUP BY rule
+            """,
+                (f"-{days} days",),
+            )
+            return {row["rule"]: row["cnt"] for row in cursor.fetchall()}
+
+    def record_judge_metric(self, metric: JudgeMetric) -> int:
+        """记录一次判定的遥测数据，返回插入的行 ID"""
+        data = asdict(metric)
+        columns = ", ".join(data)
+        placeholders = ", ".join("?" for _ in data)
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO judge_metrics ({columns}) VALUES ({placeholders})",
+                tuple(data.values()),
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def get_judge_source_summary(self, days: int = 7) -> list[dict]:
+        """按判定来源汇总：次数、有效数、解析失败数、估算 token 数"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT source, COUNT(*) AS cnt,
+                       SUM(valid = 1) AS valid_cnt,
+                       SUM(parse IN ('failed', 'error', 'timeout')) AS failed_cnt,
+                       SUM(parse = 'repaired') AS repaired_cnt,
+                       SUM(est_tokens) AS tokens
+                FROM judge_metrics
+                WHERE created_at >= datetime('now', ?)
+                GROUP BY source ORDER BY cnt DESC
+            """,
+                (f"-{days} days",),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_judge_latency_percentiles(self, days: int = 7) -> dict[str, dict]:
+        """
+        各提供商请求耗时（毫秒）的 p50 / p90 / p99（最近秩）
+
+        分位数在 SQL 中算好，每个提供商只返回一行，不把窗口内的耗时逐条取回。
+        """
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                WITH ranked AS (
+                    SELECT provider_id, latency_ms,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY provider_id ORDER BY latency_ms
+                           ) AS rn,
+                           COUNT(*) OVER (PARTITION BY provider_id) AS n
+                    FROM judge_metrics
+                    WHERE provider_id IS NOT NULL AND created_at >= datetime('now', ?)
+                )
+                SELECT provider_id, MAX(n) AS cnt,
+                       MIN(CASE WHEN rn * 100 >= n * 50 THEN latency_ms END) AS p50,
+                       MIN(CASE WHEN rn * 100 >= n * 90 THEN latency_ms END) AS p90,
+                       MIN(CASE WHEN rn * 100 >= n * 99 THEN latency_ms END) AS p99
+                FROM ranked
+                GROUP BY provider_id
+                ORDER BY provider_id
+            """,
+                (f"-{days} days",),
+            )
+            return {row["provider_id"]: dict(row) for row in cursor.fetchall()}
+
+    def get_judge_provider_summary(self, days: int = 7) -> dict[str, dict]:
+        """按提供商汇总：请求数、失败数、对冲数、估算 token 数"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT provider_id, COUNT(*) AS cnt,
+                       SUM(parse IN ('failed', 'error', 'timeout')) AS failed_cnt,
+                       SUM(hedged) AS hedged_cnt,
+                       SUM(est_tokens) AS tokens
+                FROM judge_metrics
+                WHERE provider_id IS NOT NULL AND created_at >= datetime('now', ?)
+                GROUP BY provider_id
+            """,
+                (f"-{days} days",),
+            )
+            return {row["provider_id"]: dict(row) for row in cursor.fetchall()}
+
+    def get_judge_cost_by_group(self, days: int = 7, limit: int = 10) -> list[dict]:
+        """各群的 LLM 用量（按估算 token 数降序）"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT group_qq, COUNT(*) AS cnt,
+                       SUM(provider_id IS NOT NULL) AS llm_cnt,
+                       SUM(est_tokens) AS tokens,
+                       SUM(prompt_bytes + completion_bytes) AS bytes
+                FROM judge_metrics
+                WHERE created_at >= datetime('now', ?)
+                GROUP BY group_qq ORDER BY tokens DESC LIMIT ?
+            """,
+                (f"-{days} days", limit),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_judge_pass_rates(self, days: int = 7) -> list[dict]:
+        """各领域的有效回答率与平均得分"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT COALESCE(d.name, '未知领域') AS domain_name, COUNT(*) AS cnt,
+                       SUM(m.valid = 1) AS valid_cnt,
+                       SUM(m.ai_copied = 1) AS copied_cnt,
+                       AVG(m.score) AS avg_score
+                FROM judge_metrics m
+                LEFT JOIN domain d ON m.domain_id = d.id
+                WHERE m.created_at >= datetime('now', ?)
+                GROUP BY m.domain_id ORDER BY cnt DESC
+            """,
+                (f"-{days} days",),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def enqueue_judge_job(
+        self,
+        user_qq: str,
+        group_qq: str,
+        problem_id: int,
+        answer_text: str,
+        umo: str,
+    ) -> int:
+        """写入一个待评判的异步判题任务，返回任务 ID"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO judge_jobs (user_qq, group_qq, problem_id, answer_text, umo)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (user_qq, group_qq, problem_id, answer_text, umo),
+            )
+            self.conn.commit()
+            return cursor.lastrowid
+
+    def get_open_judge_jobs(self, limit: int = 500) -> list[JudgeJob]:
+        """获取尚未完成（待评判或待发送）的判题任务，按提交顺序排列"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT * FROM judge_jobs
+                WHERE status IN ('pending', 'judged')
+                ORDER BY id ASC
+                LIMIT ?
+            """,
+                (limit,),
+            )
+            return [JudgeJob(**dict(row)) for row in cursor.fetchall()]
+
+    def claim_judge_job(self, job_id: int, from_status: str, to_status: str) -> bool:
+        """条件更新判题任务状态，只有当前状态为 from_status 时才会成功"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                "UPDATE judge_jobs SET status = ? WHERE id = ? AND status = ?",
+                (to_status, job_id, from_status),
+            )
+            self.conn.commit()
+            return cursor.rowcount > 0
+
+    def save_judge_reply(self, job_id: int, reply: str):
+        """
+        记录判题任务的结算消息，任务进入待发送状态
+
+        已随结算写入消息（record_user_answer）的任务不再覆盖。
+        """
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE judge_jobs SET status = 'judged', reply = ?
+                WHERE id = ? AND status = 'judging'
+            """,
+                (reply, job_id),
+            )
+            self.conn.commit()
+
+    def record_judge_delivery_failure(
+        self, job_id: int, attempts: int, last_error: str, status: str
+    ):
+        """记录一次发送失败（status 为 failed 时不再重试）"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE judge_jobs SET attempts = ?, last_error = ?, status = ?
+                WHERE id = ?
+            """,
+                (attempts, last_error, status, job_id),
+            )
+            self.conn.commit()
+
+    def recover_judge_jobs(self) -> int:
+        """启动时把评判中断（judging）的任务恢复为待评判"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                "UPDATE judge_jobs SET status = 'pending' WHERE status = 'judging'"
+            )
+            self.conn.commit()
+            return cursor.rowcount
+
+    def purge_judge_jobs(self, days: int = 7) -> int:
+        """清理已完成或已放弃的旧判题任务"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM judge_jobs
+                WHERE status IN ('done', 'failed') AND created_at < datetime('now', ?)
+            """,
+                (f"-{days} days",),
+            )
+            self.conn.commit()
+            return cursor.rowcount
@@ -55,6 +55,15 @@ class Problem:
     base_exp: int | None = None  # Used in queries that join with domain table
 
 
+@dataclass
+class AnswerGate:
+    """/ans 答案可见性判断所需的数据"""
+
+    problem: Problem
+    progress: "ProblemScoreLog"
+    last_push_time: str | None = None  # 本群最近一次推送该题的时间，未推送过为 None
+
+
 @dataclass
 class GroupTaskConfig:
     id: int
@@ -116,3 +125,66 @@ class ProblemScoreLog:
     total_score: float = 0.0
     covered_mask: int = 0
     is_complete: bool = False
+
+
+@dataclass
+class PushScheduleEntry:
+    group_qq: str
+    domain_id: int
+    domain_name: str
+    hour: int
+    minute: int
+    weekday: int | None = None  # None 表示每天
+    source: str = "manual"
+    id: int = 0
+
+
+@dataclass
+class PushOutboxEntry:
+    id: int
+    idem_key: str
+    group_qq: str
+    domain_id: int
+    domain_name: str
+    strategy_type: str
+    problem_ids: str  # JSON 数组
+    payload: str  # JSON：{"text": ..., "mentions": [...]}
+    next_attempt_at: float
+    status: str = "pending"
+    attempts: int = 0
+    last_error: str | None = None
+    fired_at: str | None = None
+    created_at: str = ""
+
+
+@dataclass
+class JudgeMetric:
+    group_qq: str
+    problem_id: int
+    source: str  # llm / batch / cache / prescreen / local
+    parse: str  # ok / repaired / failed / error / timeout / skipped
+    domain_id: int | None = None
+    provider_id: str | None = None
+    hedged: bool = False
+    latency_ms: int = 0
+    prompt_bytes: int = 0
+    completion_bytes: int = 0
+    est_tokens: int = 0
+    valid: bool | None = None
+    ai_copied: bool | None = None
+    score: float = 0.0
+
+
+@dataclass
+class JudgeJob:
+    id: int
+    user_qq: str
+    group_qq: str
+    problem_id: int
+    answer_text: str
+    umo: str  # 提交回答的会话，结果发回这里
+    status: str = "pending"
+    reply: str | None = None
+    attempts: int = 0
+    last_error: str | None = None
+    created_at: str = ""
@@ -0,0 +1,130 @@
+import json
+
+from .models import PushOutboxEntry
+
+
+class OutboxMixin:
+    """推送发件箱相关操作"""
+
+    def enqueue_push(
+        self,
+        idem_key: str,
+        group_qq: str,
+        domain_id: int,
+        domain_name: str,
+        strategy_type: str,
+        problem_ids: list[int],
+        payload: dict,
+        fired_at: str | None,
+        next_attempt_at: float,
+    ) -> int | None:
+        """
+        写入一条待投递推送，同一幂等键只会写入一次
+
+        Returns:
+            int | None: 新记录 ID；幂等键已存在时返回 None
+        """
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO push_outbox
+                (idem_key, group_qq, domain_id, domain_name, strategy_type,
+                 problem_ids, payload, fired_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    idem_key,
+                    group_qq,
+                    domain_id,
+                    domain_name,
+                    strategy_type,
+                    json.dumps(problem_ids),
+                    json.dumps(payload, ensure_ascii=False),
+                    fired_at,
+                    next_attempt_at,
+                ),
+            )
+            self.conn.commit()
+            return cursor.lastrowid if cursor.rowcount > 0 else None
+
+    def get_due_pushes(self, now: float, limit: int = 200) -> list[PushOutboxEntry]:
+        """获取到期的待投递（pending）或待推进状态（sent）的推送"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT * FROM push_outbox
+                WHERE status IN ('pending', 'sent') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at ASC
+                LIMIT ?
+            """,
+                (now, limit),
+            )
+            return [PushOutboxEntry(**dict(row)) for row in cursor.fetchall()]
+
+    def claim_push_status(self, push_id: int, from_status: str, to_status: str) -> bool:
+        """
+        条件更新推送状态，只有当前状态为 from_status 时才会成功
+
+        用于保证送达、推进策略状态等步骤对同一条推送只执行一次。
+        """
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE push_outbox SET status = ?
+                WHERE id = ? AND status = ?
+            """,
+                (to_status, push_id, from_status),
+            )
+            self.conn.commit()
+            return cursor.rowcount > 0
+
+    def reschedule_push(
+        self,
+        push_id: int,
+        attempts: int,
+        next_attempt_at: float,
+        last_error: str,
+        status: str,
+    ):
+        """记录一次失败尝试并安排下次重试（status 为 failed 时不再重试）"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE push_outbox
+                SET attempts = ?, next_attempt_at = ?, last_error = ?, status = ?
+                WHERE id = ?
+            """,
+                (attempts, next_attempt_at, last_error, status, push_id),
+            )
+            self.conn.commit()
+
+    def recover_push_outbox(self) -> int:
+        """
+        启动时恢复中断的推送
+
+        投递中（sending）的推送重新投递；推进状态中（applying）的推送无法确认
+        策略状态是否已更新，按已完成处理，保证策略状态不会被重复推进。
+        """
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                "UPDATE push_outbox SET status = 'pending' WHERE status = 'sending'"
+            )
+            recovered = cursor.rowcount
+            cursor.execute(
+                "UPDATE push_outbox SET status = 'done' WHERE status = 'applying'"
+            )
+            self.conn.commit()
+            return recovered + cursor.rowcount
+
+    def purge_push_outbox(self, days: int = 7) -> int:
+        """清理已完成或已放弃的旧推送记录"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM push_outbox
+                WHERE status IN ('done', 'failed') AND created_at < datetime('now', ?)
+            """,
+                (f"-{days} days",),
+            )
+            self.conn.commit()
+            return cursor.rowcount
@@ -8,6 +8,9 @@ class ProblemMixin:
 
     def get_problem_by_id(self, problem_id: int) -> Problem | None:
         """根据 ID 获取题目"""
+        cached = self.problem_cache.get(problem_id)
+        if cached is not None:
+            return cached
         with self.get_locked_cursor() as cursor:
             cursor.execute(
                 """
@@ -20,7 +23,11 @@ class ProblemMixin:
                 (problem_id,),
             )
             row = cursor.fetchone()
-            return Problem(**dict(row)) if row else None
+        if not row:
+            return None
+        problem = Problem(**dict(row))
+        self.problem_cache.put(problem_id, problem)
+        return problem
 
     def get_random_problem(self, domain_name: str) -> Problem | None:
         """从指定领域随机获取一道题目"""
@@ -0,0 +1,145 @@
+import sqlite3
+
+from astrbot.api import logger
+
+from .models import PushScheduleEntry
+
+
+class ScheduleMixin:
+    """推送计划快照、推送记录与平台路由相关操作"""
+
+    # ==================== 推送计划快照 ====================
+
+    def get_schedule_signature(self) -> str | None:
+        """获取已保存的推送计划签名"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                "SELECT value FROM push_schedule_meta WHERE key = 'signature'"
+            )
+            row = cursor.fetchone()
+            return row["value"] if row else None
+
+    def get_push_schedule(self) -> list[PushScheduleEntry]:
+        """获取推送计划快照"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute("SELECT * FROM push_schedule ORDER BY id")
+            return [PushScheduleEntry(**dict(row)) for row in cursor.fetchall()]
+
+    def save_push_schedule(
+        self,
+        entries: list[PushScheduleEntry],
+        signature: str,
+        group_qq: str | None = None,
+    ) -> bool:
+        """
+        保存推送计划快照
+
+        Args:
+            entries: 推送计划条目
+            signature: 推送计划签名
+            group_qq: 指定时只替换该群的条目，否则替换全部
+        """
+        try:
+            with self.get_locked_cursor() as cursor:
+                cursor.execute("BEGIN;")
+                try:
+                    if group_qq is None:
+                        cursor.execute("DELETE FROM push_schedule")
+                    else:
+                        cursor.execute(
+                            "DELETE FROM push_schedule WHERE group_qq = ?", (group_qq,)
+                        )
+                    cursor.executemany(
+                        """
+                        INSERT OR IGNORE INTO push_schedule
+                        (group_qq, domain_id, domain_name, weekday, hour, minute, source)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                        [
+                            (
+                                e.group_qq,
+                                e.domain_id,
+                                e.domain_name,
+                                e.weekday,
+                                e.hour,
+                                e.minute,
+                                e.source,
+                            )
+                            for e in entries
+                        ],
+                    )
+                    cursor.execute(
+                        """
+                        INSERT INTO push_schedule_meta (key, value)
+                        VALUES ('signature', ?)
+                        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                    """,
+                        (signature,),
+                    )
+                    cursor.execute("COMMIT;")
+                except Exception:
+                    cursor.execute("ROLLBACK;")
+                    raise
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save push schedule: {e}", exc_info=True)
+            return False
+
+    # ==================== 推送记录 ====================
+
+    def record_push_fired(self, group_qq: str, domain_id: int, fired_at: str):
+        """记录推送目标最近一次成功推送的计划时间"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO push_fire_log (group_qq, domain_id, last_fired_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(group_qq, domain_id)
+                DO UPDATE SET last_fired_at = excluded.last_fired_at
+            """,
+                (group_qq, domain_id, fired_at),
+            )
+            self.conn.commit()
+
+    def get_push_fire_log(self) -> dict[tuple[str, int], str]:
+        """获取所有推送目标的最近推送时间 {(group_qq, domain_id): last_fired_at}"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                "SELECT group_qq, domain_id, last_fired_at FROM push_fire_log"
+            )
+            return {
+                (row["group_qq"], row["domain_id"]): row["last_fired_at"]
+                for row in cursor.fetchall()
+            }
+
+    # ==================== 推送平台路由 ====================
+
+    def get_push_routes(self) -> dict[str, tuple[str, float]]:
+        """获取所有群的推送路由 {group_qq: (platform_id, updated_at)}"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute("SELECT group_qq, platform_id, updated_at FROM push_route")
+            return {
+                row["group_qq"]: (row["platform_id"], row["updated_at"])
+                for row in cursor.fetchall()
+            }
+
+    def save_push_route(self, group_qq: str, platform_id: str, updated_at: float):
+        """保存群的推送路由"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO push_route (group_qq, platform_id, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(group_qq) DO UPDATE SET
+                    platform_id = excluded.platform_id,
+                    updated_at = excluded.updated_at
+            """,
+                (group_qq, platform_id, updated_at),
+            )
+            self.conn.commit()
+
+    def delete_push_route(self, group_qq: str):
+        """删除群的推送路由"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute("DELETE FROM push_route WHERE group_qq = ?", (group_qq,))
+            self.conn.commit()
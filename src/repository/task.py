@@ -1,3 +1,5 @@
+import sqlite3
+
 from astrbot.api import logger
 
 from .models import DomainSetting, GroupTaskConfig
@@ -36,6 +38,19 @@ class TaskMixin:
             )
             return [GroupTaskConfig(**dict(row)) for row in cursor.fetchall()]
 
+    def get_all_active_task_configs(self) -> list[GroupTaskConfig]:
+        """获取所有群的激活任务配置（仅包含领域存在的配置）"""
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT gtc.*, d.name as domain_name
+                FROM group_task_config gtc
+                JOIN domain d ON gtc.domain_id = d.id
+                WHERE gtc.is_active = 1
+            """
+            )
+            return [GroupTaskConfig(**dict(row)) for row in cursor.fetchall()]
+
     def upsert_group_task_config(
         self,
         group_qq: str,
@@ -162,8 +177,18 @@ class TaskMixin:
     ):
         """初始化任务配置"""
         first_batch = self.get_first_batch(domain_id)
-        initial_category_id = first_batch.category_id if first_batch else 0
-        initial_cursor = first_batch.start_index if first_batch else 1
+        if first_batch:
+            initial_category_id = first_batch.category_id
+            initial_cursor = first_batch.start_index
+        else:
+            # 与批量初始化一致：没有批次配置的领域以其第一个分类作为初始分类
+            initial_category_id = self._get_first_categories([domain_id]).get(domain_id)
+            initial_cursor = 1
+            if initial_category_id is None:
+                logger.warning(
+                    f"Skip init task config: domain {domain_id} has no category"
+                )
+                return
 
         with self.get_locked_cursor() as cursor:
             cursor.execute(
@@ -180,6 +205,127 @@ class TaskMixin:
             f"Initialized cursor for group {group_qq}, domain {domain_id}, category={initial_category_id}, cursor={initial_cursor}"
         )
 
+    def get_task_config_keys(self, domain_ids: list[int]) -> set[tuple[str, int]]:
+        """获取指定领域下已存在任务配置的 (群号, 领域ID) 集合"""
+        domain_ids = list(dict.fromkeys(domain_ids))
+        if not domain_ids:
+            return set()
+        placeholders = ",".join("?" * len(domain_ids))
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT group_qq, domain_id FROM group_task_config
+                WHERE domain_id IN ({placeholders})
+            """,
+                domain_ids,
+            )
+            return {(row["group_qq"], row["domain_id"]) for row in cursor.fetchall()}
+
+    def get_first_batches(self, domain_ids: list[int]) -> dict[int, DomainSetting]:
+        """批量获取各领域的第一批配置，返回 {领域ID: 批次}"""
+        domain_ids = list(dict.fromkeys(domain_ids))
+        if not domain_ids:
+            return {}
+        placeholders = ",".join("?" * len(domain_ids))
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT * FROM domain_settings
+                WHERE id IN (
+                    SELECT MIN(id) FROM domain_settings
+                    WHERE domain_id IN ({placeholders})
+                    GROUP BY domain_id
+                )
+            """,
+                domain_ids,
+            )
+            return {
+                row["domain_id"]: DomainSetting(**dict(row))
+                for row in cursor.fetchall()
+            }
+
+    def _get_first_categories(self, domain_ids: list[int]) -> dict[int, int]:
+        """批量获取各领域 id 最小的分类，返回 {领域ID: 分类ID}"""
+        domain_ids = list(dict.fromkeys(domain_ids))
+        if not domain_ids:
+            return {}
+        placeholders = ",".join("?" * len(domain_ids))
+        with self.get_locked_cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT domain_id, MIN(id) AS category_id FROM category
+                WHERE domain_id IN ({placeholders})
+                GROUP BY domain_id
+            """,
+                domain_ids,
+            )
+            return {row["domain_id"]: row["category_id"] for row in cursor.fetchall()}
+
+    def init_group_domain_configs(self, entries: list[tuple[str, int, str]]) -> int:
+        """
+        批量初始化任务配置（单个事务）
+
+        Args:
+            entries: (群号, 领域ID, 推送时间) 列表，已存在的配置会被忽略
+
+        Returns:
+            int: 新建的配置数
+        """
+        if not entries:
+            return 0
+
+        domain_ids = [domain_id for _, domain_id, _ in entries]
+        first_batches = self.get_first_batches(domain_ids)
+        # 没有批次配置的领域以其第一个分类作为初始分类，满足外键约束
+        first_categories = self._get_first_categories(
+            [d for d in domain_ids if d not in first_batches]
+        )
+        rows = []
+        for group_qq, domain_id, push_time in entries:
+            first_batch = first_batches.get(domain_id)
+            if first_batch:
+                rows.append(
+                    (
+                        group_qq,
+                        domain_id,
+                        first_batch.category_id,
+                        first_batch.start_index,
+                        push_time,
+                    )
+                )
+            elif domain_id in first_categories:
+                rows.append(
+                    (group_qq, domain_id, first_categories[domain_id], 1, push_time)
+                )
+            else:
+                logger.warning(
+                    f"Skip init task config: domain {domain_id} has no category"
+                )
+
+        try:
+            with self.get_locked_cursor() as cursor:
+                cursor.execute("BEGIN;")
+                try:
+                    before = self.conn.total_changes
+                    cursor.executemany(
+                        """
+                        INSERT OR IGNORE INTO group_task_config
+                        (group_qq, domain_id, now_category_id, now_cursor, push_time, is_active)
+                        VALUES (?, ?, ?, ?, ?, 1)
+                    """,
+                        rows,
+                    )
+                    inserted = self.conn.total_changes - before
+                    cursor.execute("COMMIT;")
+                except Exception:
+                    cursor.execute("ROLLBACK;")
+                    raise
+            logger.info(f"Initialized {inserted} group task configs")
+            return inserted
+        except sqlite3.Error as e:
+            logger.error(f"Failed to init group task configs: {e}", exc_info=True)
+            return 0
+
     def update_cursor(
         self, group_qq: str, domain_id: int, new_category_id: int, new_cursor: int
     ) -> bool:
@@ -364,6 +510,7 @@ class TaskMixin:
                 (group_qq, problem_id),
             )
             self.conn.commit()
+        self.push_time_cache.pop((group_qq, problem_id))
 
     def get_domain_stats(self, group_qq: str, domain_id: int) -> dict:
         """获取领域推送统计信息"""
@@ -401,6 +548,8 @@ class TaskMixin:
                     """,
                         (group_qq, domain_id),
                     )
+                    # 推送记录已删除，清空缓存的最近推送时间
+                    self.push_time_cache.clear()
                 elif strategy_type == "batch":
                     # 重置游标到第一批
                     cursor.execute(
@@ -3,27 +3,52 @@
 负责管理定时推送任务
 """
 
+import asyncio
+import hashlib
+import json
 import sqlite3
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import ClassVar
 
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-
 from astrbot.api import logger
 from astrbot.api.event import MessageEventResult
 from astrbot.api.message_components import At, Plain
 from astrbot.api.star import Context
 
+from .dispatch import (
+    PlatformRouter,
+    PreparedPush,
+    PushExecutor,
+    PushOutbox,
+    PushPreparer,
+    PushSpreader,
+    PushTarget,
+    SlotIndex,
+    SlotKey,
+)
 from .push_strategy.factory import StrategyFactory
 from .repository import QuizRepository
-from .repository.models import GroupTaskConfig
+from .repository.models import GroupTaskConfig, PushScheduleEntry
+
+FIRE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 消息组件在发送时只会被读取，可以在多条消息链之间共享
+MENTION_SEPARATOR = Plain(" ")
+MENTION_HEADER = Plain("\n\n")
+# At 组件缓存的上限，超过后整体清空
+AT_CACHE_LIMIT = 10000
 
 
 class QuizScheduler:
     """题目推送调度器"""
 
     # 星期映射
-    WEEKDAY_MAP = {
+    WEEKDAY_MAP: ClassVar[dict[str, int]] = {
         "星期一": 0,
         "星期二": 1,
         "星期三": 2,
@@ -32,6 +57,7 @@ class QuizScheduler:
         "星期六": 5,
         "星期日": 6,
     }
+    WEEKDAY_NAMES: ClassVar[dict[int, str]] = {v: k for k, v in WEEKDAY_MAP.items()}
 
     def __init__(self, context: Context, db: QuizRepository, config):
         """
@@ -46,13 +72,62 @@ class QuizScheduler:
         self.db = db
         self.config = config  # 保存插件配置
         self.scheduler: AsyncIOScheduler | None = None
+        # 时间槽模式：每个 (星期, HH:MM) 只注册一个任务，触发时按索引分发
+        self.slot_mode: bool = bool(config.get("slot_dispatcher", True))
+        self.slot_index = SlotIndex()
+        # 单任务模式：群号 -> 该群的任务 ID 集合
+        self.group_jobs: dict[str, set[str]] = {}
+        self.executor = PushExecutor(
+            max_concurrency=config.get("push_max_concurrency", 20),
+            platform_concurrency=config.get("push_platform_concurrency", 5),
+        )
+        self.spreader = PushSpreader(
+            mode=config.get("push_spread_mode", "none"),
+            jitter_seconds=config.get("push_jitter_seconds", 60),
+            rate_per_second=config.get("push_rate_per_second", 5),
+            burst=config.get("push_rate_burst", 10),
+            max_delay=config.get("push_max_delay_seconds", 240),
+        )
+        self.router = PlatformRouter(
+            db, ttl_hours=config.get("route_cache_ttl_hours", 168)
+        )
+        # 时间槽模式下，在推送前若干分钟提前准备好推送内容
+        self.prepare_lead: int = int(config.get("push_prepare_lead_minutes", 5) or 0)
+        self.preparer = PushPreparer(max_age=(self.prepare_lead + 10) * 60)
+        # 每条消息最多 @ 的人数，超出部分拆分到后续消息，0 为不拆分
+        self.mention_chunk_size: int = int(
+            config.get("push_mention_chunk_size", 50) or 0
+        )
+        self._at_cache: dict[str, At] = {}
+        self.outbox: PushOutbox | None = None
+        if config.get("push_outbox", True):
+            self.outbox = PushOutbox(
+                db,
+                self._deliver_push,
+                self.executor,
+                preparer=self.preparer,
+                max_attempts=config.get("push_retry_max_attempts", 5),
+                base_delay=config.get("push_retry_base_seconds", 30),
+            )
 
     async def initialize(self):
         """初始化调度器并加载所有任务"""
         self.scheduler = AsyncIOScheduler()
         await self._load_all_tasks()
         self.scheduler.start()
-        logger.info("Scheduler started")
+        if self.slot_mode:
+            logger.info(
+                f"Scheduler started in slot mode: {len(self.slot_index)} slot jobs, "
+                f"{self.slot_index.target_count()} push targets"
+            )
+        else:
+            logger.info("Scheduler started")
+
+        if self.outbox:
+            self.outbox.start()
+
+        # 补推重启期间错过的推送（立即执行一次）
+        self.scheduler.add_job(self._catch_up_missed, id="catch_up_missed")
 
     async def _load_all_tasks(self):
         """加载所有推送任务（周配置 + 手动配置）"""
@@ -62,29 +137,87 @@ class QuizScheduler:
         # ✅ 问题2修复：统一转换为字符串
         use_default_groups = [str(g) for g in use_default_groups]
 
+        # 推送配置自上次保存快照以来未变化：直接从快照恢复，跳过逐群初始化
+        if self._compute_schedule_signature(use_default_groups) == (
+            self.db.get_schedule_signature()
+        ):
+            entries = self.db.get_push_schedule()
+            for entry in entries:
+                self._register_push(
+                    PushTarget(
+                        entry.group_qq, entry.domain_id, entry.domain_name, entry.source
+                    ),
+                    (entry.weekday, entry.hour, entry.minute),
+                )
+            logger.info(
+                f"Push schedule unchanged, restored {len(entries)} targets from snapshot"
+            )
+            return
+
         # 加载周推送默认配置
         await self._load_weekly_tasks(use_default_groups)
 
         # 加载手动配置
         await self._load_manual_tasks(use_default_groups)
 
+        self._save_schedule_snapshot(use_default_groups)
+
+    def _compute_schedule_signature(self, use_default_groups: list[str]) -> str:
+        """
+        计算推送计划签名
+
+        覆盖周推送配置、使用默认配置的群、领域名称和所有激活的手动配置，
+        任何一项变化都会使签名变化。
+        """
+        payload = {
+            "use_default": sorted(use_default_groups),
+            "settings": self.config.get("settings", {}),
+            "domains": sorted((d.id, d.name) for d in self.db.get_all_domains()),
+            "manual": sorted(
+                (c.group_qq, c.domain_id, c.push_time)
+                for c in self.db.get_all_active_task_configs()
+            ),
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _save_schedule_snapshot(
+        self, use_default_groups: list[str], group_qq: str | None = None
+    ):
+        """
+        保存推送计划快照（可只保存某个群）
+
+        签名在注册完成后计算，因为周配置加载时可能新建了任务配置记录。
+        """
+        entries = [
+            PushScheduleEntry(
+                group_qq=target.group_qq,
+                domain_id=target.domain_id,
+                domain_name=target.domain_name,
+                weekday=slot[0],
+                hour=slot[1],
+                minute=slot[2],
+                source=target.source,
+            )
+            for slot, target in self.slot_index.items(group_qq)
+        ]
+        self.db.save_push_schedule(
+            entries, self._compute_schedule_signature(use_default_groups), group_qq
+        )
+
     async def reload_tasks_for_group(self, group_qq: str):
         """
         ✅ 问题3修复：重新加载指定群的任务
 
+        只移除并重新注册该群自己的任务，不会触及其他群。
+
         Args:
             group_qq: 群号
         """
         group_qq = str(group_qq)
 
         # 1. 移除该群的所有任务
-        jobs = self.scheduler.get_jobs()
-        removed_count = 0
-        for job in jobs:
-            if group_qq in job.id:
-                self.scheduler.remove_job(job.id)
-                removed_count += 1
-
+        removed_count = self._remove_group_jobs(group_qq)
         logger.info(f"Removed {removed_count} existing tasks for group {group_qq}")
 
         # 2. 检查该群是否使用默认配置
@@ -95,78 +228,126 @@ class QuizScheduler:
             await self._load_weekly_tasks([group_qq])
             logger.info(f"Reloaded weekly tasks for group {group_qq}")
         else:
-            # 重新加载手动配置任务
-            # ✅ 修复：这里应该传真实的 use_default_groups，而不是 [group_qq]
-            # 否则 _load_manual_tasks 会把当前群当在这个列表里从而跳过加载
-            await self._load_manual_tasks(use_default_groups)
+            # 只重新加载该群的手动配置任务
+            configs = self.db.get_active_group_task_config(group_qq)
+            self._register_manual_configs(configs, use_default_groups)
             logger.info(f"Reloaded manual tasks for group {group_qq}")
 
+        self._save_schedule_snapshot(use_default_groups, group_qq)
+
+    def _remove_group_jobs(self, group_qq: str) -> int:
+        """
+        根据注册表移除某群的所有任务
+
+        Returns:
+            int: 移除的调度任务数
+        """
+        removed_count = 0
+        self.preparer.invalidate(group_qq=group_qq)
+        emptied_slots = self.slot_index.remove_group(group_qq)
+        if self.slot_mode:
+            # 时间槽任务被多个群共享，只有变空的时间槽才需要移除
+            for slot in emptied_slots:
+                self._remove_job(self._slot_job_id(slot))
+                if self.prepare_lead > 0:
+                    self._remove_job(f"prepare_{self._slot_job_id(slot)}")
+                removed_count += 1
+        else:
+            for job_id in self.group_jobs.pop(group_qq, set()):
+                self._remove_job(job_id)
+                removed_count += 1
+        return removed_count
+
+    def _remove_job(self, job_id: str):
+        """移除调度任务，任务不存在时忽略"""
+        try:
+            self.scheduler.remove_job(job_id)
+        except JobLookupError:
+            logger.debug(f"Job {job_id} already removed")
+
+    def _parse_weekly_settings(self) -> list[tuple[SlotKey, str, list[str]]]:
+        """
+        解析周推送默认配置，每个星期的时间只解析一次
+
+        Returns:
+            list: (时间槽, 推送时间字符串, 领域名称列表) 列表，跳过无效配置
+        """
+        parsed = []
+        for day_name, day_config in self.config.get("settings", {}).items():
+            if day_name not in self.WEEKDAY_MAP:
+                continue
+
+            push_time = day_config.get("time", "12:00")
+            domains = day_config.get("domains", [])
+            if not domains:
+                continue
+
+            # 解析并验证时间格式
+            try:
+                dt = datetime.strptime(push_time, "%H:%M")
+            except (ValueError, TypeError):
+                logger.error(
+                    f"Invalid time format '{push_time}' for {day_name}, skipping day"
+                )
+                continue
+
+            parsed.append(
+                ((self.WEEKDAY_MAP[day_name], dt.hour, dt.minute), push_time, domains)
+            )
+        return parsed
+
     async def _load_weekly_tasks(self, use_default_groups: list[str]):
         """
         加载周推送默认配置的任务
 
+        配置只解析一次，领域与已有任务配置各用一次查询取回，
+        缺失的任务配置在一个事务中批量创建。
+
         Args:
             use_default_groups: 使用默认配置的群号列表
         """
-        config = self.config  # 使用插件配置
-        weekly_settings = config.get("settings", {})
-
+        weekly = self._parse_weekly_settings()
+        if not weekly or not use_default_groups:
+            return
+
+        domains = self.db.get_domains_by_names(
+            [name for _, _, names in weekly for name in names]
+        )
+        for name in {name for _, _, names in weekly for name in names} - set(domains):
+            logger.warning(f"Domain not found: {name}")
+
+        # ✅ Bug 1 修复：确保 cursor 记录存在（批量补齐缺失的任务配置）
+        existing = self.db.get_task_config_keys([d.id for d in domains.values()])
+        missing: dict[tuple[str, int], str] = {}
         for group_qq in use_default_groups:
-            for day_name, day_config in weekly_settings.items():
-                if day_name not in self.WEEKDAY_MAP:
-                    continue
-
-                push_time = day_config.get("time", "12:00")
-                domains = day_config.get("domains", [])
-
-                if not domains:
-                    continue
+            for _, push_time, names in weekly:
+                for name in names:
+                    domain = domains.get(name)
+                    if domain and (group_qq, domain.id) not in existing:
+                        missing.setdefault((group_qq, domain.id), push_time)
+        if missing:
+            self.db.init_group_domain_configs(
+                [
+                    (group_qq, domain_id, t)
+                    for (group_qq, domain_id), t in missing.items()
+                ]
+            )
 
-                # 为每个领域添加定时任务
-                for domain_name in domains:
-                    domain = self.db.get_domain_by_name(domain_name)
+        count = 0
+        for group_qq in use_default_groups:
+            for slot, _, names in weekly:
+                for name in names:
+                    domain = domains.get(name)
                     if not domain:
-                        logger.warning(f"Domain not found: {domain_name}")
-                        continue
-
-                    # ✅ Bug 1 修复：确保 cursor 记录存在
-                    cursor_record = self.db.get_group_domain_config(group_qq, domain.id)
-                    if not cursor_record:
-                        self.db.init_group_domain_config(group_qq, domain.id, push_time)
-                        logger.info(
-                            f"Initialized cursor for weekly config: "
-                            f"group={group_qq}, domain={domain_name}"
-                        )
-
-                    # 解析并验证时间格式
-                    try:
-                        dt = datetime.strptime(push_time, "%H:%M")
-                        hour, minute = dt.hour, dt.minute
-                    except (ValueError, TypeError):
-                        logger.error(
-                            f"Invalid time format '{push_time}' for group {group_qq}, "
-                            f"domain {domain_name}, skipping task"
-                        )
                         continue
-
-                    trigger = CronTrigger(
-                        day_of_week=self.WEEKDAY_MAP[day_name],
-                        hour=hour,
-                        minute=minute,
+                    self._register_push(
+                        PushTarget(group_qq, domain.id, name, "default"), slot
                     )
+                    count += 1
 
-                    self.scheduler.add_job(
-                        self._push_callback,
-                        trigger,
-                        args=[group_qq, domain.id, domain_name],
-                        id=f"default_{group_qq}_{day_name}_{domain_name}",
-                        replace_existing=True,
-                        misfire_grace_time=300,
-                    )
-                    logger.info(
-                        f"Added weekly task: group={group_qq}, day={day_name}, "
-                        f"domain={domain_name}, time={push_time}"
-                    )
+        logger.info(
+            f"Added {count} weekly tasks for {len(use_default_groups)} default groups"
+        )
 
     async def _load_manual_tasks(self, use_default_groups: list[str]):
         """
@@ -175,15 +356,19 @@ class QuizScheduler:
         Args:
             use_default_groups: 使用默认配置的群号列表（需跳过）
         """
-        with self.db.get_locked_cursor() as cursor:
-            cursor.execute("""
-                SELECT gtc.*, d.name as domain_name
-                FROM group_task_config gtc
-                JOIN domain d ON gtc.domain_id = d.id
-                WHERE gtc.is_active = 1
-            """)
-            manual_configs = [GroupTaskConfig(**dict(row)) for row in cursor.fetchall()]
+        manual_configs = self.db.get_all_active_task_configs()
+        self._register_manual_configs(manual_configs, use_default_groups)
 
+    def _register_manual_configs(
+        self, manual_configs: list[GroupTaskConfig], use_default_groups: list[str]
+    ):
+        """
+        注册手动配置的推送任务
+
+        Args:
+            manual_configs: 激活的群任务配置
+            use_default_groups: 使用默认配置的群号列表（需跳过）
+        """
         for config in manual_configs:
             group_qq = config.group_qq
             domain_id = config.domain_id
@@ -197,7 +382,6 @@ class QuizScheduler:
             # 解析并验证时间格式
             try:
                 dt = datetime.strptime(push_time, "%H:%M")
-                trigger = CronTrigger(hour=dt.hour, minute=dt.minute)
             except (ValueError, TypeError):
                 logger.error(
                     f"Invalid time format '{push_time}' in database for "
@@ -206,13 +390,9 @@ class QuizScheduler:
                 continue
 
             try:
-                self.scheduler.add_job(
-                    self._push_callback,
-                    trigger,
-                    args=[group_qq, domain_id, domain_name],
-                    id=f"manual_{group_qq}_{domain_name}",
-                    replace_existing=True,
-                    misfire_grace_time=300,
+                self._register_push(
+                    PushTarget(group_qq, domain_id, domain_name, "manual"),
+                    (None, dt.hour, dt.minute),
                 )
                 logger.info(
                     f"Added manual task: group={group_qq}, "
@@ -225,86 +405,398 @@ class QuizScheduler:
                     exc_info=True,
                 )
 
-    async def _push_callback(self, group_qq: str, domain_id: int, domain_name: str):
+    def _register_push(self, target: PushTarget, slot: SlotKey):
         """
-        定时推送回调函数（使用游标系统）
+        注册一个推送目标
+
+        目标总是写入内存索引；时间槽模式下首次出现的时间槽才注册调度任务，
+        否则为每个目标单独注册一个 CronTrigger 任务。
 
         Args:
-            group_qq: 群号
-            domain_id: 领域 ID
-            domain_name: 领域名称
+            target: 推送目标
+            slot: (星期, 时, 分)，星期为 None 表示每天
         """
-        logger.info(f"Push callback triggered: group={group_qq}, domain={domain_name}")
+        is_new_slot = self.slot_index.add(slot, target)
+        if self.slot_mode:
+            if is_new_slot:
+                self.scheduler.add_job(
+                    self._dispatch_slot,
+                    self._build_trigger(slot),
+                    args=list(slot),
+                    id=self._slot_job_id(slot),
+                    replace_existing=True,
+                    misfire_grace_time=300,
+                )
+                if self.prepare_lead > 0:
+                    self.scheduler.add_job(
+                        self._prepare_slot,
+                        self._build_trigger(self._shift_slot(slot, -self.prepare_lead)),
+                        args=list(slot),
+                        id=f"prepare_{self._slot_job_id(slot)}",
+                        replace_existing=True,
+                        misfire_grace_time=60,
+                    )
+            return
+
+        job_id = self._target_job_id(target, slot)
+        self.scheduler.add_job(
+            self._run_single_push,
+            self._build_trigger(slot),
+            args=[target, slot],
+            id=job_id,
+            replace_existing=True,
+            misfire_grace_time=300,
+        )
+        self.group_jobs.setdefault(target.group_qq, set()).add(job_id)
+
+    def _target_job_id(self, target: PushTarget, slot: SlotKey) -> str:
+        """单任务模式下的任务 ID"""
+        if target.source == "default":
+            day_name = self.WEEKDAY_NAMES.get(slot[0], "")
+            return f"default_{target.group_qq}_{day_name}_{target.domain_name}"
+        return f"manual_{target.group_qq}_{target.domain_name}"
+
+    @staticmethod
+    def _build_trigger(slot: SlotKey) -> CronTrigger:
+        """根据时间槽构建 CronTrigger"""
+        weekday, hour, minute = slot
+        if weekday is None:
+            return CronTrigger(hour=hour, minute=minute)
+        return CronTrigger(day_of_week=weekday, hour=hour, minute=minute)
+
+    @staticmethod
+    def _shift_slot(slot: SlotKey, minutes: int) -> SlotKey:
+        """将时间槽平移若干分钟，跨天时星期随之变化"""
+        weekday, hour, minute = slot
+        total = hour * 60 + minute + minutes
+        day_shift, total = divmod(total, 24 * 60)
+        if weekday is not None:
+            weekday = (weekday + day_shift) % 7
+        return (weekday, total // 60, total % 60)
+
+    @staticmethod
+    def _slot_job_id(slot: SlotKey) -> str:
+        """时间槽任务 ID，例如 slot_daily_1200 / slot_0_0930"""
+        weekday, hour, minute = slot
+        day = "daily" if weekday is None else str(weekday)
+        return f"slot_{day}_{hour:02d}{minute:02d}"
+
+    async def _dispatch_slot(self, weekday: int | None, hour: int, minute: int):
+        """
+        时间槽任务回调：查出该时间槽的所有推送目标并逐一推送
 
-        try:
-            # 获取该领域对应的信息 (包含 default_batch_size)
-            domain_info = self.db.get_domain_by_name(domain_name)
-            if not domain_info:
-                logger.warning(f"Push aborted: Domain info not found for {domain_name}")
-                return
+        Args:
+            weekday: 星期（0=星期一），None 表示每天
+            hour: 时
+            minute: 分
+        """
+        slot = (weekday, hour, minute)
+        targets = self.slot_index.targets(slot)
+        fired_at = self._previous_fire_time(slot, datetime.now())
+        logger.info(
+            f"Slot {self._slot_job_id(slot)} fired, "
+            f"dispatching {len(targets)} push targets"
+        )
+        await self.executor.fan_out(
+            [partial(self._fire_target, target, fired_at) for target in targets],
+            label=self._slot_job_id(slot),
+            delays=self.spreader.wave_delays([t.group_qq for t in targets]),
+        )
+
+    async def _prepare_slot(self, weekday: int | None, hour: int, minute: int):
+        """
+        预准备任务回调：在时间槽到来前为其所有推送目标准备好推送内容
 
-            batch_size = domain_info.default_batch_size or 3
+        Args:
+            weekday: 目标时间槽的星期，None 表示每天
+            hour: 目标时间槽的时
+            minute: 目标时间槽的分
+        """
+        slot = (weekday, hour, minute)
+        targets = self.slot_index.targets(slot)
+        start = time.perf_counter()
+        prepared = 0
+        for target in targets:
+            try:
+                push = self._prepare_push(
+                    target.group_qq, target.domain_id, target.domain_name
+                )
+            except Exception as e:  # noqa: BLE001
+                # 预先准备只是优化，任何失败都留到触发时按原流程处理
+                logger.warning(
+                    f"Failed to prepare push for group {target.group_qq}, "
+                    f"domain {target.domain_name}: {e}"
+                )
+                continue
+            if push:
+                self.preparer.put(push)
+                prepared += 1
+            # 逐个让出事件循环，避免长时间阻塞其他协程
+            await asyncio.sleep(0)
+
+        logger.info(
+            f"Prepared {prepared}/{len(targets)} pushes for slot "
+            f"{self._slot_job_id(slot)} in {time.perf_counter() - start:.2f}s"
+        )
+
+    def invalidate_prepared(
+        self,
+        group_qq: str | None = None,
+        domain_id: int | None = None,
+        study_group_id: int | None = None,
+    ):
+        """
+        策略状态或订阅变化后，使提前准备好的推送失效
 
-            # 1. 获取策略实例
-            strategy = StrategyFactory.get_group_strategy(self.db, group_qq, domain_id)
+        Args:
+            group_qq: 群号
+            domain_id: 领域 ID
+            study_group_id: 学习小组 ID（订阅变化时使用）
+        """
+        count = self.preparer.invalidate(
+            group_qq=str(group_qq) if group_qq is not None else None,
+            domain_id=domain_id,
+            study_group_id=study_group_id,
+        )
+        if count:
+            logger.debug(f"Invalidated {count} prepared pushes")
+
+    async def _run_single_push(self, target: PushTarget, slot: SlotKey):
+        """
+        单任务模式的调度回调：同样受全局并发上限约束
 
-            # 2. 使用策略获取题目
-            problems = strategy.get_problems_to_push(
-                group_qq, domain_id, limit=batch_size
-            )
+        单任务模式下各群的任务相互独立，无法按整波排队，只应用 jitter 偏移。
+        """
+        fired_at = self._previous_fire_time(slot, datetime.now())
+        await self.executor.submit_after(
+            self.spreader.delay_for(target.group_qq),
+            partial(self._fire_target, target, fired_at),
+        )
 
-            if not problems:
-                logger.warning(
-                    f"Push skipped: No problems found for domain {domain_name} (ID: {domain_id})"
+    async def _fire_target(self, target: PushTarget, fired_at: datetime) -> bool:
+        """
+        执行一次计划内推送，成功后记录推送时间供重启补推使用
+
+        Args:
+            target: 推送目标
+            fired_at: 本次推送对应的计划时间
+        """
+        success = await self._push_callback(
+            target.group_qq, target.domain_id, target.domain_name, fired_at
+        )
+        if success:
+            try:
+                self.db.record_push_fired(
+                    target.group_qq,
+                    target.domain_id,
+                    fired_at.strftime(FIRE_TIME_FORMAT),
+                )
+            except sqlite3.Error as e:
+                logger.error(
+                    f"Failed to record push time for group {target.group_qq}, "
+                    f"domain {target.domain_name}: {e}"
                 )
-                msg_text = f"📅 今日八股推送 [{domain_name}]\n\n该领域暂无题目"
-                from astrbot.api.message_components import Plain
+        return success
+
+    @staticmethod
+    def _previous_fire_time(slot: SlotKey, now: datetime) -> datetime:
+        """计算时间槽在 now 之前（含）最近一次的计划时间"""
+        weekday, hour, minute = slot
+        fire_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if weekday is None:
+            if fire_time > now:
+                fire_time -= timedelta(days=1)
+            return fire_time
+
+        fire_time -= timedelta(days=(now.weekday() - weekday) % 7)
+        if fire_time > now:
+            fire_time -= timedelta(days=7)
+        return fire_time
+
+    async def _catch_up_missed(self):
+        """
+        补推重启期间错过的推送
 
-                await self._send_push_message(group_qq, [Plain(msg_text)])
-                return
+        对每个推送目标，若最近一次计划时间在补推窗口内且晚于最后一次成功推送，
+        则立即补推一次；从未有过推送记录的目标不补推。
+        """
+        window = self.config.get("misfire_catchup_minutes", 30)
+        if not window or window <= 0:
+            return
+
+        now = datetime.now()
+        fire_log = self.db.get_push_fire_log()
+        missed = []
+        for slot, target in self.slot_index.items():
+            fired_at = self._previous_fire_time(slot, now)
+            if now - fired_at > timedelta(minutes=window):
+                continue
+            last_fired = fire_log.get((target.group_qq, target.domain_id))
+            # 没有推送记录的目标（如升级后首次启动、新加入的群）无法判断是否错过，
+            # 不补推，避免重复推送
+            if not last_fired or last_fired >= fired_at.strftime(FIRE_TIME_FORMAT):
+                continue
+            missed.append((target, fired_at))
+
+        if not missed:
+            return
+
+        logger.info(f"Catching up {len(missed)} pushes missed during restart")
+        await self.executor.fan_out(
+            [
+                partial(self._fire_target, target, fired_at)
+                for target, fired_at in missed
+            ],
+            label="catch_up",
+            delays=self.spreader.wave_delays([t.group_qq for t, _ in missed]),
+        )
+
+    async def _push_callback(
+        self,
+        group_qq: str,
+        domain_id: int,
+        domain_name: str,
+        fired_at: datetime | None = None,
+    ) -> bool:
+        """
+        定时推送回调函数（使用游标系统）
 
-            group_id = domain_info.group_id
-            if not group_id:
-                logger.warning(
-                    f"Push metadata missing: No group_id defined for domain {domain_name}"
-                )
-                return
+        启用发件箱时只负责准备推送并入队，投递和策略状态推进由发件箱完成。
 
-            # 获取订阅该小组的用户
-            subscribers = self.db.get_group_subscribers(group_id)
-            logger.debug(
-                f"Pushing to {group_qq}, domain {domain_name}, subscribers count: {len(subscribers)}"
-            )
+        Args:
+            group_qq: 群号
+            domain_id: 领域 ID
+            domain_name: 领域名称
+            fired_at: 计划推送时间，用于生成幂等键；手动推送时为 None
 
-            # 构建推送消息
-            message_chain = self._format_push_message(
-                domain_name, problems, subscribers
-            )
+        Returns:
+            bool: 是否推送成功（发件箱模式下为是否已入队）
+        """
+        logger.info(f"Push callback triggered: group={group_qq}, domain={domain_name}")
+
+        try:
+            # 优先使用提前准备好的推送，没有时现场准备
+            push = self.preparer.take(
+                group_qq, domain_id, (fired_at or datetime.now()).date()
+            ) or self._prepare_push(group_qq, domain_id, domain_name)
+            if push is None:
+                return False
+
+            if self.outbox:
+                fired = (fired_at or datetime.now()).strftime(FIRE_TIME_FORMAT)
+                return self.outbox.enqueue(
+                    push, f"{group_qq}:{domain_id}:{fired}", fired
+                )
 
             # 3. 发送消息
-            sent_success = await self._send_push_message(group_qq, message_chain)
+            sent_success = await self._deliver_push(push)
 
             if not sent_success:
                 logger.error(
                     f"Final Failure: Could not push message to group {group_qq} on any available platform"
                 )
-                return
+                return False
 
             # 4. 推送成功回调 (更新状态)
-            problem_ids = [p.id for p in problems]
-            strategy.on_push_success(group_qq, domain_id, problem_ids)
-            logger.info(f"Strategy callback completed: {type(strategy).__name__}")
+            if push.problem_ids:
+                strategy = StrategyFactory.create(push.strategy_type, self.db)
+                strategy.on_push_success(group_qq, domain_id, push.problem_ids)
+                logger.info(f"Strategy callback completed: {type(strategy).__name__}")
+                # 策略状态已推进，之前准备好的推送内容已过时
+                self.preparer.invalidate(group_qq=group_qq, domain_id=domain_id)
+            return True
 
         except sqlite3.Error as e:
             logger.error(
                 f"Database error in push callback for group {group_qq}, domain {domain_name}: {e}",
                 exc_info=True,
             )
+            return False
         except Exception as e:
             logger.error(
                 f"Unexpected error in push callback for group {group_qq}, domain {domain_name}: {e}",
                 exc_info=True,
             )
+            return False
+
+    def _prepare_push(
+        self, group_qq: str, domain_id: int, domain_name: str
+    ) -> PreparedPush | None:
+        """
+        准备一次推送：解析策略、选题、查询订阅者并渲染消息文本
+
+        Returns:
+            PreparedPush | None: 无法推送时返回 None
+        """
+        # 获取该领域对应的信息 (包含 default_batch_size)
+        domain_info = self.db.get_domain_by_name(domain_name)
+        if not domain_info:
+            logger.warning(f"Push aborted: Domain info not found for {domain_name}")
+            return None
+
+        batch_size = domain_info.default_batch_size or 3
+
+        # 1. 获取策略实例
+        strategy_type = self.db.get_strategy_type(group_qq, domain_id)
+        strategy = StrategyFactory.create(strategy_type, self.db)
+
+        # 2. 使用策略获取题目
+        problems = strategy.get_problems_to_push(group_qq, domain_id, limit=batch_size)
+
+        if not problems:
+            logger.warning(
+                f"Push skipped: No problems found for domain {domain_name} (ID: {domain_id})"
+            )
+            return PreparedPush(
+                group_qq=group_qq,
+                domain_id=domain_id,
+                domain_name=domain_name,
+                text=f"📅 今日八股推送 [{domain_name}]\n\n该领域暂无题目",
+                strategy_type=strategy_type,
+            )
+
+        group_id = domain_info.group_id
+        if not group_id:
+            logger.warning(
+                f"Push metadata missing: No group_id defined for domain {domain_name}"
+            )
+            return None
+
+        # 获取订阅该小组的用户
+        subscribers = self.db.get_group_subscribers(group_id)
+        logger.debug(
+            f"Pushing to {group_qq}, domain {domain_name}, subscribers count: {len(subscribers)}"
+        )
+
+        return PreparedPush(
+            group_qq=group_qq,
+            domain_id=domain_id,
+            domain_name=domain_name,
+            text=self._render_push_text(domain_name, problems),
+            strategy_type=strategy_type,
+            problem_ids=[p.id for p in problems],
+            mentions=subscribers,
+            study_group_id=group_id,
+        )
+
+    async def _deliver_push(self, push: PreparedPush) -> bool:
+        """
+        构建消息链并发送一次已准备好的推送
+
+        @ 列表过长时拆分为主消息和若干条后续消息。是否成功只以主消息为准，
+        后续消息发送失败仅记录日志，避免重试时重复发送题目。
+        """
+        main_chain, *follow_ups = self._build_message_chains(push.text, push.mentions)
+        if not await self._send_push_message(push.group_qq, main_chain):
+            return False
+
+        for index, chain in enumerate(follow_ups, start=1):
+            if not await self._send_push_message(push.group_qq, chain):
+                logger.warning(
+                    f"Mention follow-up {index}/{len(follow_ups)} failed for group "
+                    f"{push.group_qq}, domain {push.domain_name}"
+                )
+        return True
 
     async def _send_push_message(self, group_qq: str, message_chain: list) -> bool:
         """
@@ -333,7 +825,11 @@ class QuizScheduler:
             return False
 
         sent_success = False
-        for platform in self.context.platform_manager.platform_insts:
+        # 优先尝试该群上次投递成功的平台，失败后再逐个探测其他平台
+        platforms = self.router.order(
+            group_qq, self.context.platform_manager.platform_insts
+        )
+        for platform in platforms:
             try:
                 # 使用 platform.meta().id 是最稳健的方式
                 platform_id = platform.meta().id
@@ -343,10 +839,12 @@ class QuizScheduler:
                 # 绝大多数 adapter 期望 MessageType 为 GroupMessage (帕斯卡命名)
                 unified_msg_origin = f"{platform_id}:GroupMessage:{group_qq}"
 
-                await self.context.send_message(unified_msg_origin, result)
+                async with self.executor.platform_limit(platform_id):
+                    await self.context.send_message(unified_msg_origin, result)
                 logger.info(
                     f"Successfully pushed to group {group_qq} via platform {platform_id}"
                 )
+                self.router.remember(group_qq, platform_id)
                 sent_success = True
                 break  # 发送成功即停止
             except Exception as e:
@@ -356,19 +854,16 @@ class QuizScheduler:
 
         return sent_success
 
-    def _format_push_message(
-        self, domain_name: str, problems: list[dict], subscribers: list[str]
-    ) -> list:
+    def _render_push_text(self, domain_name: str, problems: list) -> str:
         """
-        格式化推送消息
+        渲染推送消息文本
 
         Args:
             domain_name: 领域名称
             problems: 题目列表
-            subscribers: 订阅用户 QQ 列表
 
         Returns:
-            消息链组件列表
+            推送消息文本
         """
         # 构建完整的文本消息（用列表拼接，然后用 \n 连接）
         text_lines = []
@@ -387,24 +882,54 @@ class QuizScheduler:
         text_lines.append("▶ 回复 /h <题目ID> 获取下一考点提示。")
         text_lines.append("▶ 回复 /ans <题目ID> 查看详细参考答案。")
 
-        # 如果有订阅者，添加到文本末尾
-        message_text = "\n".join(text_lines)
+        return "\n".join(text_lines)
 
-        # 构建消息链
-        message_chain = []
-        message_chain.append(Plain(message_text))
+    def _build_message_chains(
+        self, message_text: str, subscribers: list[str]
+    ) -> list[list]:
+        """
+        构建推送消息链，@ 列表按 mention_chunk_size 拆分
 
-        # 只有 @ 用 message_chain
-        if subscribers:
-            message_chain.append(Plain("\n\n"))
-            for user_qq in subscribers:
-                message_chain.append(At(qq=user_qq))
-                message_chain.append(Plain(" "))
+        Args:
+            message_text: 推送消息文本
+            subscribers: 订阅用户 QQ 列表
 
-        return message_chain
+        Returns:
+            消息链列表：第一条为题目正文加首批 @，其余为后续的 @ 消息
+        """
+        chunk_size = self.mention_chunk_size or len(subscribers) or 1
+        chunks = [
+            subscribers[i : i + chunk_size]
+            for i in range(0, len(subscribers), chunk_size)
+        ]
+
+        main_chain = [Plain(message_text)]
+        if not chunks:
+            return [main_chain]
+
+        # 只有 @ 用 message_chain
+        main_chain.append(MENTION_HEADER)
+        main_chain.extend(self._mention_components(chunks[0]))
+        return [main_chain] + [self._mention_components(chunk) for chunk in chunks[1:]]
+
+    def _mention_components(self, subscribers: list[str]) -> list:
+        """生成一批 @ 组件，复用已创建的 At 对象和共享的分隔符"""
+        if len(self._at_cache) > AT_CACHE_LIMIT:
+            self._at_cache.clear()
+
+        components = []
+        for user_qq in subscribers:
+            at = self._at_cache.get(user_qq)
+            if at is None:
+                at = self._at_cache[user_qq] = At(qq=user_qq)
+            components.append(at)
+            components.append(MENTION_SEPARATOR)
+        return components
 
     def shutdown(self):
         """关闭调度器"""
+        if self.outbox:
+            self.outbox.stop()
         if self.scheduler:
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")